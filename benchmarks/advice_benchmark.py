@@ -0,0 +1,169 @@
+"""
+Throughput and latency benchmark for the Sage advice path.
+
+Drives `SageAgent.asuggest_changes` at increasing concurrency against an
+OpenAI-compatible endpoint (by default an in-process `StubLLMServer`) and
+reports throughput and p50/p95/p99 latency per concurrency level, so
+caching, pooling and retry changes can be measured offline.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.agent_core.advice_cache import AdviceCache
+from src.agent_core.agent_core import SageAgent
+from src.agent_core.llm_client import close_async_openai_client
+from src.agent_core.resilience import ResilientCaller
+from benchmarks.stub_server import StubLLMServer
+
+DEFAULT_CONCURRENCY_LEVELS = (1, 2, 4, 8, 16, 32)
+
+BASE_DRIVERS = {
+    "project_type": "B2B SaaS",
+    "price": 50.0,
+    "customers": 100,
+    "churn_rate": 5.0,
+    "marketing_spend": 2000.0,
+    "new_customers": 10,
+    "expenses_monthly": 20000.0,
+    "cash_balance": 100000.0,
+}
+
+def make_workload(n_requests: int, distinct: Optional[int] = None) -> List[Tuple[Dict[str, Any], Dict[str, float]]]:
+    """
+    Build (drivers, metrics) pairs for the benchmark.
+
+    Args:
+        n_requests: Number of requests
+        distinct: Number of distinct models; repeats hit the advice cache when
+            it is enabled (defaults to all distinct)
+    """
+    distinct = n_requests if distinct is None else max(1, distinct)
+    agent = SageAgent(use_cache=False)
+    models = []
+    for i in range(min(distinct, n_requests)):
+        drivers = dict(BASE_DRIVERS, price=BASE_DRIVERS["price"] + 10 * i)
+        models.append((drivers, agent.calculate_model(drivers)))
+    return [models[i % len(models)] for i in range(n_requests)]
+
+def summarize(latencies: Sequence[float], errors: int, elapsed: float, concurrency: int,
+              prompt_tokens: float = 0.0) -> Dict[str, Any]:
+    """Summarize one concurrency level; latencies are in seconds, results in ms."""
+    values = np.asarray(latencies, dtype=float) * 1000.0
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) if values.size else (0.0, 0.0, 0.0)
+    return {
+        "concurrency": concurrency,
+        "requests": int(values.size),
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput": values.size / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "prompt_tokens": prompt_tokens,
+    }
+
+async def run_level(agent: SageAgent, workload: Sequence[Tuple[Dict[str, Any], Dict[str, float]]],
+                    concurrency: int) -> Dict[str, Any]:
+    """Send the workload with at most `concurrency` requests in flight and time each one."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def timed(drivers: Dict[str, Any], metrics: Dict[str, float]) -> Tuple[float, str]:
+        async with semaphore:
+            start = time.perf_counter()
+            advice = await agent.asuggest_changes(drivers, metrics)
+            return time.perf_counter() - start, advice
+
+    failures_before = agent.failures
+    requests_before = agent.prompt_stats["requests"]
+    tokens_before = agent.prompt_stats["prompt_tokens"]
+    start = time.perf_counter()
+    results = await asyncio.gather(*(timed(drivers, metrics) for drivers, metrics in workload))
+    elapsed = time.perf_counter() - start
+
+    requests = agent.prompt_stats["requests"] - requests_before
+    prompt_tokens = (agent.prompt_stats["prompt_tokens"] - tokens_before) / requests if requests else 0.0
+    return summarize([latency for latency, _ in results], agent.failures - failures_before, elapsed, concurrency,
+                     prompt_tokens)
+
+def run_benchmark(concurrency_levels: Sequence[int] = DEFAULT_CONCURRENCY_LEVELS, requests_per_level: int = 200,
+                  use_cache: bool = False, distinct: Optional[int] = None,
+                  hedge: bool = False) -> List[Dict[str, Any]]:
+    """
+    Benchmark the advice path against the endpoint in `OPENAI_BASE_URL`.
+
+    Each level gets a fresh in-memory advice cache (when enabled) and a fresh
+    resilience caller (retries, circuit breaker, optional hedging) so levels
+    are comparable. Errors count calls answered by a fallback.
+
+    Returns:
+        One summary dict per concurrency level
+    """
+    workload = make_workload(requests_per_level, distinct)
+
+    async def run() -> List[Dict[str, Any]]:
+        results = []
+        try:
+            for concurrency in concurrency_levels:
+                cache = AdviceCache(":memory:") if use_cache else None
+                agent = SageAgent(cache=cache, use_cache=use_cache, caller=ResilientCaller(hedge=hedge))
+                results.append(await run_level(agent, workload, concurrency))
+        finally:
+            await close_async_openai_client()
+        return results
+
+    return asyncio.run(run())
+
+def format_report(results: Sequence[Dict[str, Any]]) -> str:
+    """Render benchmark results as a fixed-width table."""
+    lines = [f"{'conc':>5} {'reqs':>6} {'errors':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+             f"{'tok/req':>8}"]
+    for row in results:
+        lines.append(
+            f"{row['concurrency']:>5} {row['requests']:>6} {row['errors']:>6} {row['throughput']:>9.1f} "
+            f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['prompt_tokens']:>8.0f}"
+        )
+    return "\n".join(lines)
+
+def main(argv: List[str] = None):
+    """Run the benchmark, starting a local stub server unless --url is given."""
+    parser = argparse.ArgumentParser(description="Benchmark SageAgent advice throughput and latency")
+    parser.add_argument("--url", help="OpenAI-compatible base URL (default: start a local stub server)")
+    parser.add_argument("--levels", default=",".join(str(level) for level in DEFAULT_CONCURRENCY_LEVELS),
+                        help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--cache", action="store_true", help="Enable the advice cache")
+    parser.add_argument("--distinct", type=int, default=None, help="Distinct models in the workload")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Stub max extra latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Stub error rate (failed calls are retried before counting as errors)")
+    parser.add_argument("--hedge", action="store_true", help="Send hedged requests after p95 latency")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    levels = [int(level) for level in args.levels.split(",") if level.strip()]
+    server = None
+    if args.url:
+        os.environ["OPENAI_BASE_URL"] = args.url
+    else:
+        server = StubLLMServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=0).start()
+        os.environ["OPENAI_BASE_URL"] = server.url
+    os.environ.setdefault("OPENAI_API_KEY", "stub")  # The stub ignores the key
+
+    try:
+        results = run_benchmark(levels, args.requests, args.cache, args.distinct, args.hedge)
+    finally:
+        if server is not None:
+            server.stop()
+
+    print(json.dumps(results, indent=2) if args.json else format_report(results))
+
+if __name__ == "__main__":
+    main()
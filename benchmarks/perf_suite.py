@@ -0,0 +1,326 @@
+"""
+Performance benchmark suite for the core paths.
+
+Times METRIC_FUNCS, calculate_model, validate_metrics,
+calculate_quality_score and badge evaluation (each scalar and batch) and
+the config loaders at 1, 1k and 1M inputs, recording wall time and peak
+traced memory per case and size.
+
+Results can be saved as a JSON baseline; later runs are compared against
+it and any case slower (or hungrier) than the baseline by more than the
+threshold is reported as a regression, with a non-zero exit status.
+Timings only compare on the same machine and stack, so when the baseline
+was recorded in a different environment the comparison is reported but
+not gated (pass --ignore-environment to gate anyway).
+
+Scalar cases cycle through a pool of at most POOL_SIZE distinct inputs so
+that building a million input dicts does not dominate memory; batch cases
+get full-size columns.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Dict, Any, Callable, List, Optional, Sequence
+
+import numpy as np
+
+from src.core_engine.batch import calculate_model_batch
+from src.core_engine.formulas import METRIC_FUNCS
+from src.core_engine.graph import evaluate_metrics
+from src.gamification.badges import BADGES_PATH, build_badge_context, get_badge_engine
+from src.infra.config import load_yaml
+from src.wizard.quality_score import calculate_quality_score, calculate_quality_score_batch
+from src.wizard.questions import QUESTIONS_PATH, load_questions, load_tips
+from src.wizard.sanity_rules import get_compiled_rules, validate_metrics, validate_metrics_batch
+
+DEFAULT_SIZES = (1, 1000, 1000000)
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+POOL_SIZE = 1000
+
+# Differences below these are timer / allocator noise, never regressions
+MIN_SECONDS_DELTA = 0.0005
+MIN_BYTES_DELTA = 64 * 1024
+
+def make_columns(n: int, seed: int = 0) -> Dict[str, np.ndarray]:
+    """Random but plausible driver columns for n startups."""
+    rng = np.random.default_rng(seed)
+    return {
+        "price": rng.uniform(5, 500, n).round(2),
+        "customers": rng.integers(0, 5000, n).astype(np.float64),
+        "churn_rate": rng.uniform(0, 25, n).round(2),
+        "marketing_spend": rng.uniform(0, 50000, n).round(2),
+        "new_customers": rng.integers(0, 500, n).astype(np.float64),
+        "expenses_monthly": rng.uniform(1000, 400000, n).round(2),
+        "cash_balance": rng.uniform(0, 5000000, n).round(2),
+        "team_size": rng.integers(1, 50, n).astype(np.float64),
+    }
+
+def make_drivers(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Row-wise drivers dicts (the scalar API's input)."""
+    columns = make_columns(n, seed)
+    names = list(columns)
+    return [dict(zip(names, (float(value) for value in row))) for row in zip(*(columns[name] for name in names))]
+
+def _cycle(pool: Sequence[Any], n: int):
+    size = len(pool)
+    for i in range(n):
+        yield pool[i % size]
+
+def _prepare_scalar(n: int) -> Dict[str, Any]:
+    drivers = make_drivers(min(n, POOL_SIZE))
+    metrics = [evaluate_metrics(d) for d in drivers]
+    answers = [{**d, **m} for d, m in zip(drivers, metrics)]
+    contexts = [build_badge_context(m, d, quality_score=calculate_quality_score(a), wizard_completed=True)
+                for d, m, a in zip(drivers, metrics, answers)]
+    return {"drivers": drivers, "metrics": metrics, "answers": answers, "contexts": contexts}
+
+def _prepare_batch(n: int) -> Dict[str, Any]:
+    columns = make_columns(n)
+    metrics = calculate_model_batch(columns)
+    combined = {**columns, **metrics, "revenue": metrics["mrr"]}
+    quality = np.full(n, 60.0)
+    return {"columns": columns, "combined": combined, "badge_columns": {**combined, "quality_score": quality}}
+
+def _run_metric_funcs(data, n):
+    funcs = list(METRIC_FUNCS.values())
+    for drivers in _cycle(data["drivers"], n):
+        for fn in funcs:
+            fn(drivers)
+
+def _run_calculate_model(data, n):
+    for drivers in _cycle(data["drivers"], n):
+        evaluate_metrics(drivers)
+
+def _run_calculate_model_batch(data, n):
+    calculate_model_batch(data["columns"])
+
+def _run_validate_metrics(data, n):
+    for i in range(n):
+        j = i % len(data["drivers"])
+        validate_metrics(data["metrics"][j], data["drivers"][j])
+
+def _run_validate_metrics_batch(data, n):
+    validate_metrics_batch(data["combined"])
+
+def _run_quality_score(data, n):
+    for answers in _cycle(data["answers"], n):
+        calculate_quality_score(answers)
+
+def _run_quality_score_batch(data, n):
+    calculate_quality_score_batch(data["combined"])
+
+def _run_badge_evaluation(data, n):
+    engine = get_badge_engine()
+    for context in _cycle(data["contexts"], n):
+        engine.evaluate(context)
+
+def _run_badge_evaluation_bulk(data, n):
+    get_badge_engine().evaluate_bulk(data["badge_columns"])
+
+def _run_config_cached(data, n):
+    for i in range(n):
+        if i % 3 == 0:
+            load_questions()
+        elif i % 3 == 1:
+            load_tips()
+        else:
+            get_compiled_rules()
+
+def _run_config_parse(data, n):
+    paths = (QUESTIONS_PATH, BADGES_PATH)
+    for i in range(n):
+        load_yaml(paths[i % len(paths)])
+
+# name -> (prepare, run, max size); a cold YAML parse costs ~10 ms, so
+# that case stops at 1k inputs
+CASES: Dict[str, tuple] = {
+    "metric_funcs": (_prepare_scalar, _run_metric_funcs, None),
+    "calculate_model": (_prepare_scalar, _run_calculate_model, None),
+    "calculate_model_batch": (_prepare_batch, _run_calculate_model_batch, None),
+    "validate_metrics": (_prepare_scalar, _run_validate_metrics, None),
+    "validate_metrics_batch": (_prepare_batch, _run_validate_metrics_batch, None),
+    "quality_score": (_prepare_scalar, _run_quality_score, None),
+    "quality_score_batch": (_prepare_batch, _run_quality_score_batch, None),
+    "badge_evaluation": (_prepare_scalar, _run_badge_evaluation, None),
+    "badge_evaluation_bulk": (_prepare_batch, _run_badge_evaluation_bulk, None),
+    "config_cached_lookup": (lambda n: None, _run_config_cached, None),
+    "config_yaml_parse": (lambda n: None, _run_config_parse, 1000),
+}
+
+def _repeats(n: int) -> int:
+    return 50 if n == 1 else 5 if n <= 1000 else 1
+
+# Stop repeating once this much time has been spent on a measurement
+REPEAT_BUDGET_SECONDS = 1.0
+
+def measure(case: str, n: int) -> Optional[Dict[str, Any]]:
+    """
+    Time one case at size n (best of several runs for small n) and trace its peak memory.
+
+    Returns None when n exceeds the case's maximum size.
+    """
+    prepare, run, max_n = CASES[case]
+    if max_n is not None and n > max_n:
+        return None
+    data = prepare(n)
+    run(data, min(n, 10))  # warm caches and compiled configs
+
+    # Like timeit, keep the cyclic collector out of the timed runs
+    best, spent = float("inf"), 0.0
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(_repeats(n)):
+            start = time.perf_counter()
+            run(data, n)
+            elapsed = time.perf_counter() - start
+            best, spent = min(best, elapsed), spent + elapsed
+            if spent > REPEAT_BUDGET_SECONDS:
+                break
+    finally:
+        gc.enable()
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run(data, n)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "case": case,
+        "n": n,
+        "seconds": best,
+        "per_item_us": best / n * 1e6,
+        "peak_bytes": peak,
+    }
+
+def run_suite(cases: Sequence[str] = None, sizes: Sequence[int] = DEFAULT_SIZES,
+              progress: Callable[[Dict[str, Any]], None] = None) -> List[Dict[str, Any]]:
+    """Measure every case at every size."""
+    results = []
+    for case in cases or CASES:
+        if case not in CASES:
+            raise ValueError(f"Benchmark case '{case}' not found")
+        for n in sizes:
+            result = measure(case, n)
+            if result is None:
+                continue
+            results.append(result)
+            if progress is not None:
+                progress(result)
+    return results
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+def save_baseline(results: List[Dict[str, Any]], path: str = DEFAULT_BASELINE_PATH):
+    """Write results as the JSON baseline."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+        f.write("\n")
+
+def load_baseline(path: str = DEFAULT_BASELINE_PATH) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def environment_differences(baseline: Dict[str, Any]) -> List[str]:
+    """Names of the environment fields (python, numpy, platform, ...) that differ from the baseline's."""
+    recorded = baseline.get("environment", {})
+    return [key for key, value in environment().items() if recorded.get(key) != value]
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Return the results that regressed against the baseline.
+
+    A case regresses when its time or peak memory exceeds the baseline by
+    more than `threshold` (0.25 = 25%) and by more than the noise floor.
+    """
+    base = {(row["case"], row["n"]): row for row in baseline.get("results", [])}
+    regressions = []
+    for row in results:
+        old = base.get((row["case"], row["n"]))
+        if old is None:
+            continue
+        for metric, floor in (("seconds", MIN_SECONDS_DELTA), ("peak_bytes", MIN_BYTES_DELTA)):
+            if row[metric] > old[metric] * (1 + threshold) and row[metric] - old[metric] > floor:
+                regressions.append({
+                    "case": row["case"],
+                    "n": row["n"],
+                    "metric": metric,
+                    "baseline": old[metric],
+                    "current": row[metric],
+                    "ratio": row[metric] / old[metric] if old[metric] else float("inf"),
+                })
+    return regressions
+
+def format_row(row: Dict[str, Any]) -> str:
+    return (f"{row['case']:<24} {row['n']:>9} {row['seconds'] * 1000:>11.3f} {row['per_item_us']:>11.3f} "
+            f"{row['peak_bytes'] / 1024:>11.1f}")
+
+REPORT_HEADER = f"{'case':<24} {'n':>9} {'total ms':>11} {'us/item':>11} {'peak KiB':>11}"
+
+def main(argv: List[str] = None):
+    """Run the suite, optionally saving a baseline or checking against one."""
+    parser = argparse.ArgumentParser(description="Benchmark the core calculation, validation and scoring paths")
+    parser.add_argument("--sizes", default=",".join(str(n) for n in DEFAULT_SIZES), help="Comma-separated input sizes")
+    parser.add_argument("--cases", default=None, help=f"Comma-separated subset of: {', '.join(CASES)}")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results to the baseline file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown / memory growth before flagging, as a fraction")
+    parser.add_argument("--ignore-environment", action="store_true",
+                        help="Fail on regressions even if the baseline was recorded in another environment")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    sizes = [int(n) for n in args.sizes.split(",") if n.strip()]
+    cases = [case.strip() for case in args.cases.split(",")] if args.cases else None
+
+    if not args.json:
+        print(REPORT_HEADER)
+    results = run_suite(cases, sizes, progress=None if args.json else lambda row: print(format_row(row), flush=True))
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one", file=sys.stderr)
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    differences = environment_differences(baseline)
+    gated = not differences or args.ignore_environment
+    if differences:
+        print(f"Warning: baseline was recorded with a different {', '.join(differences)}; "
+              f"{'gating anyway' if gated else 'reporting regressions without failing'}", file=sys.stderr)
+
+    regressions = compare(results, baseline, args.threshold)
+    for reg in regressions:
+        print(f"REGRESSION {reg['case']} n={reg['n']} {reg['metric']}: "
+              f"{reg['baseline']:.6g} -> {reg['current']:.6g} ({reg['ratio']:.2f}x)", file=sys.stderr)
+    if regressions:
+        return 1 if gated else 0
+    print(f"No regressions above {args.threshold:.0%} against {args.baseline}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+Local stand-in for the OpenAI chat completions endpoint.
+
+The stub answers `POST .../chat/completions` with `recommendation`
+function-call payloads (plain or streamed as server-sent events) after a
+configurable latency with jitter, and fails a configurable share of
+requests. Point the agent at it with `OPENAI_BASE_URL` to load-test the
+advice path without calling the real API.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List
+
+STUB_ADVICE = [
+    ("Cut monthly burn by 15% to extend runway past 12 months.", "critical"),
+    ("Raise prices by 10% for new customers; churn risk is low at this ARPU.", "high"),
+    ("Focus on reducing churn below 3% before scaling paid acquisition.", "high"),
+    ("Shift marketing spend to the channel with the lowest CAC.", "medium"),
+    ("Offer annual plans with a discount to pull cash forward.", "medium"),
+    ("Review tooling subscriptions and cancel unused seats.", "low"),
+]
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Request handler; configuration lives on the server object."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # Avoid delayed-ACK stalls between header and body writes
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def do_POST(self):
+        server: "StubLLMServer" = self.server.stub
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not self.path.rstrip("/").endswith("chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path '{self.path}'", "type": "not_found"}})
+            return
+
+        request = json.loads(body or b"{}")
+        server.wait()
+        if server.should_fail():
+            self._send_json(server.error_status, {"error": {"message": "Stub upstream error", "type": "server_error"}})
+            return
+
+        advice, priority = server.next_advice()
+        arguments = json.dumps({"advice": advice, "priority": priority})
+        if request.get("stream"):
+            self._send_stream(request, arguments, server.chunk_size)
+        else:
+            self._send_json(200, _completion(request, arguments))
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, request: Dict[str, Any], arguments: str, chunk_size: int):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for chunk in _completion_chunks(request, arguments, chunk_size):
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+def _completion(request: Dict[str, Any], arguments: str) -> Dict[str, Any]:
+    """Build a non-streamed chat.completion with a `recommendation` function call."""
+    return {
+        "id": f"chatcmpl-stub-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {
+                "role": "assistant",
+                "content": None,
+                "function_call": {"name": "recommendation", "arguments": arguments},
+            },
+            "finish_reason": "function_call",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": len(arguments) // 4, "total_tokens": len(arguments) // 4},
+    }
+
+def _completion_chunks(request: Dict[str, Any], arguments: str, chunk_size: int) -> List[Dict[str, Any]]:
+    """Split the function-call arguments into chat.completion.chunk deltas."""
+    base = {
+        "id": f"chatcmpl-stub-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": request.get("model", "stub"),
+    }
+    deltas = [{"role": "assistant", "content": None, "function_call": {"name": "recommendation", "arguments": ""}}]
+    deltas += [{"function_call": {"arguments": arguments[i:i + chunk_size]}}
+               for i in range(0, len(arguments), chunk_size)]
+
+    chunks = [dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": None}]) for delta in deltas]
+    chunks.append(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "function_call"}]))
+    return chunks
+
+class StubLLMServer:
+    """
+    Threaded HTTP server mimicking the chat completions endpoint.
+
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        latency: Base response latency in seconds
+        jitter: Extra latency drawn uniformly from [0, jitter] seconds
+        error_rate: Share of requests answered with `error_status`
+        error_status: HTTP status used for injected failures
+        chunk_size: Characters of arguments per streamed chunk
+        seed: Seed for latency/error sampling
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.2, jitter: float = 0.05,
+                 error_rate: float = 0.0, error_status: int = 500, chunk_size: int = 8, seed: int = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.chunk_size = max(1, chunk_size)
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self._httpd = ThreadingHTTPServer((host, port), _StubHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+
+    @property
+    def url(self) -> str:
+        """Base URL to use as the OpenAI `base_url`."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def wait(self):
+        """Sleep for the configured latency plus jitter."""
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def should_fail(self) -> bool:
+        """Count the request and decide whether to inject an error."""
+        with self._lock:
+            self.requests += 1
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+            return failed
+
+    def next_advice(self):
+        """Return the next canned (advice, priority) pair."""
+        with self._lock:
+            return STUB_ADVICE[self.requests % len(STUB_ADVICE)]
+
+    def start(self) -> "StubLLMServer":
+        """Serve requests on a background daemon thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-llm-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve requests on the calling thread until interrupted."""
+        try:
+            self._httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        """Stop serving and release the socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "StubLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def main(argv: List[str] = None):
+    """Run the stub server in the foreground."""
+    parser = argparse.ArgumentParser(description="Local stand-in for the chat completions endpoint")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8808)
+    parser.add_argument("--latency", type=float, default=0.2, help="Base latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Max extra latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    server = StubLLMServer(args.host, args.port, args.latency, args.jitter, args.error_rate, seed=args.seed)
+    print(f"Stub LLM server listening on {server.url} (set OPENAI_BASE_URL to this)")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
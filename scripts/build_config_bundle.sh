@@ -0,0 +1,8 @@
+#!/bin/bash
+
+# Startup Financial OS MVP - Config Bundle Build
+# Precompiles wizard/badge YAML and benchmarks.csv into src/config_bundle.bin
+# so the app skips YAML/CSV parsing on cold start.
+
+echo "📦 Building config bundle..."
+python -c "from src.infra.bundle import main; main()" "$@"
@@ -0,0 +1,11 @@
+#!/bin/bash
+
+# Startup Financial OS MVP - Log Queries
+# Aggregates logs/sage.log and its rotated backups: actions per day
+# (actions), advice rating ratio by priority (ratings) or the wizard funnel
+# (funnel). Offsets and aggregates are kept in logs/query_state.json so
+# repeated runs only parse new lines.
+
+QUERY=${1:-actions}
+shift
+python -c "from src.infra.log_query import main; main()" "$QUERY" --state logs/query_state.json "$@"
@@ -0,0 +1,9 @@
+#!/bin/bash
+
+# Startup Financial OS MVP - Advice Path Benchmark
+# Drives SageAgent against a local stub of the chat completions endpoint at
+# increasing concurrency and reports throughput and p50/p95/p99 latency.
+# Pass --url to target another OpenAI-compatible endpoint instead.
+
+echo "⏱️  Benchmarking advice path..."
+python -m benchmarks.advice_benchmark "$@"
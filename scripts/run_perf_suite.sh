@@ -0,0 +1,12 @@
+#!/bin/bash
+
+# Startup Financial OS MVP - Core Path Benchmarks
+# Times metric calculation, validation, quality scoring, badge evaluation
+# and config loading at 1, 1k and 1M inputs (time and peak memory), and
+# fails if any case regressed more than 25% against benchmarks/baseline.json.
+# The baseline only gates on the machine/stack it was recorded on; elsewhere
+# regressions are reported without failing. Pass --save-baseline to record a
+# new baseline, --sizes 1,1000 for a quick run.
+
+echo "⏱️  Benchmarking core paths..."
+python -m benchmarks.perf_suite "$@"
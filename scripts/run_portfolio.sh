@@ -0,0 +1,10 @@
+#!/bin/bash
+
+# Startup Financial OS MVP - Portfolio Runner
+# Scores a CSV (with header) or JSONL file of startup drivers without the UI:
+# metrics, quality score, sanity-rule violations and badges per row, written
+# to the -o file chunk by chunk. Example:
+#   scripts/run_portfolio.sh portfolio.csv -o results.csv --workers 4
+
+echo "📊 Scoring portfolio..." >&2
+python -c "from src.portfolio.runner import main; main()" "$@"
@@ -4,10 +4,24 @@ Agent Core module for Startup Financial OS MVP.
 This module contains the Sage AI agent functionality.
 """
 
-from .agent_core import SageAgent, calculate_model, suggest_changes
+from .agent_core import SageAgent, calculate_model, calculate_model_batch, suggest_changes, suggest_changes_many
+from .advice_cache import AdviceCache, get_advice_cache
+from .streaming import AdviceStreamParser
+from .resilience import ResilientCaller, CircuitBreaker, get_advice_caller
+from .conversation_store import ConversationStore, get_conversation_store
 
 __all__ = [
     "SageAgent",
     "calculate_model",
-    "suggest_changes"
+    "calculate_model_batch",
+    "suggest_changes",
+    "suggest_changes_many",
+    "AdviceCache",
+    "get_advice_cache",
+    "AdviceStreamParser",
+    "ResilientCaller",
+    "CircuitBreaker",
+    "get_advice_caller",
+    "ConversationStore",
+    "get_conversation_store"
 ] 
\ No newline at end of file
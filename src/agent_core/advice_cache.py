@@ -0,0 +1,165 @@
+"""
+Persistent advice cache for the Sage agent.
+
+Advice from `SageAgent.suggest_changes` is stored in SQLite, keyed on a
+canonical hash of drivers and metrics. Numeric values are optionally
+quantized to a few significant digits so that near-identical models (e.g.
+$49.99 vs $50) share an entry. Entries expire after a TTL and the least
+recently used ones are evicted beyond a size cap.
+"""
+
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+
+DEFAULT_CACHE_PATH = os.getenv("ADVICE_CACHE_PATH", "advice_cache.db")
+DEFAULT_MAX_ENTRIES = int(os.getenv("ADVICE_CACHE_MAX_ENTRIES", "10000"))
+DEFAULT_TTL_SECONDS = float(os.getenv("ADVICE_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+DEFAULT_SIGNIFICANT_DIGITS = 3
+
+def quantize_value(value: Any, significant_digits: int = DEFAULT_SIGNIFICANT_DIGITS) -> Any:
+    """Round numbers to a number of significant digits; other values pass through."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value
+    if not math.isfinite(value) or value == 0:
+        return float(value)
+    return float(f"{value:.{significant_digits}g}")
+
+def make_cache_key(drivers: Dict[str, Any], metrics: Dict[str, float],
+                   significant_digits: Optional[int] = DEFAULT_SIGNIFICANT_DIGITS) -> str:
+    """
+    Build a canonical hash of drivers and metrics.
+
+    Args:
+        drivers: Wizard answers / drivers dict
+        metrics: Calculated metrics
+        significant_digits: Quantization precision, or None to hash exact values
+
+    Returns:
+        Hex SHA-256 of the sorted, compact JSON form
+    """
+    def canonical(values: Dict[str, Any]) -> Dict[str, Any]:
+        if significant_digits is None:
+            return dict(values)
+        return {key: quantize_value(value, significant_digits) for key, value in values.items()}
+
+    payload = json.dumps(
+        {"drivers": canonical(drivers), "metrics": canonical(metrics)},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class AdviceCache:
+    """SQLite-backed LRU cache with TTL and hit/miss counters."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 significant_digits: Optional[int] = DEFAULT_SIGNIFICANT_DIGITS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.significant_digits = significant_digits
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS advice ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_advice_accessed_at ON advice (accessed_at)")
+
+    def make_key(self, drivers: Dict[str, Any], metrics: Dict[str, float]) -> str:
+        """Build the cache key for drivers and metrics using this cache's quantization."""
+        return make_cache_key(drivers, metrics, self.significant_digits)
+
+    def get(self, key: str, allow_expired: bool = False) -> Optional[str]:
+        """
+        Return cached advice, or None on a miss.
+
+        Expired entries count as misses but are kept until purge_expired() or
+        LRU eviction, so `allow_expired=True` can still serve them as a
+        fallback while the upstream is down.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM advice WHERE key = ?", (key,)).fetchone()
+            if row is None or (now - row[1] > self.ttl_seconds and not allow_expired):
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE advice SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str):
+        """Store advice and evict least recently used entries beyond max_entries."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO advice (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM advice WHERE key IN ("
+                " SELECT key FROM advice ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def purge_expired(self) -> int:
+        """Delete expired entries and return how many were removed."""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM advice WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            return cursor.rowcount
+
+    def clear(self):
+        """Remove all entries and reset counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM advice")
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM advice").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current hit ratio."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": len(self),
+        }
+
+    def close(self):
+        """Close the underlying connection."""
+        with self._lock:
+            self._conn.close()
+
+_shared_cache: Optional[AdviceCache] = None
+_shared_cache_lock = threading.Lock()
+
+def get_advice_cache() -> AdviceCache:
+    """Return the process-wide advice cache, opening it on first use."""
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = AdviceCache()
+    return _shared_cache
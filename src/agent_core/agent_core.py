@@ -6,10 +6,18 @@ This module contains the core AI agent functionality for financial analysis and
 
 import os
 import json
+import asyncio
 import openai
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Tuple
 from dotenv import load_dotenv
-from datetime import datetime
+
+from .advice_cache import AdviceCache, get_advice_cache
+from .llm_client import get_openai_client, get_async_openai_client, close_async_openai_client
+from .streaming import AdviceStreamParser
+from .resilience import ResilientCaller, get_advice_caller, is_upstream_failure
+from .conversation_store import ConversationStore, get_conversation_store
+from .prompt_builder import build_messages
+from ..infra.instrumentation import metrics_registry, timed
 
 load_dotenv()
 
@@ -33,111 +41,324 @@ Guidelines:
 - Use emojis sparingly but effectively
 """
 
+RECOMMENDATION_FUNCTION = {
+    "name": "recommendation",
+    "description": "Provide a specific, actionable recommendation",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "advice": {
+                "type": "string",
+                "description": "One specific, actionable piece of advice"
+            },
+            "priority": {
+                "type": "string",
+                "enum": ["critical", "high", "medium", "low"],
+                "description": "Priority level of the recommendation"
+            }
+        },
+        "required": ["advice", "priority"]
+    }
+}
+
+OFFLINE_ADVICE_PREFIX = "Sage can't reach the AI service right now, so here's a quick tip from your numbers: "
+
+# Appended when a streamed answer breaks off after part of it was shown
+INTERRUPTED_ADVICE_NOTICE = " … (response interrupted, please ask again)"
+
+_ADVICE_CACHE_HITS = metrics_registry.counter("cache_requests_total", "Cache lookups by cache and result",
+                                              cache="advice", result="hit")
+_ADVICE_CACHE_MISSES = metrics_registry.counter("cache_requests_total", cache="advice", result="miss")
+_OPENAI_SECONDS = {
+    mode: metrics_registry.histogram("openai_request_seconds",
+                                     "Advice calls to the chat completions API, retries included", mode=mode)
+    for mode in ("sync", "async", "stream")
+}
+
+def local_advice(metrics: Dict[str, float]) -> str:
+    """Rule-of-thumb advice computed locally, used when the LLM is unavailable."""
+    runway = metrics.get("runway", 0)
+    churn = metrics.get("churn", 0)
+    ltv = metrics.get("ltv", 0)
+    cac = metrics.get("cac", 0)
+    
+    if 0 < runway < 6:
+        return f"Runway is only {runway:.1f} months. Cut non-essential spend now and start fundraising."
+    if churn > 5:
+        return f"Monthly churn of {churn:.1f}% is high. Talk to churned customers and fix retention before scaling."
+    if cac > 0 and ltv / cac < 3:
+        return f"LTV/CAC is {ltv / cac:.1f}. Aim for 3+ by raising prices or moving spend to cheaper channels."
+    return "Your core metrics look healthy. Focus on growing MRR while keeping burn flat."
+
 class SageAgent:
     """Sage AI Agent for startup financial analysis."""
     
-    def __init__(self):
-        self.conversation_history = []
+    def __init__(self, cache: Optional[AdviceCache] = None, use_cache: bool = True,
+                 caller: Optional[ResilientCaller] = None, history: Optional[ConversationStore] = None,
+                 session_id: str = "default", token_budget: Optional[int] = None):
+        # Persistent, size-capped conversation log shared across agents unless one is given;
+        # the shared one is opened on first use
+        self._history = history
+        self.session_id = session_id
         self.current_metrics = {}
+        self.failures = 0
+        # Priority the model gave the most recent advice; None for cached, fallback or local advice
+        self.last_priority: Optional[str] = None
+        # Prompt size accounting; token counts are local estimates
+        self.token_budget = token_budget
+        self.prompt_stats = {"requests": 0, "prompt_tokens": 0, "last_prompt_tokens": 0, "last_dropped": []}
+        # Deadline, retries and circuit breaker around LLM calls; shared across agents by default
+        self.caller = caller if caller is not None else get_advice_caller()
+        # Advice cache shared across agents unless a specific one is given; the
+        # shared one is opened on the first advice request, not for metric math
+        self.use_cache = use_cache
+        self._cache = cache if use_cache else None
     
+    @property
+    def cache(self) -> Optional[AdviceCache]:
+        """Advice cache, or None when caching is disabled."""
+        if self._cache is None and self.use_cache:
+            self._cache = get_advice_cache()
+        return self._cache
+    
+    @property
+    def history(self) -> ConversationStore:
+        """Conversation log for this agent's turns."""
+        if self._history is None:
+            self._history = get_conversation_store()
+        return self._history
+    
+    @timed("calculate_model_seconds", "Single-model metric calculation")
     def calculate_model(self, drivers: Dict[str, Any]) -> Dict[str, float]:
         """Calculate financial metrics from input drivers."""
-        from ..core_engine.formulas import METRIC_FUNCS
-        
-        # Convert string values to float where needed
-        processed_drivers = {}
-        for key, value in drivers.items():
-            if isinstance(value, str) and value.replace('.', '').replace('-', '').isdigit():
-                processed_drivers[key] = float(value)
-            else:
-                processed_drivers[key] = value
-        
-        # Calculate all metrics
-        metrics = {}
-        for metric_name, calc_func in METRIC_FUNCS.items():
-            try:
-                metrics[metric_name] = calc_func(processed_drivers)
-            except (KeyError, ZeroDivisionError):
-                metrics[metric_name] = 0.0
+        from ..core_engine.graph import evaluate_metrics
+        
+        # Evaluate the metric dependency graph; shared intermediates such as
+        # MRR are computed once and failing metrics fall back to 0.0
+        metrics = evaluate_metrics(drivers)
         
         self.current_metrics = metrics
         return metrics
     
+    def calculate_model_batch(self, drivers_batch: Any) -> Dict[str, Any]:
+        """Calculate financial metrics for many driver sets in one vectorized pass."""
+        from ..core_engine.batch import calculate_model_batch
+        
+        return calculate_model_batch(drivers_batch)
+    
+    def _cached_advice(self, drivers: Dict[str, Any], metrics: Dict[str, float]):
+        """Return (cache_key, cached advice or None)."""
+        if self.cache is None:
+            return None, None
+        cache_key = self.cache.make_key(drivers, metrics)
+        cached_advice = self.cache.get(cache_key)
+        (_ADVICE_CACHE_MISSES if cached_advice is None else _ADVICE_CACHE_HITS).inc()
+        return cache_key, cached_advice
+    
+    def _build_request(self, drivers: Dict[str, Any], metrics: Dict[str, float]) -> Dict[str, Any]:
+        """Build the chat completion arguments for an advice request."""
+        # Compact, project-type-aware context capped at the token budget
+        prompt = build_messages(SYSTEM_PROMPT, drivers, metrics, self.token_budget)
+        self.prompt_stats["requests"] += 1
+        self.prompt_stats["prompt_tokens"] += prompt["prompt_tokens"]
+        self.prompt_stats["last_prompt_tokens"] = prompt["prompt_tokens"]
+        self.prompt_stats["last_dropped"] = prompt["dropped"]
+        
+        return {
+            "model": "gpt-4o-mini",
+            "temperature": 0.3,
+            "max_tokens": 150,
+            "messages": prompt["messages"],
+            "functions": [RECOMMENDATION_FUNCTION],
+            "function_call": {"name": "recommendation"}
+        }
+    
+    def _parse_advice(self, response: Any, cache_key: Optional[str]) -> str:
+        """Extract the advice from a `recommendation` function call and cache it."""
+        function_call = response.choices[0].message.function_call
+        if function_call and function_call.name == "recommendation":
+            result = json.loads(function_call.arguments)
+            if cache_key is not None:
+                self.cache.set(cache_key, result["advice"])
+            self.last_priority = result.get("priority")
+            return result["advice"]
+        else:
+            return "I need more data to provide specific advice. Please complete the wizard questions."
+    
+    def _fallback_advice(self, cache_key: Optional[str], metrics: Dict[str, float], error: Exception) -> str:
+        """Answer a failed call: stale cached or local advice if the upstream is unhealthy."""
+        self.failures += 1
+        if not is_upstream_failure(error):
+            return f"Unable to generate advice at this time. Error: {str(error)}"
+        
+        if cache_key is not None:
+            stale_advice = self.cache.get(cache_key, allow_expired=True)
+            if stale_advice is not None:
+                return stale_advice
+        return OFFLINE_ADVICE_PREFIX + local_advice(metrics)
+    
     def suggest_changes(self, drivers: Dict[str, Any], metrics: Dict[str, float]) -> str:
         """Generate AI-powered suggestions for improvement."""
         
-        # Prepare context for AI
-        context = {
-            "drivers": drivers,
-            "metrics": metrics,
-            "project_type": drivers.get("project_type", "Unknown")
-        }
+        self.last_priority = None
+        # Serve repeat requests for the same (quantized) model from the cache
+        cache_key, cached_advice = self._cached_advice(drivers, metrics)
+        if cached_advice is not None:
+            return cached_advice
+        
+        try:
+            client = get_openai_client()
+            request = self._build_request(drivers, metrics)
+            with _OPENAI_SECONDS["sync"].time():
+                response = self.caller.call(lambda timeout: client.chat.completions.create(timeout=timeout, **request))
+            return self._parse_advice(response, cache_key)
+                
+        except Exception as e:
+            return self._fallback_advice(cache_key, metrics, e)
+    
+    def stream_changes(self, drivers: Dict[str, Any], metrics: Dict[str, float]) -> Iterator[str]:
+        """
+        Stream advice text as it is generated.
+        
+        Yields fragments of the `advice` field of the `recommendation` function
+        call as soon as they arrive; cached advice is yielded in one piece.
+        """
+        self.last_priority = None
+        cache_key, cached_advice = self._cached_advice(drivers, metrics)
+        if cached_advice is not None:
+            yield cached_advice
+            return
         
+        parser = AdviceStreamParser()
+        stream = None
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4o-mini",
-                temperature=0.3,
-                max_tokens=150,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": f"Analyze this startup data and provide one specific improvement suggestion: {json.dumps(context, indent=2)}"}
-                ],
-                functions=[
-                    {
-                        "name": "recommendation",
-                        "description": "Provide a specific, actionable recommendation",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "advice": {
-                                    "type": "string",
-                                    "description": "One specific, actionable piece of advice"
-                                },
-                                "priority": {
-                                    "type": "string",
-                                    "enum": ["critical", "high", "medium", "low"],
-                                    "description": "Priority level of the recommendation"
-                                }
-                            },
-                            "required": ["advice", "priority"]
-                        }
-                    }
-                ],
-                function_call={"name": "recommendation"}
-            )
+            client = get_openai_client()
+            request = self._build_request(drivers, metrics)
+            # Retries and the deadline cover opening the stream; hedging would duplicate output
+            with _OPENAI_SECONDS["stream"].time():
+                stream = self.caller.call(
+                    lambda timeout: client.chat.completions.create(stream=True, timeout=timeout, **request), hedge=False
+                )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                function_call = chunk.choices[0].delta.function_call
+                if function_call and function_call.arguments:
+                    text = parser.feed(function_call.arguments)
+                    if text:
+                        yield text
             
-            function_call = response.choices[0].message.function_call
-            if function_call and function_call.name == "recommendation":
-                result = json.loads(function_call.arguments)
-                return result["advice"]
-            else:
-                return "I need more data to provide specific advice. Please complete the wizard questions."
+            if not parser.arguments:
+                yield "I need more data to provide specific advice. Please complete the wizard questions."
+                return
+            
+            result = parser.result()
+            if cache_key is not None:
+                self.cache.set(cache_key, result["advice"])
+            self.last_priority = result.get("priority")
                 
         except Exception as e:
-            return f"Unable to generate advice at this time. Error: {str(e)}"
+            if stream is not None:
+                # The caller only saw the stream open; a drop while reading it counts against the upstream too
+                self.caller.breaker.record_failure()
+            fallback = self._fallback_advice(cache_key, metrics, e)
+            # Partial advice was already shown; mark it as cut off rather than stopping silently
+            yield INTERRUPTED_ADVICE_NOTICE if parser.advice else fallback
+    
+    async def asuggest_changes(self, drivers: Dict[str, Any], metrics: Dict[str, float]) -> str:
+        """Async variant of suggest_changes using the pooled async client."""
+        self.last_priority = None
+        cache_key, cached_advice = self._cached_advice(drivers, metrics)
+        if cached_advice is not None:
+            return cached_advice
+        
+        try:
+            client = get_async_openai_client()
+            request = self._build_request(drivers, metrics)
+            with _OPENAI_SECONDS["async"].time():
+                response = await self.caller.acall(lambda timeout: client.chat.completions.create(timeout=timeout, **request))
+            return self._parse_advice(response, cache_key)
+        
+        except Exception as e:
+            return self._fallback_advice(cache_key, metrics, e)
+    
+    async def asuggest_changes_many(self, items: Iterable[Tuple[Dict[str, Any], Dict[str, float]]],
+                                    concurrency: int = 8) -> List[str]:
+        """
+        Generate advice for many (drivers, metrics) pairs concurrently.
+        
+        At most `concurrency` requests are in flight at once; results keep the
+        order of `items`.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def bounded(drivers: Dict[str, Any], metrics: Dict[str, float]) -> str:
+            async with semaphore:
+                return await self.asuggest_changes(drivers, metrics)
+        
+        return await asyncio.gather(*(bounded(drivers, metrics) for drivers, metrics in items))
+    
+    def suggest_changes_many(self, items: Iterable[Tuple[Dict[str, Any], Dict[str, float]]],
+                             concurrency: int = 8) -> List[str]:
+        """
+        Blocking wrapper around asuggest_changes_many for portfolio-wide advice.
+        
+        Must be called from code without a running event loop.
+        """
+        async def run() -> List[str]:
+            try:
+                return await self.asuggest_changes_many(items, concurrency)
+            finally:
+                await close_async_openai_client()
+        
+        return asyncio.run(run())
+    
+    @property
+    def conversation_history(self) -> List[Dict]:
+        """Retained conversation turns for this agent's session, oldest first."""
+        return self.history.recent(self.history.max_entries, self.session_id)
     
     def log_conversation(self, user_input: str, agent_response: str, metrics: Dict[str, float] = None):
         """Log conversation for learning and audit purposes."""
-        entry = {
-            "user_input": user_input,
-            "agent_response": agent_response,
-            "metrics": metrics or {},
-            "timestamp": str(datetime.now())
-        }
-        self.conversation_history.append(entry)
+        self.history.add(self.session_id, user_input, agent_response, metrics)
     
-    def get_relevant_context(self, k: int = 5) -> List[Dict]:
-        """Get k most relevant previous conversations for context."""
-        # Simple implementation - return last k conversations
-        return self.conversation_history[-k:] if self.conversation_history else []
+    def get_relevant_context(self, k: int = 5, query: Optional[str] = None) -> List[Dict]:
+        """
+        Get k most relevant previous conversations for context.
+        
+        With a query, returns the session's past turns most similar to it
+        (best first); without one, the last k turns.
+        """
+        if query:
+            return self.history.search(query, k, self.session_id)
+        return self.history.recent(k, self.session_id)
 
 # Standalone functions for direct use
 def calculate_model(drivers: Dict[str, Any]) -> Dict[str, float]:
     """Calculate financial metrics from input drivers."""
-    agent = SageAgent()
-    return agent.calculate_model(drivers)
+    from ..core_engine.graph import evaluate_metrics
+    
+    return evaluate_metrics(drivers)
+
+def calculate_model_batch(drivers_batch: Any) -> Dict[str, Any]:
+    """Calculate financial metrics for a batch of driver sets (columnar or list of dicts)."""
+    from ..core_engine.batch import calculate_model_batch as batch_calculate
+    
+    return batch_calculate(drivers_batch)
+
+_default_agent: Optional[SageAgent] = None
+
+def get_default_agent() -> SageAgent:
+    """Return the shared agent used by the standalone helpers."""
+    global _default_agent
+    if _default_agent is None:
+        _default_agent = SageAgent()
+    return _default_agent
 
 def suggest_changes(drivers: Dict[str, Any], metrics: Dict[str, float]) -> str:
     """Generate AI-powered suggestions for improvement."""
-    agent = SageAgent()
-    return agent.suggest_changes(drivers, metrics) 
\ No newline at end of file
+    return get_default_agent().suggest_changes(drivers, metrics)
+
+def suggest_changes_many(items: Iterable[Tuple[Dict[str, Any], Dict[str, float]]], concurrency: int = 8) -> List[str]:
+    """Generate advice for many (drivers, metrics) pairs with at most `concurrency` requests in flight."""
+    return get_default_agent().suggest_changes_many(items, concurrency) 
\ No newline at end of file
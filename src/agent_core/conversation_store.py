@@ -0,0 +1,316 @@
+"""
+Persistent, size-capped conversation history for the Sage agent.
+
+Turns are stored in SQLite and mirrored in memory with a hashed n-gram
+TF-IDF index (word unigrams and bigrams hashed into a fixed number of
+features, L2-normalized turn vectors in a feature-major NumPy matrix).
+A query only touches the rows of its own few features, so finding the
+top-k relevant past exchanges stays well under a millisecond. The matrix
+starts small and doubles as turns arrive, up to max_entries columns, so
+memory follows the retained history rather than the cap.
+
+max_entries bounds the turns kept across all sessions. Once it is reached,
+a new turn evicts the oldest turn of the session holding the most turns
+(its own session on a tie), so a chatty session only ever pushes out its
+own history and every session keeps at least an equal share of the cap.
+
+Metrics dicts attached to turns are stored once per distinct content and
+shared between the turns that reference them.
+
+Turns are written synchronously to their own database file rather than
+through the storage write-behind queue: the index is keyed by the row ID
+SQLite assigns and evictions delete rows by that ID, and with one write
+per Sage reply (after a multi-second model call) on a file no other
+writer uses, there is no lock contention for batching to remove.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+DEFAULT_HISTORY_PATH = os.getenv("CONVERSATION_STORE_PATH", "conversations.db")
+DEFAULT_MAX_TURNS = int(os.getenv("CONVERSATION_STORE_MAX_TURNS", "5000"))
+DEFAULT_N_FEATURES = 2 ** 11
+# Index columns allocated up front; doubled as needed up to max_entries
+INITIAL_CAPACITY = 64
+
+_TOKEN_RE = re.compile(r"[a-z0-9$%]+")
+_STOP_WORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it me my of on or our should so that the "
+    "this to we what when which why will with you your".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens (stop words removed) plus adjacent-word bigrams."""
+    words = [word for word in _TOKEN_RE.findall(text.lower()) if word not in _STOP_WORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+def hash_features(text: str, n_features: int = DEFAULT_N_FEATURES) -> Dict[int, float]:
+    """Map text to {feature index: sublinear term frequency} with a stable hash."""
+    counts: Dict[int, int] = {}
+    for token in tokenize(text):
+        index = zlib.crc32(token.encode("utf-8")) % n_features
+        counts[index] = counts.get(index, 0) + 1
+    return {index: 1.0 + np.log(count) for index, count in counts.items()}
+
+def _metrics_hash(metrics: Dict[str, float]) -> str:
+    payload = json.dumps(metrics, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ConversationStore:
+    """SQLite-backed conversation log with a bounded in-memory similarity index."""
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH, max_entries: int = DEFAULT_MAX_TURNS,
+                 n_features: int = DEFAULT_N_FEATURES):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.n_features = n_features
+        self._lock = threading.Lock()
+
+        # Index: feature x slot weights; an evicted turn's slot is reused by the next turn
+        capacity = min(self.max_entries, INITIAL_CAPACITY)
+        self._matrix = np.zeros((n_features, capacity), dtype=np.float32)
+        self._slot_features: List[np.ndarray] = []
+        self._doc_freq = np.zeros(n_features, dtype=np.float32)
+        self._slot_ids = np.full(capacity, -1, dtype=np.int64)
+        self._slot_sessions = np.full(capacity, -1, dtype=np.int64)
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        self._slot_of: Dict[int, int] = {}
+        self._session_codes: Dict[str, int] = {}
+        # Session code -> its indexed turn IDs, oldest first; sessions without turns are dropped
+        self._session_turns: Dict[int, deque] = {}
+        self._session_names: Dict[int, str] = {}
+        self._next_code = 0
+        self._metrics_by_hash: Dict[str, Dict[str, float]] = {}
+        self._free_slots: List[int] = []
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS metrics_snapshots ("
+            " hash TEXT PRIMARY KEY,"
+            " metrics TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversation_turns ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " session_id TEXT NOT NULL,"
+            " user_input TEXT NOT NULL,"
+            " agent_response TEXT NOT NULL,"
+            " metrics_hash TEXT,"
+            " timestamp TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_turns_session ON conversation_turns (session_id, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_turns_metrics ON conversation_turns (metrics_hash)")
+        self._load()
+
+    def _load(self):
+        """Rebuild the in-memory index from the newest persisted turns."""
+        rows = self._conn.execute(
+            "SELECT t.id, t.session_id, t.user_input, t.agent_response, t.timestamp, t.metrics_hash, m.metrics"
+            " FROM conversation_turns t LEFT JOIN metrics_snapshots m ON m.hash = t.metrics_hash"
+            " ORDER BY t.id DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for turn_id, session_id, user_input, agent_response, timestamp, metrics_hash, metrics_json in reversed(rows):
+            metrics = self._intern_metrics(metrics_hash, json.loads(metrics_json) if metrics_json else {})
+            self._index(turn_id, session_id, {
+                "user_input": user_input,
+                "agent_response": agent_response,
+                "metrics": metrics,
+                "timestamp": timestamp,
+            })
+
+    def _intern_metrics(self, metrics_hash: Optional[str], metrics: Dict[str, float]) -> Dict[str, float]:
+        if metrics_hash is None:
+            return {}
+        return self._metrics_by_hash.setdefault(metrics_hash, metrics)
+
+    def _vectorize(self, text: str):
+        """Return (feature indices, L2-normalized weights) for text."""
+        features = hash_features(text, self.n_features)
+        indices = np.fromiter(features.keys(), dtype=np.int64, count=len(features))
+        weights = np.fromiter(features.values(), dtype=np.float32, count=len(features))
+        norm = np.linalg.norm(weights)
+        return indices, (weights / norm if norm else weights)
+
+    def _grow(self):
+        """Double the number of index slots, up to max_entries."""
+        capacity = self._matrix.shape[1]
+        grown = min(self.max_entries, capacity * 2)
+        matrix = np.zeros((self.n_features, grown), dtype=np.float32)
+        matrix[:, :capacity] = self._matrix
+        self._matrix = matrix
+        padding = np.full(grown - capacity, -1, dtype=np.int64)
+        self._slot_ids = np.concatenate([self._slot_ids, padding])
+        self._slot_sessions = np.concatenate([self._slot_sessions, padding])
+
+    def _victim(self, code: Optional[int]) -> int:
+        """Turn to evict for a new turn of session `code`: the oldest of the largest session."""
+        own = len(self._session_turns.get(code, ()))
+        largest = max(self._session_turns, key=lambda other: (len(self._session_turns[other]),
+                                                              -self._session_turns[other][0]))
+        if own >= len(self._session_turns[largest]):
+            largest = code
+        return self._session_turns[largest][0]
+
+    def _evict(self, turn_id: int):
+        """Remove a session's oldest turn from the index and free its slot."""
+        slot = self._slot_of.pop(turn_id)
+        old_indices = self._slot_features[slot]
+        self._matrix[old_indices, slot] = 0.0
+        self._doc_freq[old_indices] -= 1
+        code = int(self._slot_sessions[slot])
+        turns = self._session_turns[code]
+        turns.popleft()
+        if not turns:
+            del self._session_turns[code]
+            del self._session_codes[self._session_names.pop(code)]
+        self._slot_ids[slot] = -1
+        self._slot_sessions[slot] = -1
+        del self._entries[turn_id]
+        self._free_slots.append(slot)
+
+    def _index(self, turn_id: int, session_id: str, entry: Dict[str, Any]) -> Optional[int]:
+        """Put an entry into a free slot; returns the ID of the turn evicted to make room, if any."""
+        evicted_id = None
+        if len(self._entries) >= self.max_entries:
+            evicted_id = self._victim(self._session_codes.get(session_id))
+            self._evict(evicted_id)
+
+        code = self._session_codes.get(session_id)
+        if code is None:
+            code = self._session_codes[session_id] = self._next_code
+            self._session_names[code] = session_id
+            self._next_code += 1
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            slot = len(self._slot_features)
+            if slot == self._matrix.shape[1]:
+                self._grow()
+            self._slot_features.append(np.empty(0, dtype=np.int64))
+
+        indices, weights = self._vectorize(f"{entry['user_input']} {entry['agent_response']}")
+        self._matrix[indices, slot] = weights
+        self._doc_freq[indices] += 1
+        self._slot_features[slot] = indices
+        self._slot_ids[slot] = turn_id
+        self._slot_sessions[slot] = code
+        self._session_turns.setdefault(code, deque()).append(turn_id)
+        self._entries[turn_id] = entry
+        self._slot_of[turn_id] = slot
+        return evicted_id
+
+    def add(self, session_id: str, user_input: str, agent_response: str,
+            metrics: Dict[str, float] = None) -> Dict[str, Any]:
+        """Persist a turn, index it and delete the turn it evicts beyond max_entries."""
+        metrics = metrics or {}
+        metrics_hash = _metrics_hash(metrics) if metrics else None
+        timestamp = str(datetime.now())
+
+        with self._lock:
+            if metrics_hash is not None and metrics_hash not in self._metrics_by_hash:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO metrics_snapshots (hash, metrics) VALUES (?, ?)",
+                    (metrics_hash, json.dumps(metrics, sort_keys=True, default=str)),
+                )
+            cursor = self._conn.execute(
+                "INSERT INTO conversation_turns (session_id, user_input, agent_response, metrics_hash, timestamp)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (session_id, user_input, agent_response, metrics_hash, timestamp),
+            )
+            entry = {
+                "user_input": user_input,
+                "agent_response": agent_response,
+                "metrics": self._intern_metrics(metrics_hash, dict(metrics)),
+                "timestamp": timestamp,
+            }
+            evicted_id = self._index(cursor.lastrowid, session_id, entry)
+            if evicted_id is not None:
+                self._delete(evicted_id)
+        return entry
+
+    def _delete(self, turn_id: int):
+        """Delete an evicted turn, and its metrics snapshot once no other turn uses it."""
+        row = self._conn.execute("SELECT metrics_hash FROM conversation_turns WHERE id = ?", (turn_id,)).fetchone()
+        self._conn.execute("DELETE FROM conversation_turns WHERE id = ?", (turn_id,))
+        metrics_hash = row[0] if row else None
+        if metrics_hash is None:
+            return
+        cursor = self._conn.execute(
+            "DELETE FROM metrics_snapshots WHERE hash = ?"
+            " AND NOT EXISTS (SELECT 1 FROM conversation_turns WHERE metrics_hash = ?)",
+            (metrics_hash, metrics_hash),
+        )
+        if cursor.rowcount:
+            self._metrics_by_hash.pop(metrics_hash, None)
+
+    def recent(self, k: int = 5, session_id: str = None) -> List[Dict[str, Any]]:
+        """Return the last k turns, oldest first (optionally for one session)."""
+        with self._lock:
+            if session_id is None:
+                turn_ids = sorted(self._entries)
+            else:
+                turn_ids = list(self._session_turns.get(self._session_codes.get(session_id), ()))
+            return [self._entries[turn_id] for turn_id in turn_ids[-k:]] if k > 0 else []
+
+    def search(self, query: str, k: int = 5, session_id: str = None) -> List[Dict[str, Any]]:
+        """
+        Return up to k past turns most similar to `query`, best match first.
+
+        Query terms are weighted by inverse document frequency; turns sharing
+        no terms with the query are never returned.
+        """
+        with self._lock:
+            n_docs = len(self._entries)
+            if n_docs == 0 or k <= 0:
+                return []
+
+            indices, weights = self._vectorize(query)
+            weights = weights * (np.log((1 + n_docs) / (1 + self._doc_freq[indices])) + 1)
+            scores = weights @ self._matrix[indices]
+
+            valid = self._slot_ids >= 0
+            if session_id is not None:
+                valid &= self._slot_sessions == self._session_codes.get(session_id, -2)
+            scores = np.where(valid & (scores > 0), scores, -np.inf)
+
+            k = min(k, int(np.isfinite(scores).sum()))
+            if k == 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [self._entries[int(self._slot_ids[slot])] for slot in top]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def close(self):
+        """Close the underlying connection."""
+        with self._lock:
+            self._conn.close()
+
+_shared_store: Optional[ConversationStore] = None
+_shared_store_lock = threading.Lock()
+
+def get_conversation_store() -> ConversationStore:
+    """Return the process-wide conversation store, opening it on first use."""
+    global _shared_store
+    if _shared_store is None:
+        with _shared_store_lock:
+            if _shared_store is None:
+                _shared_store = ConversationStore()
+    return _shared_store
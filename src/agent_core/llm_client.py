@@ -0,0 +1,64 @@
+"""
+Pooled OpenAI clients for the Sage agent.
+
+One sync client per process and one async client per event loop are created
+lazily and reused, so advice requests share keep-alive HTTP connections
+instead of opening a new one per call. Client-side retries are disabled;
+`resilience.ResilientCaller` owns retries, deadlines and backoff. `OPENAI_BASE_URL` redirects them,
+e.g. to the local stub server used for load tests.
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+from typing import Optional
+
+import httpx
+import openai
+
+MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "30"))
+
+_client: Optional[openai.OpenAI] = None
+_client_lock = threading.Lock()
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, openai.AsyncOpenAI]" = weakref.WeakKeyDictionary()
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+
+def get_openai_client() -> openai.OpenAI:
+    """Return the process-wide sync client backed by a pooled httpx.Client."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = openai.OpenAI(
+                    api_key=openai.api_key or os.getenv("OPENAI_API_KEY"),
+                    base_url=os.getenv("OPENAI_BASE_URL") or None,
+                    timeout=REQUEST_TIMEOUT_SECONDS,
+                    max_retries=0,
+                    http_client=httpx.Client(limits=_limits(), timeout=REQUEST_TIMEOUT_SECONDS),
+                )
+    return _client
+
+def get_async_openai_client() -> openai.AsyncOpenAI:
+    """Return the async client for the running event loop, backed by a pooled httpx.AsyncClient."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = openai.AsyncOpenAI(
+            api_key=openai.api_key or os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            timeout=REQUEST_TIMEOUT_SECONDS,
+            max_retries=0,
+            http_client=httpx.AsyncClient(limits=_limits(), timeout=REQUEST_TIMEOUT_SECONDS),
+        )
+        _async_clients[loop] = client
+    return client
+
+async def close_async_openai_client():
+    """Close the running loop's async client, e.g. before the loop shuts down."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
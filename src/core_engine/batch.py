@@ -0,0 +1,147 @@
+"""
+Vectorized batch metric calculations for Startup Financial OS MVP.
+
+This module mirrors the scalar formulas in `formulas.py` over columnar NumPy
+inputs, so whole portfolios and scenario sets are scored in one pass.
+"""
+
+from typing import Dict, Any, List, Iterable, Mapping, Union
+
+import numpy as np
+
+# Drivers read by the metric formulas, in the order they are packed
+DRIVER_COLUMNS = [
+    "price",
+    "customers",
+    "churn_rate",
+    "marketing_spend",
+    "new_customers",
+    "expenses_monthly",
+    "cash_balance",
+]
+
+Columns = Mapping[str, Union[np.ndarray, Iterable[float]]]
+
+
+def coerce_value(value: Any) -> float:
+    """
+    Coerce a single driver value to float, NaN when it is not numeric.
+
+    Numbers (bool, int, float and NumPy scalars) and numeric strings such as
+    "2" or "-0.5" are accepted; anything else, including None, is NaN.
+    """
+    if isinstance(value, (int, float, np.integer, np.floating, np.bool_)):
+        return float(value)
+    if isinstance(value, str) and value.replace('.', '').replace('-', '').isdigit():
+        try:
+            return float(value)
+        except ValueError:
+            return np.nan
+    return np.nan
+
+
+def coerce_column(values: Any) -> np.ndarray:
+    """Coerce a column to a flat float64 array, cell by cell with `coerce_value` unless already numeric."""
+    column = np.asarray(values)
+    if column.dtype.kind in "biuf":
+        return column.astype(np.float64).ravel()
+    return np.fromiter((coerce_value(value) for value in column.ravel()), dtype=np.float64, count=column.size)
+
+
+def pack_drivers(drivers_list: List[Dict[str, Any]], columns: List[str] = None) -> Dict[str, np.ndarray]:
+    """
+    Pack a list of driver dicts into columnar float arrays.
+
+    Missing or non-numeric values become NaN, which the batch formulas treat
+    the same way `SageAgent.calculate_model` treats a missing key.
+
+    Args:
+        drivers_list: One drivers dict per model
+        columns: Driver names to pack (defaults to DRIVER_COLUMNS)
+
+    Returns:
+        Dictionary of driver name to float64 array of length len(drivers_list)
+    """
+    columns = columns or DRIVER_COLUMNS
+    packed = {}
+    for column in columns:
+        packed[column] = np.fromiter(
+            (coerce_value(drivers.get(column)) for drivers in drivers_list),
+            dtype=np.float64,
+            count=len(drivers_list),
+        )
+    return packed
+
+
+def _as_columns(drivers: Union[Columns, List[Dict[str, Any]]]) -> Dict[str, np.ndarray]:
+    """Normalize batch input to a dict of equal-length float arrays."""
+    if isinstance(drivers, list):
+        return pack_drivers(drivers)
+
+    columns = {}
+    size = None
+    for key in DRIVER_COLUMNS:
+        if key not in drivers:
+            continue
+        column = np.asarray(drivers[key], dtype=np.float64).ravel()
+        if size is not None and column.shape[0] != size:
+            raise ValueError(f"Column '{key}' has length {column.shape[0]}, expected {size}")
+        size = column.shape[0]
+        columns[key] = column
+    return columns
+
+
+def _batch_size(columns: Dict[str, np.ndarray]) -> int:
+    """Return the number of models in a columnar batch."""
+    for column in columns.values():
+        return column.shape[0]
+    return 0
+
+
+def _with_fallback(values: np.ndarray, *inputs: np.ndarray) -> np.ndarray:
+    """Zero out rows where any input is missing (NaN), like the scalar KeyError path."""
+    valid = np.ones(values.shape, dtype=bool)
+    for column in inputs:
+        valid &= ~np.isnan(column)
+    return np.where(valid, values, 0.0)
+
+
+def calculate_model_batch(drivers: Union[Columns, List[Dict[str, Any]]]) -> Dict[str, np.ndarray]:
+    """
+    Calculate all financial metrics for many models in one vectorized pass.
+
+    Args:
+        drivers: Either a mapping of driver name to array-like column, or a
+            list of drivers dicts (packed with `pack_drivers`)
+
+    Returns:
+        Dictionary with the same keys as METRIC_FUNCS, each a float64 array
+    """
+    columns = _as_columns(drivers)
+    size = _batch_size(columns)
+    missing = np.full(size, np.nan)
+
+    price = columns.get("price", missing)
+    customers = columns.get("customers", missing)
+    churn_rate = columns.get("churn_rate", missing)
+    marketing_spend = columns.get("marketing_spend", missing)
+    new_customers = columns.get("new_customers", missing)
+    expenses = columns.get("expenses_monthly", missing)
+    cash = columns.get("cash_balance", missing)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mrr = price * customers
+        burn = expenses - mrr
+        cac = marketing_spend / np.maximum(new_customers, 1)
+        runway = cash / np.maximum(burn, 1)
+        safe_churn = np.where(churn_rate == 0, 1.0, churn_rate)
+        ltv = np.where(churn_rate == 0, 0.0, price / (safe_churn / 100))
+
+    return {
+        "mrr": _with_fallback(mrr, price, customers),
+        "churn": _with_fallback(churn_rate, churn_rate),
+        "cac": _with_fallback(cac, marketing_spend, new_customers),
+        "runway": _with_fallback(runway, expenses, price, customers, cash),
+        "burn_rate": _with_fallback(burn, expenses, price, customers),
+        "ltv": _with_fallback(ltv, price, churn_rate),
+    }
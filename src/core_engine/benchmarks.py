@@ -0,0 +1,353 @@
+"""
+Industry benchmark distributions for Startup Financial OS MVP.
+
+benchmarks.csv gives a typical (median) value per metric and segment. Each
+(metric, segment) pair becomes a KLL quantile sketch seeded with a
+log-normal prior around that median, so percentile-of-value queries work
+before any user data exists. Anonymized submissions (segment and metric
+values only) fold into the same sketches. A sketch's memory is bounded by
+its k whatever the number of submissions, and a lookup is a binary search
+over its sorted view, never a rescan of raw values.
+
+Submissions are also kept in a sketch of their own per pair, so a pair
+can be re-seeded when its median in benchmarks.csv changes without losing
+them. Sketches from several processes can be combined with `merge`, or
+saved and restored with `save` / `load_state`. The process-wide index is
+loaded from BENCHMARKS_STATE_PATH at startup, re-seeding pairs that are new
+or changed in benchmarks.csv, and written back there at most every
+BENCHMARKS_SAVE_INTERVAL_SECONDS after a submission and at exit, so
+submissions survive restarts.
+
+`submit_once` remembers a fingerprint (hash) of the segment and values of
+recent submissions, so resubmitting an unchanged model, from any session,
+does not count it twice. At most BENCHMARKS_MAX_FINGERPRINTS are kept, the
+least recently seen dropped first.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from statistics import NormalDist
+from typing import Dict, Any, Mapping, Optional, Tuple
+
+import numpy as np
+
+from ..infra.config import config_registry, load_csv_table
+from .quantiles import DEFAULT_K, KLLSketch
+
+BENCHMARKS_PATH = os.path.join(os.path.dirname(__file__), 'benchmarks.csv')
+DEFAULT_STATE_PATH = os.getenv("BENCHMARKS_STATE_PATH", "benchmarks_state.json")
+DEFAULT_SAVE_INTERVAL_SECONDS = float(os.getenv("BENCHMARKS_SAVE_INTERVAL_SECONDS", "60"))
+DEFAULT_MAX_FINGERPRINTS = int(os.getenv("BENCHMARKS_MAX_FINGERPRINTS", "100000"))
+
+# Wizard project types -> benchmarks.csv segment columns
+SEGMENTS = {
+    "B2B SaaS": "saas_b2b",
+    "B2C SaaS": "saas_b2c",
+    "E-commerce": "ecommerce",
+    "Marketplace": "marketplace",
+}
+
+# Display names for the benchmark metrics
+BENCHMARK_LABELS = {
+    "mrr_growth_rate": "MRR Growth %",
+    "churn_rate": "Churn %",
+    "cac_ltv_ratio": "CAC/LTV",
+    "runway_months": "Runway (months)",
+    "burn_rate_revenue_ratio": "Burn / Revenue",
+}
+
+# The prior stands in for this many observations, spread log-normally
+# (sigma in log space) around the published median
+PRIOR_POINTS = 100
+PRIOR_SIGMA = 0.5
+
+config_registry.register("benchmarks", BENCHMARKS_PATH, loader=load_csv_table)
+
+def load_benchmarks() -> Dict[str, Dict[str, float]]:
+    """Load metric -> segment -> median from benchmarks.csv (cached, reloaded when the file changes)."""
+    return config_registry.get("benchmarks")
+
+def prior_points(median: float, sigma: float = PRIOR_SIGMA, count: int = PRIOR_POINTS) -> np.ndarray:
+    """Evenly spaced quantiles of a log-normal distribution with the given median."""
+    if median <= 0:
+        return np.full(count, float(median))
+    normal = NormalDist()
+    z = np.array([normal.inv_cdf((i + 0.5) / count) for i in range(count)])
+    return median * np.exp(sigma * z)
+
+def benchmark_values(answers: Dict[str, Any], metrics: Dict[str, float]) -> Dict[str, float]:
+    """Turn a model's answers and metrics into benchmark metric values, skipping undefined ratios."""
+    values = {}
+    customers = answers.get("customers") or 0
+    if customers > 0:
+        values["mrr_growth_rate"] = (answers.get("new_customers") or 0) / customers * 100
+    if answers.get("churn_rate") is not None:
+        values["churn_rate"] = answers["churn_rate"]
+    if (metrics.get("ltv") or 0) > 0:
+        values["cac_ltv_ratio"] = (metrics.get("cac") or 0) / metrics["ltv"]
+    if metrics.get("runway") is not None:
+        values["runway_months"] = metrics["runway"]
+    if (metrics.get("mrr") or 0) > 0:
+        values["burn_rate_revenue_ratio"] = (metrics.get("burn_rate") or 0) / metrics["mrr"]
+    return values
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+class BenchmarkIndex:
+    """
+    Per-(metric, segment) benchmark distributions.
+
+    Only metrics and segments present in the table are tracked, so the
+    number of sketches is fixed. Segments may be given as table columns
+    (e.g. "saas_b2b") or wizard project types (e.g. "B2B SaaS").
+    """
+
+    def __init__(self, table: Mapping[str, Mapping[str, float]] = None, k: int = DEFAULT_K, seed: int = 0):
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._k = k
+        self._seed = seed
+        # Prior plus submissions (queried), submissions only, and the median each prior was seeded from
+        self._sketches: Dict[Tuple[str, str], KLLSketch] = {}
+        self._submitted: Dict[Tuple[str, str], KLLSketch] = {}
+        self._priors: Dict[Tuple[str, str], float] = {}
+        # Fingerprints of recent submissions, least recently seen first
+        self._fingerprints: "OrderedDict[str, None]" = OrderedDict()
+        self.max_fingerprints = DEFAULT_MAX_FINGERPRINTS
+        self.submissions = 0
+        self.state_path: Optional[str] = None
+        self.save_interval = DEFAULT_SAVE_INTERVAL_SECONDS
+        self._dirty = False
+        self._last_save = time.monotonic()
+        if table:
+            self.reseed(table)
+
+    @classmethod
+    def from_config(cls, k: int = DEFAULT_K) -> "BenchmarkIndex":
+        """Build from benchmarks.csv."""
+        return cls(load_benchmarks(), k)
+
+    def reseed(self, table: Mapping[str, Mapping[str, float]]) -> int:
+        """
+        Track exactly the pairs in `table`, seeding new pairs and pairs whose median changed.
+
+        A re-seeded pair keeps its submissions. Returns how many pairs were seeded.
+        """
+        wanted = {(metric, segment): float(median) for metric, row in table.items() for segment, median in row.items()}
+        seeded = 0
+        with self._lock:
+            for key in [key for key in self._sketches if key not in wanted]:
+                del self._sketches[key]
+                self._priors.pop(key, None)
+            for key, median in wanted.items():
+                if key in self._sketches and self._priors.get(key) == median:
+                    continue
+                sketch = KLLSketch(self._k, self._seed)
+                sketch.update_many(prior_points(median))
+                submitted = self._submitted.get(key)
+                if submitted is not None:
+                    sketch.merge(submitted)
+                self._sketches[key] = sketch
+                self._priors[key] = median
+                seeded += 1
+            if seeded:
+                self._dirty = True
+        return seeded
+
+    def _submitted_sketch(self, key: Tuple[str, str]) -> KLLSketch:
+        submitted = self._submitted.get(key)
+        if submitted is None:
+            submitted = self._submitted[key] = KLLSketch(self._k, self._seed)
+        return submitted
+
+    @staticmethod
+    def segment_key(segment: str) -> str:
+        return SEGMENTS.get(segment, segment)
+
+    def submit(self, segment: str, values: Mapping[str, float]) -> int:
+        """Record one anonymized submission; returns how many of its values were tracked."""
+        segment = self.segment_key(segment)
+        recorded = 0
+        with self._lock:
+            for metric, value in values.items():
+                sketch = self._sketches.get((metric, segment))
+                if sketch is None or value is None:
+                    continue
+                sketch.update(float(value))
+                self._submitted_sketch((metric, segment)).update(float(value))
+                recorded += 1
+            self.submissions += 1
+            self._dirty = True
+        self._autosave()
+        return recorded
+
+    def submit_once(self, segment: str, values: Mapping[str, float]) -> bool:
+        """
+        Submit unless a recent submission had the same segment and values.
+
+        Returns True if the submission was recorded. A changed model is
+        recorded again; sketches cannot forget the old values.
+        """
+        fingerprint = _digest(json.dumps([self.segment_key(segment), sorted(values.items())], default=str))
+        with self._lock:
+            if fingerprint in self._fingerprints:
+                self._fingerprints.move_to_end(fingerprint)
+                return False
+            self._fingerprints[fingerprint] = None
+            self._trim_fingerprints()
+        self.submit(segment, values)
+        return True
+
+    def _trim_fingerprints(self):
+        while len(self._fingerprints) > self.max_fingerprints:
+            self._fingerprints.popitem(last=False)
+
+    def submit_many(self, metric: str, segment: str, values: np.ndarray) -> bool:
+        """Fold a batch of one metric's values into its sketch; False if the pair is not tracked."""
+        key = (metric, self.segment_key(segment))
+        with self._lock:
+            sketch = self._sketches.get(key)
+            if sketch is None:
+                return False
+            sketch.update_many(values)
+            self._submitted_sketch(key).update_many(values)
+            self._dirty = True
+        self._autosave()
+        return True
+
+    def percentile(self, metric: str, segment: str, value: float) -> Optional[float]:
+        """Percentage (0-100) of the segment at or below `value`, or None for an untracked pair."""
+        with self._lock:
+            sketch = self._sketches.get((metric, self.segment_key(segment)))
+            return None if sketch is None else 100.0 * sketch.rank(value)
+
+    def percentiles(self, segment: str, values: Mapping[str, float]) -> Dict[str, float]:
+        """Percentile of each tracked metric value within the segment."""
+        result = {}
+        for metric, value in values.items():
+            percentile = self.percentile(metric, segment, value)
+            if percentile is not None:
+                result[metric] = percentile
+        return result
+
+    def quantile(self, metric: str, segment: str, q: float) -> Optional[float]:
+        """Value at quantile q (0-1) of the segment, or None for an untracked pair."""
+        with self._lock:
+            sketch = self._sketches.get((metric, self.segment_key(segment)))
+            return None if sketch is None else sketch.quantile(q)
+
+    def merge(self, other: "BenchmarkIndex"):
+        """
+        Fold another index's submissions (e.g. from another process) into this one.
+
+        Only submissions are merged; each index keeps its own prior. Pairs
+        this index does not track yet are tracked from then on, without a prior.
+        """
+        with self._lock:
+            for key, submitted in other._submitted.items():
+                self._submitted_sketch(key).merge(submitted)
+                if key in self._sketches:
+                    self._sketches[key].merge(submitted)
+                else:
+                    self._sketches[key] = KLLSketch.from_dict(submitted.to_dict())
+            self.submissions += other.submissions
+            self._fingerprints.update(other._fingerprints)
+            self._trim_fingerprints()
+            self._dirty = True
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "submissions": self.submissions,
+                "sketches": {f"{metric}/{segment}": sketch.to_dict()
+                             for (metric, segment), sketch in self._sketches.items()},
+                "submitted": {f"{metric}/{segment}": sketch.to_dict()
+                              for (metric, segment), sketch in self._submitted.items()},
+                "priors": {f"{metric}/{segment}": median for (metric, segment), median in self._priors.items()},
+                "fingerprints": list(self._fingerprints),
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], table: Mapping[str, Mapping[str, float]] = None) -> "BenchmarkIndex":
+        """Restore an index written by `to_dict`; with a `table`, re-seed pairs that are new or changed in it."""
+        index = cls()
+        index.submissions = data.get("submissions", 0)
+        for field, target in (("sketches", index._sketches), ("submitted", index._submitted)):
+            for key, sketch in data.get(field, {}).items():
+                metric, segment = key.split("/", 1)
+                target[(metric, segment)] = KLLSketch.from_dict(sketch)
+        for key, median in data.get("priors", {}).items():
+            metric, segment = key.split("/", 1)
+            index._priors[(metric, segment)] = median
+        index._fingerprints = OrderedDict.fromkeys(data.get("fingerprints", []))
+        index._trim_fingerprints()
+        if table is not None:
+            index.reseed(table)
+        return index
+
+    def save(self, path: str):
+        """Atomically write the sketches to a JSON file."""
+        with self._save_lock:
+            with self._lock:
+                self._dirty = False
+                self._last_save = time.monotonic()
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f)
+            os.replace(tmp_path, path)
+
+    def save_state(self):
+        """Write unsaved submissions to `state_path`, if one is set."""
+        if self.state_path and self._dirty:
+            try:
+                self.save(self.state_path)
+            except OSError as e:
+                self._dirty = True  # Retry on the next submission
+                print(f"Error saving benchmark state to {self.state_path}: {e}")
+
+    def _autosave(self):
+        if self.state_path and time.monotonic() - self._last_save >= self.save_interval:
+            self.save_state()
+
+    @classmethod
+    def load_state(cls, path: str, table: Mapping[str, Mapping[str, float]] = None) -> "BenchmarkIndex":
+        """Read sketches written by `save` (see `from_dict` for `table`)."""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f), table)
+
+_shared_index: Optional[BenchmarkIndex] = None
+_shared_index_lock = threading.Lock()
+
+def open_benchmark_index(path: str = DEFAULT_STATE_PATH) -> BenchmarkIndex:
+    """
+    Restore the index saved at `path`, or build it from benchmarks.csv; it saves back to `path`.
+
+    Pairs added to benchmarks.csv, or whose median changed, since the state
+    was saved are re-seeded from the current table.
+    """
+    index = None
+    if path and os.path.exists(path):
+        try:
+            index = BenchmarkIndex.load_state(path, load_benchmarks())
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading benchmark state from {path}: {e}")
+    if index is None:
+        index = BenchmarkIndex.from_config()
+    index.state_path = path or None
+    return index
+
+def get_benchmark_index() -> BenchmarkIndex:
+    """Return the process-wide benchmark index, restored from its saved state or benchmarks.csv on first use."""
+    global _shared_index
+    if _shared_index is None:
+        with _shared_index_lock:
+            if _shared_index is None:
+                _shared_index = open_benchmark_index()
+                atexit.register(_shared_index.save_state)
+    return _shared_index
@@ -4,7 +4,7 @@ Financial calculation formulas for Startup Financial OS MVP.
 This module contains the core financial metrics calculations used by the application.
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, Mapping
 
 def calc_mrr(inputs: Dict[str, float]) -> float:
     """Calculate Monthly Recurring Revenue."""
@@ -40,4 +40,33 @@ METRIC_FUNCS = {
     "runway": calc_runway,
     "burn_rate": calc_burn_rate,
     "ltv": calc_ltv,
-} 
\ No newline at end of file
+} 
+
+# Dependency graph used for incremental recomputation: each metric lists the
+# drivers and metrics it reads. Node functions read precomputed metrics
+# (e.g. `mrr`) instead of recalculating them.
+def _burn_rate_node(values: Mapping[str, float]) -> float:
+    """Burn rate from a precomputed MRR."""
+    return values["expenses_monthly"] - values["mrr"]
+
+def _runway_node(values: Mapping[str, float]) -> float:
+    """Runway from a precomputed burn rate."""
+    return values["cash_balance"] / max(values["burn_rate"], 1)
+
+METRIC_DEPS = {
+    "mrr": ["price", "customers"],
+    "churn": ["churn_rate"],
+    "cac": ["marketing_spend", "new_customers"],
+    "burn_rate": ["expenses_monthly", "mrr"],
+    "runway": ["cash_balance", "burn_rate"],
+    "ltv": ["price", "churn_rate"],
+}
+
+METRIC_NODES = {
+    "mrr": calc_mrr,
+    "churn": calc_churn,
+    "cac": calc_cac,
+    "burn_rate": _burn_rate_node,
+    "runway": _runway_node,
+    "ltv": calc_ltv,
+}
@@ -0,0 +1,180 @@
+"""
+Incremental metric recomputation for Startup Financial OS MVP.
+
+Metrics are evaluated over the dependency graph declared in `formulas.py`
+(METRIC_DEPS / METRIC_NODES). Shared intermediates such as MRR are computed
+once, and after a driver changes only the metrics downstream of it are
+recomputed, which keeps live wizard previews and what-if sliders cheap.
+"""
+
+from collections import ChainMap
+from typing import Dict, Any, List, Iterable, Mapping, Callable
+
+from .formulas import METRIC_FUNCS, METRIC_DEPS, METRIC_NODES
+
+# Errors that turn a metric into 0.0, matching SageAgent.calculate_model
+METRIC_ERRORS = (KeyError, ZeroDivisionError)
+
+
+def coerce_drivers(drivers: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert numeric strings to float and leave every other value untouched."""
+    processed_drivers = {}
+    for key, value in drivers.items():
+        if isinstance(value, str) and value.replace('.', '').replace('-', '').isdigit():
+            processed_drivers[key] = float(value)
+        else:
+            processed_drivers[key] = value
+    return processed_drivers
+
+
+class MetricGraph:
+    """Topologically ordered metric DAG with a reverse index of dependents."""
+
+    def __init__(self, nodes: Dict[str, Callable] = None, deps: Dict[str, List[str]] = None):
+        self.nodes = nodes or METRIC_NODES
+        self.deps = deps or METRIC_DEPS
+        self.order = self._topological_order()
+
+        # Input name (driver or metric) -> metrics that read it directly
+        self.dependents: Dict[str, List[str]] = {}
+        for metric in self.order:
+            for name in self.deps[metric]:
+                self.dependents.setdefault(name, []).append(metric)
+
+        self._rank = {metric: i for i, metric in enumerate(self.order)}
+        self._downstream_cache: Dict[frozenset, List[str]] = {}
+
+    def _topological_order(self) -> List[str]:
+        """Order metrics so every metric comes after the metrics it reads."""
+        order = []
+        state: Dict[str, str] = {}
+
+        def visit(metric: str):
+            if state.get(metric) == "done":
+                return
+            if state.get(metric) == "visiting":
+                raise ValueError(f"Metric dependency cycle at '{metric}'")
+            state[metric] = "visiting"
+            for name in self.deps[metric]:
+                if name in self.nodes:
+                    visit(name)
+            state[metric] = "done"
+            order.append(metric)
+
+        for metric in self.nodes:
+            visit(metric)
+        return order
+
+    @property
+    def drivers(self) -> List[str]:
+        """Driver names read by at least one metric."""
+        return [name for name in self.dependents if name not in self.nodes]
+
+    def downstream(self, names: Iterable[str]) -> List[str]:
+        """Return metrics affected by changes to `names`, in evaluation order."""
+        key = frozenset(names)
+        if key not in self._downstream_cache:
+            affected = set()
+            stack = list(key)
+            while stack:
+                for metric in self.dependents.get(stack.pop(), []):
+                    if metric not in affected:
+                        affected.add(metric)
+                        stack.append(metric)
+            self._downstream_cache[key] = sorted(affected, key=self._rank.__getitem__)
+        return self._downstream_cache[key]
+
+    def evaluate(self, values: Mapping[str, Any], metrics: Iterable[str] = None, failed: set = None) -> Dict[str, float]:
+        """
+        Evaluate `metrics` (default: all) in order, reading inputs from `values`.
+
+        A metric whose formula raises, or that reads a failed metric, is 0.0.
+        """
+        failed = set() if failed is None else failed
+        results: Dict[str, float] = {}
+        scope = ChainMap(results, values)
+
+        for metric in metrics if metrics is not None else self.order:
+            if any(name in failed for name in self.deps[metric]):
+                failed.add(metric)
+                results[metric] = 0.0
+                continue
+            try:
+                results[metric] = self.nodes[metric](scope)
+                failed.discard(metric)
+            except METRIC_ERRORS:
+                failed.add(metric)
+                results[metric] = 0.0
+        return results
+
+
+DEFAULT_GRAPH = MetricGraph()
+
+
+def evaluate_metrics(drivers: Dict[str, Any], graph: MetricGraph = None) -> Dict[str, float]:
+    """Calculate all metrics once each, reusing shared intermediates like MRR."""
+    graph = graph or DEFAULT_GRAPH
+    results = graph.evaluate(coerce_drivers(drivers))
+    return {name: results[name] for name in METRIC_FUNCS if name in results}
+
+
+class IncrementalModel:
+    """
+    Holds drivers and metrics for one model and recomputes only what changes.
+
+    Example:
+        model = IncrementalModel({"price": 50, "customers": 10})
+        model.update({"customers": 12})   # recomputes mrr, burn_rate, runway
+        model.what_if({"price": 60})      # preview without committing
+    """
+
+    def __init__(self, drivers: Dict[str, Any] = None, graph: MetricGraph = None):
+        self.graph = graph or DEFAULT_GRAPH
+        self.drivers: Dict[str, Any] = coerce_drivers(drivers or {})
+        self._failed: set = set()
+        self._values: Dict[str, float] = self.graph.evaluate(self.drivers, failed=self._failed)
+        self.evaluations = len(self.graph.order)
+
+    @property
+    def metrics(self) -> Dict[str, float]:
+        """Current metrics in METRIC_FUNCS order."""
+        return {name: self._values[name] for name in METRIC_FUNCS if name in self._values}
+
+    def _changed_keys(self, changes: Dict[str, Any]) -> List[str]:
+        return [key for key, value in changes.items()
+                if key not in self.drivers or self.drivers[key] != value]
+
+    def update(self, changes: Dict[str, Any]) -> Dict[str, float]:
+        """
+        Apply driver changes and recompute the affected metrics.
+
+        Returns:
+            Metrics whose value changed
+        """
+        changes = coerce_drivers(changes)
+        changed_keys = self._changed_keys(changes)
+        if not changed_keys:
+            return {}
+
+        self.drivers.update(changes)
+        affected = self.graph.downstream(changed_keys)
+        scope = ChainMap(self._values, self.drivers)
+        results = self.graph.evaluate(scope, affected, failed=self._failed)
+        self.evaluations += len(affected)
+
+        updated = {name: value for name, value in results.items() if self._values.get(name) != value}
+        self._values.update(results)
+        return updated
+
+    def what_if(self, changes: Dict[str, Any]) -> Dict[str, float]:
+        """Preview metrics for hypothetical driver changes without committing them."""
+        changes = coerce_drivers(changes)
+        changed_keys = self._changed_keys(changes)
+        if not changed_keys:
+            return self.metrics
+
+        affected = self.graph.downstream(changed_keys)
+        scope = ChainMap(self._values, changes, self.drivers)
+        results = self.graph.evaluate(scope, affected, failed=set(self._failed))
+        self.evaluations += len(affected)
+        return {**self.metrics, **{name: results[name] for name in METRIC_FUNCS if name in results}}
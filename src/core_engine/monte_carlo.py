@@ -0,0 +1,160 @@
+"""
+Monte Carlo runway simulation for Startup Financial OS MVP.
+
+Instead of the single deterministic `calc_runway` value, this module samples
+churn, growth and expense drift from configurable distributions, runs the
+month-by-month projection for every path and reports runway percentiles and
+the probability of running out of cash.
+
+Paths are drawn in fixed blocks of STREAM_SIZE, each with its own RNG stream
+spawned from one seed. Worker chunks are whole numbers of blocks, so results
+are reproducible regardless of the worker count or chunk size.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+from .formulas import calc_runway
+from .projection import PROJECTION_DRIVERS, _projection_columns, project_cash_batch
+
+# Sampling distributions per driver. `mean` defaults to the driver value and
+# `rel_std` is relative to it; `min`/`max` clip the samples.
+DEFAULT_DISTRIBUTIONS = {
+    "churn_rate": {"dist": "normal", "rel_std": 0.25, "min": 0, "max": 100},
+    "new_customers": {"dist": "normal", "rel_std": 0.30, "min": 0},
+    "expense_growth": {"dist": "normal", "mean": 0.0, "std": 1.0},
+}
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Paths per RNG stream; chunk sizes are rounded down to a multiple of this
+STREAM_SIZE = 1_000
+
+
+def sample_driver(rng: np.random.Generator, base: float, spec: Dict[str, Any], size: int) -> np.ndarray:
+    """
+    Draw `size` samples for one driver.
+
+    Supported `dist` values: normal, lognormal, uniform, triangular, fixed.
+    """
+    dist = spec.get("dist", "normal")
+    mean = spec.get("mean", base)
+
+    if dist == "normal":
+        std = spec.get("std", abs(mean) * spec.get("rel_std", 0.0))
+        samples = rng.normal(mean, std, size)
+    elif dist == "lognormal":
+        sigma = spec.get("sigma", 0.25)
+        samples = mean * rng.lognormal(-sigma ** 2 / 2, sigma, size)
+    elif dist == "uniform":
+        samples = rng.uniform(spec["low"], spec["high"], size)
+    elif dist == "triangular":
+        samples = rng.triangular(spec["low"], spec.get("mode", mean), spec["high"], size)
+    elif dist == "fixed":
+        samples = np.full(size, float(mean))
+    else:
+        raise ValueError(f"Unknown distribution '{dist}'")
+
+    if "min" in spec or "max" in spec:
+        samples = np.clip(samples, spec.get("min", -np.inf), spec.get("max", np.inf))
+    return samples
+
+
+def _simulate_chunk(
+    base: Dict[str, float],
+    distributions: Dict[str, Dict[str, Any]],
+    events: List[Dict[str, Any]],
+    months: int,
+    streams: List[Tuple[int, np.random.SeedSequence]],
+) -> np.ndarray:
+    """Simulate one chunk of (size, seed) path blocks and return their fractional runway."""
+    samples = {key: [] for key in distributions if key in PROJECTION_DRIVERS}
+    for size, seed in streams:
+        rng = np.random.default_rng(seed)
+        for key in PROJECTION_DRIVERS:
+            if key in samples:
+                samples[key].append(sample_driver(rng, base[key], distributions[key], size))
+
+    total = sum(size for size, _ in streams)
+    columns = {}
+    for key in PROJECTION_DRIVERS:
+        columns[key] = np.concatenate(samples[key]) if key in samples else np.full(total, base[key])
+
+    projection = project_cash_batch(columns, months=months, events=events, keep_series=False)
+    return projection["runway"]
+
+
+def simulate_runway(
+    drivers: Dict[str, Any],
+    n_paths: int = 100_000,
+    months: int = 36,
+    within_months: int = 12,
+    distributions: Dict[str, Dict[str, Any]] = None,
+    events: List[Dict[str, Any]] = None,
+    seed: int = 0,
+    workers: int = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """
+    Run a Monte Carlo runway simulation.
+
+    Args:
+        drivers: Wizard answers / drivers dict
+        n_paths: Number of simulated paths
+        months: Projection horizon (1-60 months)
+        within_months: Horizon for the out-of-cash probability
+        distributions: Per-driver sampling specs (defaults to DEFAULT_DISTRIBUTIONS)
+        events: Scheduled projection events shared by every path
+        seed: Root seed; the same seed always gives the same result
+        workers: Process pool size (defaults to the CPU count, 1 runs inline)
+        chunk_size: Paths per vectorized worker batch (whole RNG streams, at least one)
+
+    Returns:
+        Dictionary with `p10`, `p50` and `p90` runway in months (inf when cash
+        outlasts the horizon), `prob_out_of_cash` within `within_months`,
+        `mean_runway` over paths that ran out, and the deterministic
+        `point_estimate` from calc_runway
+    """
+    if n_paths < 1:
+        raise ValueError(f"n_paths must be positive, got {n_paths}")
+    if within_months > months:
+        raise ValueError(f"within_months ({within_months}) cannot exceed the horizon ({months})")
+
+    distributions = DEFAULT_DISTRIBUTIONS if distributions is None else distributions
+    base = {key: float(column[0]) for key, column in _projection_columns([drivers]).items()}
+
+    stream_sizes = [STREAM_SIZE] * (n_paths // STREAM_SIZE)
+    if n_paths % STREAM_SIZE:
+        stream_sizes.append(n_paths % STREAM_SIZE)
+    streams = list(zip(stream_sizes, np.random.SeedSequence(seed).spawn(len(stream_sizes))))
+    per_chunk = max(1, chunk_size // STREAM_SIZE)
+    chunks = [streams[i:i + per_chunk] for i in range(0, len(streams), per_chunk)]
+
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(chunks))
+    args = [(base, distributions, events, months, chunk) for chunk in chunks]
+
+    if workers <= 1:
+        results = [_simulate_chunk(*chunk_args) for chunk_args in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_simulate_chunk, *zip(*args)))
+
+    runway = np.concatenate(results)
+    p10, p50, p90 = np.quantile(runway, [0.1, 0.5, 0.9], method="inverted_cdf")
+    ran_out = np.isfinite(runway)
+
+    return {
+        "n_paths": n_paths,
+        "months": months,
+        "within_months": within_months,
+        "p10": float(p10),
+        "p50": float(p50),
+        "p90": float(p90),
+        "prob_out_of_cash": float(np.mean(runway <= within_months)),
+        "mean_runway": float(runway[ran_out].mean()) if ran_out.any() else float("inf"),
+        "point_estimate": calc_runway(base),
+    }
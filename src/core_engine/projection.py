@@ -0,0 +1,212 @@
+"""
+Month-by-month cash projection for Startup Financial OS MVP.
+
+The projection extends `calc_runway` from a single cash / burn ratio to a
+monthly simulation with customer churn and growth plus scheduled events:
+hires, price changes and funding rounds. Scenarios are simulated as NumPy
+columns, so many scenarios cost one vectorized loop over months.
+"""
+
+from typing import Dict, Any, List, Union
+
+import numpy as np
+
+from .batch import pack_drivers
+
+MAX_PROJECTION_MONTHS = 60
+
+# Drivers read by the projection; missing values default to 0
+PROJECTION_DRIVERS = [
+    "price",
+    "customers",
+    "churn_rate",
+    "new_customers",
+    "expenses_monthly",
+    "cash_balance",
+    "team_size",
+    "expense_growth",  # Monthly growth of expenses_monthly (%)
+]
+
+EVENT_TYPES = ["hire", "price_change", "funding"]
+
+
+def build_event_schedule(events: List[Dict[str, Any]], months: int) -> Dict[str, np.ndarray]:
+    """
+    Turn a list of scheduled events into per-month arrays.
+
+    Supported events (month is 1-based, events after the horizon are ignored):
+        {"month": 3, "type": "hire", "count": 2, "salary": 8000}
+        {"month": 6, "type": "price_change", "price": 75}
+        {"month": 9, "type": "funding", "amount": 500000}
+
+    Returns:
+        Dictionary with cumulative `hires` and `payroll`, per-month `funding`
+        and `price` (NaN where the price does not change)
+    """
+    hires = np.zeros(months)
+    payroll = np.zeros(months)
+    funding = np.zeros(months)
+    price = np.full(months, np.nan)
+
+    for event in events or []:
+        event_type = event.get("type")
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"Unknown projection event type '{event_type}'")
+
+        month = int(event["month"])
+        if month < 1:
+            raise ValueError(f"Event month must be 1 or later, got {month}")
+        if month > months:
+            continue
+
+        index = month - 1
+        if event_type == "hire":
+            count = event.get("count", 1)
+            hires[index] += count
+            payroll[index] += count * event["salary"]
+        elif event_type == "price_change":
+            price[index] = event["price"]
+        elif event_type == "funding":
+            funding[index] += event["amount"]
+
+    return {
+        "hires": np.cumsum(hires),
+        "payroll": np.cumsum(payroll),
+        "funding": funding,
+        "price": price,
+    }
+
+
+def _projection_columns(drivers: Union[Dict[str, Any], List[Dict[str, Any]]]) -> Dict[str, np.ndarray]:
+    """Normalize projection input to float columns with missing drivers set to 0."""
+    if isinstance(drivers, list):
+        columns = pack_drivers(drivers, PROJECTION_DRIVERS)
+    else:
+        columns = {}
+        size = None
+        for key in PROJECTION_DRIVERS:
+            if key in drivers:
+                columns[key] = np.atleast_1d(np.asarray(drivers[key], dtype=np.float64)).ravel()
+                size = columns[key].shape[0] if size is None else max(size, columns[key].shape[0])
+        size = size or 1
+        for key in PROJECTION_DRIVERS:
+            column = columns.get(key, np.zeros(1))
+            columns[key] = np.broadcast_to(column, (size,)).astype(np.float64)
+
+    return {key: np.nan_to_num(column, nan=0.0) for key, column in columns.items()}
+
+
+def project_cash_batch(
+    drivers: Union[Dict[str, Any], List[Dict[str, Any]]],
+    months: int = 24,
+    events: List[Dict[str, Any]] = None,
+    keep_series: bool = True,
+) -> Dict[str, np.ndarray]:
+    """
+    Project cash, MRR, customers and headcount for many scenarios at once.
+
+    Each month applies, in order: scheduled price changes, churn and new
+    customers, expense growth and payroll from hires, then funding and burn.
+    Burn follows `calc_burn_rate` (expenses_monthly minus MRR).
+
+    Args:
+        drivers: Mapping of driver name to scalar or array column, or a list
+            of drivers dicts (one per scenario)
+        months: Projection horizon (1-60 months)
+        events: Scheduled events shared by all scenarios (see build_event_schedule)
+        keep_series: Record the (scenarios, months) series; disable to keep
+            memory flat when only the zero-cash month is needed
+
+    Returns:
+        Dictionary with `zero_cash_month` (int, -1 if cash never runs out),
+        `runway` (fractional months, inf if cash never runs out) and, when
+        keep_series is set, `cash`, `mrr`, `customers` and `headcount` series
+    """
+    if not 1 <= months <= MAX_PROJECTION_MONTHS:
+        raise ValueError(f"Projection horizon must be 1-{MAX_PROJECTION_MONTHS} months, got {months}")
+
+    columns = _projection_columns(drivers)
+    schedule = build_event_schedule(events, months)
+    size = columns["cash_balance"].shape[0]
+
+    customers = columns["customers"].copy()
+    price = columns["price"].copy()
+    cash = columns["cash_balance"].copy()
+    retention = 1 - columns["churn_rate"] / 100
+    new_customers = columns["new_customers"]
+    base_expenses = columns["expenses_monthly"]
+    expense_drift = 1 + columns["expense_growth"] / 100
+    expense_factor = np.ones(size)
+
+    zero_cash_month = np.where(cash <= 0, 0, -1)
+    runway = np.where(cash <= 0, 0.0, np.inf)
+
+    if keep_series:
+        cash_series = np.empty((size, months))
+        mrr_series = np.empty((size, months))
+        customer_series = np.empty((size, months))
+
+    for month in range(months):
+        if not np.isnan(schedule["price"][month]):
+            price = np.full(size, schedule["price"][month])
+
+        customers = customers * retention + new_customers
+        expense_factor = expense_factor * expense_drift
+        mrr = customers * price
+        burn = base_expenses * expense_factor + schedule["payroll"][month] - mrr
+
+        available = cash + schedule["funding"][month]
+        cash = available - burn
+
+        ran_out = (zero_cash_month < 0) & (cash <= 0)
+        if ran_out.any():
+            zero_cash_month[ran_out] = month + 1
+            fraction = available[ran_out] / burn[ran_out]
+            runway[ran_out] = month + np.clip(fraction, 0.0, 1.0)
+
+        if keep_series:
+            cash_series[:, month] = cash
+            mrr_series[:, month] = mrr
+            customer_series[:, month] = customers
+
+    result = {
+        "zero_cash_month": zero_cash_month,
+        "runway": runway,
+    }
+    if keep_series:
+        result.update({
+            "months": np.arange(1, months + 1),
+            "cash": cash_series,
+            "mrr": mrr_series,
+            "customers": customer_series,
+            "headcount": columns["team_size"][:, None] + schedule["hires"][None, :],
+        })
+    return result
+
+
+def project_cash(drivers: Dict[str, Any], months: int = 24, events: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Project a single model month by month.
+
+    Args:
+        drivers: Wizard answers / drivers dict
+        months: Projection horizon (1-60 months)
+        events: Scheduled hires, price changes and funding rounds
+
+    Returns:
+        Dictionary with `months`, `cash`, `mrr`, `customers` and `headcount`
+        lists, plus `zero_cash_month` (None if cash lasts the whole horizon)
+        and fractional `runway`
+    """
+    projection = project_cash_batch([drivers], months=months, events=events)
+    zero_cash_month = int(projection["zero_cash_month"][0])
+
+    return {
+        "months": projection["months"].tolist(),
+        "cash": projection["cash"][0].tolist(),
+        "mrr": projection["mrr"][0].tolist(),
+        "customers": projection["customers"][0].tolist(),
+        "headcount": projection["headcount"][0].tolist(),
+        "zero_cash_month": zero_cash_month if zero_cash_month >= 0 else None,
+        "runway": float(projection["runway"][0]),
+    }
@@ -0,0 +1,133 @@
+"""
+Mergeable streaming quantile sketch (KLL) for Startup Financial OS MVP.
+
+A KLL sketch keeps a stack of compactors: an item on level h stands for
+2**h observations. When a level fills up it is sorted and every other item
+(starting at a random offset) is promoted to the next level, so memory stays
+around 3k items however many observations arrive, with a rank error of
+roughly 1.7 / k. Sketches built apart (other processes, other days) merge
+by pooling their levels and compacting.
+
+Queries use a sorted (value, cumulative weight) view built once per
+change, so a rank or quantile lookup is a binary search.
+"""
+
+import math
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+DEFAULT_K = 200
+
+# Each level below the top gets this fraction of the capacity of the one above
+_CAPACITY_DECAY = 2.0 / 3.0
+
+class KLLSketch:
+    """
+    Quantile sketch over a stream of floats.
+
+    Args:
+        k: Accuracy parameter; capacity of the top compactor
+        seed: Seed for the compaction coin flips
+    """
+
+    def __init__(self, k: int = DEFAULT_K, seed: Optional[int] = None):
+        self.k = max(2, int(k))
+        self.n = 0
+        self._levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+        self._view: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self._levels) - level - 1
+        return max(2, int(math.ceil(self.k * _CAPACITY_DECAY ** depth)))
+
+    def _size(self) -> int:
+        return sum(len(items) for items in self._levels)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(level) for level in range(len(self._levels)))
+
+    def _compress(self):
+        """Compact full levels until the sketch is back under its size budget."""
+        while self._size() >= self._max_size():
+            for level in range(len(self._levels)):
+                items = self._levels[level]
+                if len(items) < self._capacity(level):
+                    continue
+                if level + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+                # Keep the smallest item of an odd count; promote one of each remaining pair
+                items = np.sort(items)
+                odd = len(items) % 2
+                promoted = items[odd + int(self._rng.integers(2))::2]
+                self._levels[level + 1] = np.concatenate([self._levels[level + 1], promoted])
+                self._levels[level] = items[:odd]
+                if self._size() < self._max_size():
+                    break
+
+    def update(self, value: float):
+        """Add one observation (NaN is ignored)."""
+        self.update_many((value,))
+
+    def update_many(self, values: Union[np.ndarray, Iterable[float]]):
+        """Add many observations, compacting as they arrive so memory stays bounded."""
+        values = np.asarray(values if isinstance(values, np.ndarray) else list(values), dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        for start in range(0, len(values), self.k):
+            chunk = values[start:start + self.k]
+            self._levels[0] = np.concatenate([self._levels[0], chunk])
+            self.n += len(chunk)
+            self._compress()
+        self._view = None
+
+    def merge(self, other: "KLLSketch"):
+        """Fold another sketch's observations into this one."""
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0))
+        for level, items in enumerate(other._levels):
+            self._levels[level] = np.concatenate([self._levels[level], items])
+        self.n += other.n
+        self._compress()
+        self._view = None
+
+    def _sorted_view(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._view is None:
+            values = np.concatenate(self._levels)
+            weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self._levels)])
+            order = np.argsort(values, kind="stable")
+            self._view = (values[order], np.cumsum(weights[order]))
+        return self._view
+
+    def rank(self, value: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        """Estimated fraction of observations <= value (NaN for an empty sketch)."""
+        values, cumulative = self._sorted_view()
+        if len(values) == 0:
+            return np.full(np.shape(value), np.nan) if np.ndim(value) else float("nan")
+        index = np.searchsorted(values, value, side="right")
+        below = np.where(index > 0, cumulative[np.maximum(index - 1, 0)], 0.0)
+        result = below / cumulative[-1]
+        return result if np.ndim(value) else float(result)
+
+    def quantile(self, q: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        """Estimated value at quantile q in [0, 1] (NaN for an empty sketch)."""
+        values, cumulative = self._sorted_view()
+        if len(values) == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else float("nan")
+        index = np.searchsorted(cumulative, np.asarray(q) * cumulative[-1], side="left")
+        result = values[np.clip(index, 0, len(values) - 1)]
+        return result if np.ndim(q) else float(result)
+
+    def __len__(self) -> int:
+        """Number of items retained (not observations, see `n`)."""
+        return self._size()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"k": self.k, "n": self.n, "levels": [items.tolist() for items in self._levels]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], seed: Optional[int] = None) -> "KLLSketch":
+        sketch = cls(data.get("k", DEFAULT_K), seed)
+        sketch.n = int(data.get("n", 0))
+        sketch._levels = [np.asarray(items, dtype=np.float64) for items in data.get("levels", [[]])] or [np.empty(0)]
+        return sketch
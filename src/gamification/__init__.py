@@ -4,10 +4,23 @@ Gamification module for Startup Financial OS MVP.
 This module handles badges, progress tracking, and user engagement features.
 """
 
-from .badges import load_badges, check_badge_eligibility, award_badge
+from .badges import (load_badges, check_badge_eligibility, award_badge, get_user_badges, get_user_points,
+                     get_leaderboard_top, get_user_rank, BadgeEngine, get_badge_engine, build_badge_context,
+                     build_badge_context_batch)
+from .leaderboard import Leaderboard, get_leaderboard
 
 __all__ = [
     "load_badges",
     "check_badge_eligibility", 
-    "award_badge"
+    "award_badge",
+    "get_user_badges",
+    "get_user_points",
+    "get_leaderboard_top",
+    "get_user_rank",
+    "BadgeEngine",
+    "get_badge_engine",
+    "build_badge_context",
+    "build_badge_context_batch",
+    "Leaderboard",
+    "get_leaderboard"
 ] 
\ No newline at end of file
@@ -2,103 +2,226 @@
 Badges system for gamification module.
 """
 
-import yaml
 import os
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import List, Dict, Any, Iterable, Mapping, Optional, Set
+
+import numpy as np
+
+from ..infra.config import config_registry
+from ..infra.instrumentation import timed
+from ..infra.storage import get_storage
+from .leaderboard import get_leaderboard
+from ..wizard.expressions import CompiledCondition, compile_condition
+
+BADGES_PATH = os.path.join(os.path.dirname(__file__), 'badges.yml')
 
 def load_badges() -> List[Dict[str, Any]]:
-    """Load badges from badges.yml file."""
-    badges_path = os.path.join(os.path.dirname(__file__), 'badges.yml')
+    """Load badges from badges.yml file (cached, reloaded when the file changes)."""
+    return config_registry.get("badges")
+
+class BadgeEngine:
+    """
+    Compiled badge evaluator driven by the conditions in badges.yml.
+    
+    Keeps an inverted index from each variable to the badges that read it,
+    so a change to one metric re-evaluates only the affected badges.
+    """
+    
+    def __init__(self, badges: List[Dict[str, Any]]):
+        self.badges = badges
+        self.by_id: Dict[str, Dict[str, Any]] = {badge['id']: badge for badge in badges}
+        self.conditions: Dict[str, CompiledCondition] = {}
+        self.index: Dict[str, List[str]] = {}
+        
+        for badge in badges:
+            try:
+                condition = compile_condition(badge['condition'])
+            except (SyntaxError, ValueError) as e:
+                print(f"Error compiling badge {badge['id']}: {e}")
+                continue
+            self.conditions[badge['id']] = condition
+            for name in condition.variables:
+                self.index.setdefault(name, []).append(badge['id'])
+    
+    def affected_badges(self, changed: Iterable[str]) -> Set[str]:
+        """Return IDs of badges whose condition reads any of the changed variables."""
+        affected = set()
+        for name in changed:
+            affected.update(self.index.get(name, ()))
+        return affected
+    
+    def _earned(self, badge_ids: Iterable[str], context: Mapping[str, Any]) -> Set[str]:
+        earned = set()
+        for badge_id in badge_ids:
+            try:
+                if self.conditions[badge_id].evaluate(context):
+                    earned.add(badge_id)
+            except Exception as e:
+                # Log error but continue with other badges
+                print(f"Error evaluating badge {badge_id}: {e}")
+        return earned
+    
+    @timed("badge_evaluation_seconds", "Badge condition evaluation", mode="full")
+    def evaluate(self, context: Mapping[str, Any]) -> List[Dict[str, Any]]:
+        """Return all badges earned for the context, in badges.yml order."""
+        earned = self._earned(self.conditions, context)
+        return [badge for badge in self.badges if badge['id'] in earned]
+    
+    @timed("badge_evaluation_seconds", mode="incremental")
+    def update(self, context: Mapping[str, Any], changed: Iterable[str], earned: Set[str]) -> Set[str]:
+        """
+        Re-evaluate only the badges that read a changed variable.
+        
+        Args:
+            context: Current evaluation context
+            changed: Names of variables that changed since `earned` was computed
+            earned: Previously earned badge IDs
+            
+        Returns:
+            Updated set of earned badge IDs
+        """
+        affected = self.affected_badges(changed)
+        return (set(earned) - affected) | self._earned(affected, context)
+    
+    def evaluate_changes(self, previous: Mapping[str, Any], context: Mapping[str, Any], earned: Set[str]) -> Set[str]:
+        """Diff two contexts and re-evaluate only the badges affected by the difference."""
+        changed = [key for key in set(previous) | set(context) if previous.get(key) != context.get(key)]
+        return self.update(context, changed, earned)
+    
+    @timed("badge_evaluation_seconds", mode="bulk")
+    def evaluate_bulk(self, columns: Mapping[str, Any], size: int = None) -> Dict[str, np.ndarray]:
+        """
+        Evaluate every badge for many users at once.
+        
+        Args:
+            columns: Mapping of variable name to array (one row per user)
+            size: Number of users, required only if no badge variable is present
+            
+        Returns:
+            Dictionary of badge ID to boolean eligibility mask
+        """
+        if size is None:
+            size = next((len(column) for column in columns.values()), 0)
+        return {badge_id: condition.evaluate_batch(columns, size) for badge_id, condition in self.conditions.items()}
+    
+    def points_bulk(self, columns: Mapping[str, Any], size: int = None) -> np.ndarray:
+        """Return total eligible badge points per user for a columnar batch."""
+        masks = self.evaluate_bulk(columns, size)
+        points = np.zeros(next(iter(masks.values())).shape[0] if masks else (size or 0))
+        for badge_id, mask in masks.items():
+            points += mask * self.by_id[badge_id].get('points', 0)
+        return points
+
+config_registry.register("badges", BADGES_PATH, indexes={
+    "by_id": lambda badges: {badge['id']: badge for badge in badges},
+    "engine": BadgeEngine,
+})
+
+def get_badge_engine() -> BadgeEngine:
+    """Return the badge engine built once per load of badges.yml."""
+    return config_registry.index("badges", "engine")
+
+def build_badge_context(metrics: Dict[str, float], answers: Dict[str, Any], **extra: Any) -> Dict[str, Any]:
+    """
+    Build the variables badge conditions read from metrics and wizard answers.
+    
+    Derives `revenue`, `cac_ltv_ratio` and `growth_rate`; extra keyword
+    arguments (e.g. quality_score, wizard_completed) are added as-is.
+    """
+    context = {**answers, **metrics}
+    
+    revenue = answers.get("revenue_monthly") or metrics.get("mrr", 0)
+    if isinstance(revenue, (int, float)) and revenue > 0:
+        context["revenue"] = revenue
+    
+    ltv = metrics.get("ltv", 0)
+    if ltv > 0:
+        context["cac_ltv_ratio"] = metrics.get("cac", 0) / ltv
+    
+    customers = answers.get("customers", 0)
+    if isinstance(customers, (int, float)) and customers > 0:
+        context["growth_rate"] = answers.get("new_customers", 0) / customers * 100
+    
+    context.update(extra)
+    return context
+
+def build_badge_context_batch(metrics: Mapping[str, Any], answers: Mapping[str, Any], size: int = None,
+                              **extra: Any) -> Dict[str, np.ndarray]:
+    """
+    Columnar `build_badge_context` for a whole portfolio.
+    
+    Derived variables are NaN on rows where the scalar version leaves them
+    out, which condition evaluation treats as missing.
+    """
+    context = {key: np.asarray(value, dtype=np.float64) for key, value in {**answers, **metrics}.items()}
+    if size is None:
+        size = next((len(column) for column in context.values()), 0)
+    
+    def column(values: Mapping[str, Any], key: str) -> np.ndarray:
+        if key not in values:
+            return np.zeros(size)
+        return np.nan_to_num(np.asarray(values[key], dtype=np.float64), nan=0.0)
     
-    with open(badges_path, 'r', encoding='utf-8') as f:
-        badges = yaml.safe_load(f)
+    revenue_monthly = column(answers, "revenue_monthly")
+    revenue = np.where(revenue_monthly != 0, revenue_monthly, column(metrics, "mrr"))
+    ltv, customers = column(metrics, "ltv"), column(answers, "customers")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        context["revenue"] = np.where(revenue > 0, revenue, np.nan)
+        context["cac_ltv_ratio"] = np.where(ltv > 0, column(metrics, "cac") / ltv, np.nan)
+        context["growth_rate"] = np.where(customers > 0, column(answers, "new_customers") / customers * 100, np.nan)
     
-    return badges
+    context.update(extra)
+    return context
 
 def check_badge_eligibility(user_metrics: Dict[str, float], user_actions: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Check which badges a user is eligible for."""
-    badges = load_badges()
-    eligible_badges = []
-    
     # Create context for badge evaluation
     context = {**user_metrics, **user_actions}
     
-    for badge in badges:
-        condition = badge['condition']
-        
-        try:
-            if evaluate_badge_condition(condition, context):
-                eligible_badges.append(badge)
-        except Exception as e:
-            # Log error but continue with other badges
-            print(f"Error evaluating badge {badge['id']}: {e}")
-    
-    return eligible_badges
+    return get_badge_engine().evaluate(context)
 
 def award_badge(user_id: str, badge_id: str) -> Dict[str, Any]:
     """Award a badge to a user."""
-    badges = load_badges()
-    
-    for badge in badges:
-        if badge['id'] == badge_id:
-            # In a real implementation, this would save to a database
-            return {
-                "user_id": user_id,
-                "badge": badge,
-                "awarded_at": "2025-01-XX",  # Would be actual timestamp
-                "points_earned": badge.get('points', 0)
-            }
+    badge = config_registry.index("badges", "by_id").get(badge_id)
+    
+    if badge is not None:
+        # Persisted by the storage write-behind queue; repeat awards are ignored
+        awarded_at = datetime.now().isoformat()
+        get_storage().award_badge(user_id, badge_id, badge.get('points', 0), awarded_at)
+        return {
+            "user_id": user_id,
+            "badge": badge,
+            "awarded_at": awarded_at,
+            "points_earned": badge.get('points', 0)
+        }
     
     raise ValueError(f"Badge with ID '{badge_id}' not found")
 
 def evaluate_badge_condition(condition: str, context: Dict[str, Any]) -> bool:
     """Evaluate a badge condition against the context."""
-    # Simple condition evaluator for MVP
-    # Similar to sanity_rules.evaluate_condition but for badge conditions
-    
-    # Replace variable names with values
-    for key, value in context.items():
-        if isinstance(value, (int, float, bool)):
-            condition = condition.replace(key, str(value))
-    
-    # Simple evaluation for common patterns
-    if '==' in condition:
-        parts = condition.split('==')
-        if len(parts) == 2:
-            left = parts[0].strip()
-            right = parts[1].strip()
-            return left == right
-    
-    elif '>=' in condition:
-        parts = condition.split('>=')
-        if len(parts) == 2:
-            try:
-                left = float(parts[0].strip())
-                right = float(parts[1].strip())
-                return left >= right
-            except ValueError:
-                return False
-    
-    elif '<=' in condition:
-        parts = condition.split('<=')
-        if len(parts) == 2:
-            try:
-                left = float(parts[0].strip())
-                right = float(parts[1].strip())
-                return left <= right
-            except ValueError:
-                return False
-    
-    return False
+    try:
+        return compile_condition(condition).evaluate(context)
+    except (SyntaxError, ValueError):
+        return False
 
 def get_user_badges(user_id: str) -> List[Dict[str, Any]]:
     """Get all badges awarded to a user."""
-    # In a real implementation, this would query a database
-    # For MVP, return empty list
-    return []
+    by_id = config_registry.index("badges", "by_id")
+    return [
+        {**by_id[award["badge_id"]], "awarded_at": award["awarded_at"]}
+        for award in get_storage().get_badge_awards(user_id)
+        if award["badge_id"] in by_id
+    ]
 
 def get_user_points(user_id: str) -> int:
     """Get total points earned by a user."""
-    # In a real implementation, this would query a database
-    # For MVP, return 0
-    return 0 
\ No newline at end of file
+    return get_storage().get_user_points(user_id)
+
+def get_leaderboard_top(k: int = 10) -> List[Dict[str, Any]]:
+    """Get the k highest-scoring users with their points and rank."""
+    return get_leaderboard().top(k)
+
+def get_user_rank(user_id: str) -> Optional[int]:
+    """Get a user's leaderboard rank (1 = most points), or None without awards."""
+    return get_leaderboard().rank(user_id)
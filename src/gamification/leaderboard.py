@@ -0,0 +1,61 @@
+"""
+Leaderboard for gamification module.
+
+Point totals live in the storage `user_points` table, maintained by trigger
+as awards are appended to the badge ledger and indexed by points. Top-k is
+an index scan and a user's rank counts the users above them with a range
+scan of the same index, so neither touches the ledger, and every process
+(app sessions, the portfolio runner) sees the same committed ranking.
+"""
+
+import threading
+from typing import Dict, Any, List, Optional
+
+from ..infra.storage import Storage, get_storage
+
+class Leaderboard:
+    """
+    Ranking of users by total badge points, read from the storage index.
+
+    Ties share a rank (1 + number of users with strictly more points) and
+    are listed by user ID.
+
+    Args:
+        storage: Storage to read; defaults to the process-wide storage
+    """
+
+    def __init__(self, storage: Optional[Storage] = None):
+        self._storage = storage
+
+    @property
+    def storage(self) -> Storage:
+        return self._storage if self._storage is not None else get_storage()
+
+    def top(self, k: int = 10) -> List[Dict[str, Any]]:
+        """Return the k highest-scoring users with their points and rank."""
+        entries = []
+        for position, (user_id, points) in enumerate(self.storage.get_top_users(max(0, k))):
+            # Sorted by points, so everyone with more points is already listed
+            rank = entries[-1]["rank"] if entries and entries[-1]["points"] == points else position + 1
+            entries.append({"user_id": user_id, "points": points, "rank": rank})
+        return entries
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """Return the user's rank, or None if they have no awards."""
+        return self.storage.get_user_rank(user_id)
+
+    def points(self, user_id: str) -> int:
+        """Return the user's total points (0 if they have no awards)."""
+        return self.storage.get_user_points(user_id)
+
+_shared_leaderboard: Optional[Leaderboard] = None
+_shared_leaderboard_lock = threading.Lock()
+
+def get_leaderboard() -> Leaderboard:
+    """Return the process-wide leaderboard over the shared storage."""
+    global _shared_leaderboard
+    if _shared_leaderboard is None:
+        with _shared_leaderboard_lock:
+            if _shared_leaderboard is None:
+                _shared_leaderboard = Leaderboard()
+    return _shared_leaderboard
@@ -4,9 +4,25 @@ Infrastructure module for Startup Financial OS MVP.
 This module contains logging, database, and infrastructure utilities.
 """
 
-from .logging_conf import setup_logging, get_logger
+from .logging_conf import setup_logging, shutdown_logging, get_logger
+from .config import ConfigRegistry, config_registry
+from .bundle import write_bundle, read_bundle
+from .storage import Storage, get_storage
+from .instrumentation import MetricsRegistry, metrics_registry, timed, start_metrics_server, write_metrics_file
 
 __all__ = [
     "setup_logging",
-    "get_logger"
+    "shutdown_logging",
+    "get_logger",
+    "ConfigRegistry",
+    "config_registry",
+    "write_bundle",
+    "read_bundle",
+    "Storage",
+    "get_storage",
+    "MetricsRegistry",
+    "metrics_registry",
+    "timed",
+    "start_metrics_server",
+    "write_metrics_file"
 ] 
\ No newline at end of file
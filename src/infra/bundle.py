@@ -0,0 +1,101 @@
+"""
+Precompiled config bundle for fast cold start.
+
+`scripts/build_config_bundle.sh` parses every config source (wizard YAML,
+badges.yml, benchmarks.csv) once and writes a single versioned marshal blob
+with a SHA-256 of each source file. At runtime the bundle is read in one go;
+any entry whose source hash no longer matches falls back to parsing the
+source file.
+"""
+
+import glob
+import hashlib
+import marshal
+import os
+import sys
+from typing import Dict, Any, List, Optional
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUNDLE_PATH = os.path.join(SRC_DIR, 'config_bundle.bin')
+
+BUNDLE_MAGIC = b"SFOSCFG\x00"
+BUNDLE_VERSION = 1
+
+def bundle_sources() -> Dict[str, str]:
+    """Return registry name -> source path for every bundled config file."""
+    sources = {}
+    for path in sorted(glob.glob(os.path.join(SRC_DIR, 'wizard', '*.yml'))):
+        sources[os.path.splitext(os.path.basename(path))[0]] = path
+    sources["badges"] = os.path.join(SRC_DIR, 'gamification', 'badges.yml')
+    sources["benchmarks"] = os.path.join(SRC_DIR, 'core_engine', 'benchmarks.csv')
+    return sources
+
+def file_sha256(path: str) -> str:
+    """Return the hex SHA-256 of a file's bytes."""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def build_bundle(sources: Dict[str, str] = None) -> Dict[str, Any]:
+    """Parse all sources and return the bundle payload."""
+    from .config import load_csv_table, load_yaml
+
+    entries = {}
+    for name, path in (sources or bundle_sources()).items():
+        loader = load_csv_table if path.endswith('.csv') else load_yaml
+        entries[name] = {
+            "source": os.path.relpath(path, SRC_DIR),
+            "sha256": file_sha256(path),
+            "data": loader(path),
+        }
+
+    return {
+        "version": BUNDLE_VERSION,
+        "python": list(sys.version_info[:2]),
+        "entries": entries,
+    }
+
+def write_bundle(path: str = DEFAULT_BUNDLE_PATH, sources: Dict[str, str] = None) -> Dict[str, Any]:
+    """Build the bundle and write it atomically to `path`."""
+    payload = build_bundle(sources)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(BUNDLE_MAGIC + marshal.dumps(payload))
+    os.replace(tmp_path, path)
+    return payload
+
+def read_bundle(path: str = DEFAULT_BUNDLE_PATH) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Read bundle entries in one read.
+
+    Returns:
+        Registry name -> {"source", "sha256", "data"}, or None if the bundle is
+        missing, corrupt, or built for another bundle/Python version
+    """
+    try:
+        with open(path, 'rb') as f:
+            blob = f.read()
+    except OSError:
+        return None
+
+    if not blob.startswith(BUNDLE_MAGIC):
+        return None
+    try:
+        payload = marshal.loads(blob[len(BUNDLE_MAGIC):])
+    except (EOFError, ValueError, TypeError):
+        return None
+
+    if payload.get("version") != BUNDLE_VERSION or payload.get("python") != list(sys.version_info[:2]):
+        return None
+    return payload["entries"]
+
+def main(argv: List[str] = None):
+    """Build the bundle; the optional first argument overrides the output path."""
+    argv = sys.argv[1:] if argv is None else argv
+    output = argv[0] if argv else DEFAULT_BUNDLE_PATH
+    bundle = write_bundle(output)
+    for name, entry in bundle["entries"].items():
+        print(f"{name:<15} {entry['sha256'][:12]}  {entry['source']}")
+    print(f"Wrote {len(bundle['entries'])} configs to {output}")
+
+if __name__ == "__main__":
+    main()
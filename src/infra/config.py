@@ -0,0 +1,165 @@
+"""
+Process-wide configuration registry for Startup Financial OS MVP.
+
+Each config file (questions, tips, rules, badges) is parsed once and cached
+together with prebuilt lookup indexes. A file is re-parsed only when its
+mtime changes, so config edits hot-reload without paying for disk I/O and
+YAML parsing on every call or Streamlit rerun.
+
+When a precompiled bundle (see `bundle.py`) is present, configs are served
+from it as long as the source file's SHA-256 still matches.
+
+Returned data and indexes are shared across callers and must be treated as
+read-only.
+"""
+
+import csv
+import hashlib
+import os
+import threading
+from typing import Dict, Any, Callable
+
+import yaml
+
+from .bundle import DEFAULT_BUNDLE_PATH, read_bundle
+from .instrumentation import metrics_registry
+
+def load_yaml(path: str) -> Any:
+    """Parse a YAML file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+def load_csv_table(path: str) -> Dict[str, Dict[str, float]]:
+    """Parse a CSV table keyed by its first column, with numeric cells as floats."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        table = {}
+        for row in reader:
+            if row:
+                table[row[0]] = {column: float(value) for column, value in zip(header[1:], row[1:])}
+    return table
+
+_CONFIG_CACHE_HITS = metrics_registry.counter("cache_requests_total", "Cache lookups by cache and result",
+                                              cache="config", result="hit")
+_CONFIG_CACHE_MISSES = metrics_registry.counter("cache_requests_total", cache="config", result="miss")
+
+class _ConfigEntry:
+    """One registered config file with its parsed data and indexes."""
+
+    def __init__(self, path: str, loader: Callable[[str], Any], indexes: Dict[str, Callable[[Any], Any]]):
+        self.path = path
+        self.loader = loader
+        self.index_builders = indexes
+        self.mtime_ns = None
+        self.data = None
+        self.indexes: Dict[str, Any] = {}
+        self.loads = 0
+        self.bundle_hits = 0
+
+class ConfigRegistry:
+    """Registry of config files with mtime-based hot reload and lookup indexes."""
+
+    def __init__(self):
+        self._entries: Dict[str, _ConfigEntry] = {}
+        self._bundle: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+
+    def load_bundle(self, path: str = DEFAULT_BUNDLE_PATH) -> bool:
+        """Use a precompiled bundle for registered configs; returns False if unusable."""
+        entries = read_bundle(path)
+        with self._lock:
+            self._bundle = entries or {}
+        return entries is not None
+
+    def register(self, name: str, path: str, loader: Callable[[str], Any] = load_yaml,
+                 indexes: Dict[str, Callable[[Any], Any]] = None):
+        """
+        Register a config file under `name`.
+
+        Args:
+            name: Registry key, e.g. "questions"
+            path: Path to the file
+            loader: Function parsing the file into data (defaults to YAML)
+            indexes: Index name -> builder called with the parsed data after
+                every (re)load
+        """
+        with self._lock:
+            existing = self._entries.get(name)
+            if existing and existing.path == path and existing.loader is loader:
+                existing.index_builders.update(indexes or {})
+                existing.mtime_ns = None  # Rebuild indexes on next access
+                return
+            self._entries[name] = _ConfigEntry(path, loader, dict(indexes or {}))
+
+    def add_index(self, name: str, index_name: str, builder: Callable[[Any], Any]):
+        """Attach an extra index to an already registered config."""
+        with self._lock:
+            entry = self._entry(name)
+            entry.index_builders[index_name] = builder
+            if entry.data is not None:
+                entry.indexes[index_name] = builder(entry.data)
+
+    def _entry(self, name: str) -> _ConfigEntry:
+        try:
+            return self._entries[name]
+        except KeyError:
+            raise ValueError(f"Config '{name}' is not registered") from None
+
+    def _fresh(self, name: str) -> _ConfigEntry:
+        """Return the entry, reloading it first if the file changed on disk."""
+        entry = self._entry(name)
+        mtime_ns = os.stat(entry.path).st_mtime_ns
+        if entry.mtime_ns != mtime_ns:
+            with self._lock:
+                if entry.mtime_ns != mtime_ns:
+                    _CONFIG_CACHE_MISSES.inc()
+                    with metrics_registry.histogram("config_load_seconds", "Config parse and index build",
+                                                    config=name).time():
+                        data = self._load(name, entry)
+                        entry.indexes = {index_name: builder(data)
+                                         for index_name, builder in entry.index_builders.items()}
+                    entry.data = data
+                    entry.mtime_ns = mtime_ns
+                    entry.loads += 1
+                    return entry
+        _CONFIG_CACHE_HITS.inc()
+        return entry
+
+    def _load(self, name: str, entry: _ConfigEntry) -> Any:
+        """Load from the bundle when the source hash matches, else parse the source."""
+        bundled = self._bundle.get(name)
+        if bundled is not None:
+            with open(entry.path, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            if digest == bundled["sha256"]:
+                entry.bundle_hits += 1
+                return bundled["data"]
+        return entry.loader(entry.path)
+
+    def get(self, name: str) -> Any:
+        """Return the parsed config data."""
+        return self._fresh(name).data
+
+    def index(self, name: str, index_name: str) -> Any:
+        """Return a prebuilt index for the config."""
+        entry = self._fresh(name)
+        try:
+            return entry.indexes[index_name]
+        except KeyError:
+            raise ValueError(f"Config '{name}' has no index '{index_name}'") from None
+
+    def load_count(self, name: str) -> int:
+        """Number of times the config has been (re)loaded from its source or the bundle."""
+        return self._entry(name).loads
+
+    def invalidate(self, name: str = None):
+        """Force a reload on next access (all configs if name is None)."""
+        with self._lock:
+            for key, entry in self._entries.items():
+                if name is None or key == name:
+                    entry.mtime_ns = None
+
+# Shared registry used by the wizard and gamification modules
+config_registry = ConfigRegistry()
+config_registry.load_bundle(os.getenv("CONFIG_BUNDLE_PATH", DEFAULT_BUNDLE_PATH))
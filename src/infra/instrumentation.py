@@ -0,0 +1,264 @@
+"""
+In-process metrics for Startup Financial OS MVP.
+
+Hot paths record timing histograms and counters (including cache hits and
+misses) into the shared `metrics_registry`. The registry renders the
+Prometheus text format, served at `/metrics` by `start_metrics_server` or
+written to a file with `write_metrics_file`.
+
+Recording is off unless METRICS_ENABLED is set; disabled, an instrumented
+call costs one attribute check.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+
+DEFAULT_METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+# No metrics endpoint unless a port is configured
+DEFAULT_METRICS_PORT = int(os.environ["METRICS_PORT"]) if os.getenv("METRICS_PORT") else None
+DEFAULT_METRICS_FILE = os.getenv("METRICS_FILE", "metrics.prom")
+
+# Seconds; spans in-memory lookups (~100 us) up to slow API calls
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Counter:
+    """Monotonic count for one label set."""
+
+    def __init__(self, registry: "MetricsRegistry", labels: Tuple[Tuple[str, str], ...]):
+        self._registry = registry
+        self.labels = labels
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+class Histogram:
+    """Bucketed distribution of observed values for one label set."""
+
+    def __init__(self, registry: "MetricsRegistry", labels: Tuple[Tuple[str, str], ...], buckets: Tuple[float, ...]):
+        self._registry = registry
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        if not self._registry.enabled:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the duration of the `with` block in seconds."""
+        if not self._registry.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+class _Family:
+    def __init__(self, name: str, kind: str, help_text: str):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.series: Dict[Tuple[Tuple[str, str], ...], Any] = {}
+
+class MetricsRegistry:
+    """
+    Named counters and histograms, each with any number of label sets.
+
+    Look series up once (e.g. at import) and keep the returned object;
+    recording on it is then a flag check plus a locked add.
+    """
+
+    def __init__(self, enabled: bool = DEFAULT_METRICS_ENABLED):
+        self.enabled = enabled
+        self._families: Dict[str, _Family] = {}
+        self._lock = threading.Lock()
+
+    def _series(self, name: str, kind: str, help_text: str, labels: Dict[str, str], factory: Callable):
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = _Family(name, kind, help_text)
+            elif family.kind != kind:
+                raise ValueError(f"Metric '{name}' is already registered as a {family.kind}")
+            key = _label_key(labels)
+            series = family.series.get(key)
+            if series is None:
+                series = family.series[key] = factory(key)
+            return series
+
+    def counter(self, name: str, help_text: str = "", **labels: str) -> Counter:
+        """Return the counter for this name and label set, creating it on first use."""
+        return self._series(name, "counter", help_text, labels, lambda key: Counter(self, key))
+
+    def histogram(self, name: str, help_text: str = "", buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+                  **labels: str) -> Histogram:
+        """Return the histogram for this name and label set, creating it on first use."""
+        return self._series(name, "histogram", help_text, labels,
+                            lambda key: Histogram(self, key, buckets))
+
+    def hit_ratio(self, cache: str) -> Optional[float]:
+        """Share of hits among `cache_requests_total` for one cache, or None before any lookup."""
+        family = self._families.get("cache_requests_total")
+        if family is None:
+            return None
+        hits = misses = 0.0
+        for labels, series in list(family.series.items()):
+            values = dict(labels)
+            if values.get("cache") == cache:
+                if values.get("result") == "hit":
+                    hits += series.value
+                else:
+                    misses += series.value
+        return hits / (hits + misses) if hits + misses else None
+
+    def render_prometheus(self) -> str:
+        """Render every series in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            families = sorted(self._families.values(), key=lambda family: family.name)
+            snapshot = [(family, sorted(family.series.items())) for family in families]
+        for family, series_items in snapshot:
+            if family.help:
+                lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for labels, series in series_items:
+                if family.kind == "counter":
+                    lines.append(f"{family.name}{_format_labels(labels)} {_format_number(series.value)}")
+                    continue
+                with series._lock:
+                    counts, total, count = list(series.counts), series.sum, series.count
+                cumulative = 0
+                for bound, bucket_count in zip(series.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{family.name}_bucket{_format_labels(labels, (('le', le),))} {cumulative}")
+                lines.append(f"{family.name}_sum{_format_labels(labels)} {_format_number(total)}")
+                lines.append(f"{family.name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Drop all recorded values (series objects held by callers keep working)."""
+        with self._lock:
+            for family in self._families.values():
+                for series in family.series.values():
+                    with series._lock:
+                        if family.kind == "counter":
+                            series.value = 0.0
+                        else:
+                            series.counts = [0] * len(series.counts)
+                            series.sum = 0.0
+                            series.count = 0
+
+# Shared registry used by the instrumented modules
+metrics_registry = MetricsRegistry()
+
+def timed(name: str, help_text: str = "", **labels: str) -> Callable:
+    """Decorator recording each call's duration into a histogram."""
+    def decorator(fn: Callable) -> Callable:
+        histogram = metrics_registry.histogram(name, help_text, **labels)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not metrics_registry.enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def write_metrics_file(path: str = None, registry: MetricsRegistry = None) -> str:
+    """Atomically write the Prometheus text to a file (e.g. for node_exporter's textfile collector)."""
+    path = path or DEFAULT_METRICS_FILE
+    registry = registry or metrics_registry
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(registry.render_prometheus())
+    os.replace(tmp_path, path)
+    return path
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+def start_metrics_server(port: int = None, host: str = "127.0.0.1",
+                         registry: MetricsRegistry = None) -> Optional[ThreadingHTTPServer]:
+    """
+    Serve `/metrics` from a background thread, once per process.
+
+    Returns the server, or None when no port is given or configured
+    (port 0 picks a free port).
+    """
+    global _server
+    port = DEFAULT_METRICS_PORT if port is None else port
+    if _server is not None or port is None:
+        return _server
+    with _server_lock:
+        if _server is None:
+            server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            server.daemon_threads = True
+            server.registry = registry or metrics_registry
+            threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+            _server = server
+    return _server
+
+def stop_metrics_server():
+    """Stop the metrics server if it is running."""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            _server.shutdown()
+            _server.server_close()
+            _server = None
@@ -0,0 +1,337 @@
+"""
+Offline queries over the interaction and feedback logs.
+
+Reads `logs/sage.log` and its rotated backups oldest first, memory-mapping
+each file and parsing only complete lines past the last saved offset.
+Offsets are keyed by inode, so a rotated (renamed) file resumes where it
+stopped and is never read twice. Aggregates are kept incrementally and
+saved with the offsets, so a rerun only pays for new lines.
+
+Queries:
+    actions   Actions per day
+    ratings   Advice rating ratio by priority
+    funnel    Per-user progress through the wizard, and the overall funnel
+
+Feedback is rated under the priority it was logged with, or else the
+priority of the agent interaction that logged the same `advice_id`.
+
+Both the JSON lines written by `logging_conf` and the older
+"User action: {...}" repr lines are understood. Sampled events are
+weighted by 1 / sample_rate. `--compact` writes user actions to a columnar
+`.npz` file that `actions_per_day_columnar` aggregates without parsing.
+"""
+
+import argparse
+import ast
+import json
+import mmap
+import os
+import re
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_LOG_PATH = os.path.join(os.getenv("LOG_DIR", "logs"), "sage.log")
+
+# Events emitted by logging_conf, and the message prefixes of the older repr format
+EVENT_LOGGERS = {"user_actions": "user_action", "agent_interactions": "agent_interaction", "feedback": "feedback"}
+_LEGACY_RE = re.compile(rb"^(\S+ \S+) - (user_actions|agent_interactions|feedback) - \w+ - [^:{]+: (\{.*\})\s*$")
+_EVENT_MARKER = b'"event":'
+_CHUNK_BYTES = 8 * 1024 * 1024
+# advice_id -> priority entries kept for joining feedback to interactions; oldest dropped first
+MAX_ADVICE_PRIORITIES = 100_000
+_decode_json = json.JSONDecoder().decode
+
+def parse_line(line: bytes) -> Optional[Dict[str, Any]]:
+    """Parse one log line into an event dict, or None for other log lines."""
+    if line[:1] == b"{":
+        if _EVENT_MARKER not in line:
+            return None
+        try:
+            record = _decode_json(line.decode("utf-8"))
+        except ValueError:
+            return None
+        return record if isinstance(record, dict) and "event" in record else None
+
+    match = _LEGACY_RE.match(line)
+    if match is not None:
+        try:
+            record = ast.literal_eval(match.group(3).decode("utf-8"))
+        except (ValueError, SyntaxError, UnicodeDecodeError):
+            return None
+        if not isinstance(record, dict):
+            return None
+        record.setdefault("timestamp", match.group(1).decode("ascii").replace(" ", "T").replace(",", "."))
+        record["event"] = EVENT_LOGGERS[match.group(2).decode("ascii")]
+        return record
+    return None
+
+def rotated_files(path: str = DEFAULT_LOG_PATH) -> List[str]:
+    """Return the log and its rotated backups, oldest first."""
+    directory, base = os.path.split(path)
+    directory = directory or "."
+    if not os.path.isdir(directory):
+        return []
+
+    numbered, dated = [], []
+    for name in os.listdir(directory):
+        if not name.startswith(base + "."):
+            continue
+        suffix = name[len(base) + 1:]
+        if suffix.isdigit():
+            numbered.append((int(suffix), name))
+        else:
+            dated.append((suffix, name))
+    # RotatingFileHandler: .1 is the newest backup; TimedRotatingFileHandler: suffixes sort by date
+    files = [name for _, name in sorted(numbered, reverse=True)] + [name for _, name in sorted(dated)]
+    if os.path.exists(path):
+        files.append(base)
+    return [os.path.join(directory, name) for name in files]
+
+def iter_lines(path: str, offset: int = 0) -> Iterator[Tuple[bytes, int]]:
+    """
+    Yield (line, end offset) for each complete line after `offset`.
+
+    A trailing line without its newline (still being written) is left for
+    the next scan.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= offset:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = offset
+            while start < size:
+                # Split a chunk at a time, up to its last complete line
+                chunk_end = data.rfind(b"\n", start, min(size, start + _CHUNK_BYTES))
+                if chunk_end < 0:
+                    chunk_end = data.find(b"\n", start, size)
+                    if chunk_end < 0:
+                        return
+                position = start
+                for line in data[start:chunk_end].split(b"\n"):
+                    position += len(line) + 1
+                    yield line, position
+                start = chunk_end + 1
+
+class LogAggregates:
+    """Incrementally maintained, JSON-serializable query results."""
+
+    def __init__(self):
+        self.actions: Dict[str, Dict[str, float]] = {}
+        self.ratings: Dict[str, Dict[str, float]] = {}
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.advice_priorities: Dict[str, str] = {}
+        self.records = 0
+
+    def add(self, record: Dict[str, Any]):
+        """Fold one parsed event into the aggregates."""
+        self.records += 1
+        rate = record.get("sample_rate")
+        weight = 1.0 / rate if rate else 1.0
+        event = record.get("event")
+
+        if event == "user_action":
+            action = record.get("action", "unknown")
+            day = str(record.get("timestamp", ""))[:10]
+            per_day = self.actions.get(day)
+            if per_day is None:
+                per_day = self.actions[day] = {}
+            per_day[action] = per_day.get(action, 0.0) + weight
+
+            if action.startswith("wizard_"):
+                user = self.users.setdefault(record.get("user_id", "unknown"),
+                                             {"steps": 0, "answered": 0, "skipped": 0, "completed": False})
+                details = record.get("details") or {}
+                if action in ("wizard_answer", "wizard_skip"):
+                    user["answered" if action == "wizard_answer" else "skipped"] += 1
+                    if isinstance(details.get("step"), int):
+                        user["steps"] = max(user["steps"], details["step"] + 1)
+                elif action == "wizard_complete":
+                    user["completed"] = True
+
+        elif event == "agent_interaction":
+            advice_id, priority = record.get("advice_id"), record.get("priority")
+            if advice_id and priority:
+                self.advice_priorities[advice_id] = priority
+                if len(self.advice_priorities) > MAX_ADVICE_PRIORITIES:
+                    del self.advice_priorities[next(iter(self.advice_priorities))]
+
+        elif event == "feedback":
+            rating = record.get("rating")
+            if rating in ("positive", "negative"):
+                priority = record.get("priority") or self.advice_priorities.get(record.get("advice_id")) or "unknown"
+                counts = self.ratings.setdefault(priority, {"positive": 0.0, "negative": 0.0})
+                counts[rating] += weight
+
+    def actions_per_day(self) -> List[Dict[str, Any]]:
+        """Rows of {"day", "action", "count"} sorted by day then action."""
+        return [
+            {"day": day, "action": action, "count": round(count, 3)}
+            for day in sorted(self.actions)
+            for action, count in sorted(self.actions[day].items())
+        ]
+
+    def rating_ratio_by_priority(self) -> Dict[str, Dict[str, float]]:
+        """Priority -> positive/negative counts and the share of positive ratings."""
+        result = {}
+        for priority, counts in sorted(self.ratings.items()):
+            total = counts["positive"] + counts["negative"]
+            result[priority] = {**counts, "ratio": counts["positive"] / total if total else 0.0}
+        return result
+
+    def wizard_funnel(self) -> Dict[str, Any]:
+        """Users reaching each wizard step, completions, and per-user progress."""
+        max_steps = max((user["steps"] for user in self.users.values()), default=0)
+        reached = np.zeros(max_steps + 1, dtype=np.int64)
+        for user in self.users.values():
+            reached[user["steps"]] += 1
+        reached = np.cumsum(reached[::-1])[::-1]
+        return {
+            "users": len(self.users),
+            "reached_step": reached[1:].tolist(),
+            "completed": sum(1 for user in self.users.values() if user["completed"]),
+            "per_user": self.users,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"actions": self.actions, "ratings": self.ratings, "users": self.users,
+                "advice_priorities": self.advice_priorities, "records": self.records}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LogAggregates":
+        aggregates = cls()
+        aggregates.actions = data.get("actions", {})
+        aggregates.ratings = data.get("ratings", {})
+        aggregates.users = data.get("users", {})
+        aggregates.advice_priorities = data.get("advice_priorities", {})
+        aggregates.records = data.get("records", 0)
+        return aggregates
+
+class LogScanner:
+    """
+    Resumable scan over a log and its rotated backups.
+
+    Args:
+        path: Current log file; backups are found next to it
+        state_path: JSON file holding offsets and aggregates between runs
+    """
+
+    def __init__(self, path: str = DEFAULT_LOG_PATH, state_path: str = None):
+        self.path = path
+        self.state_path = state_path
+        self.offsets: Dict[str, int] = {}
+        self.aggregates = LogAggregates()
+        if state_path and os.path.exists(state_path):
+            with open(state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.offsets = state.get("offsets", {})
+            self.aggregates = LogAggregates.from_dict(state.get("aggregates", {}))
+
+    def scan(self) -> LogAggregates:
+        """Parse every line not seen before and save the new state."""
+        seen = {}
+        for path in rotated_files(self.path):
+            stat = os.stat(path)
+            key = str(stat.st_ino)
+            offset = self.offsets.get(key, 0)
+            if offset > stat.st_size:
+                offset = 0  # inode reused by a new file
+            for line, end in iter_lines(path, offset):
+                record = parse_line(line)
+                if record is not None:
+                    self.aggregates.add(record)
+                offset = end
+            seen[key] = offset
+        # Files rotated out of retention are forgotten
+        self.offsets = seen
+        self.save()
+        return self.aggregates
+
+    def save(self):
+        if not self.state_path:
+            return
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"offsets": self.offsets, "aggregates": self.aggregates.to_dict()}, f)
+        os.replace(tmp_path, self.state_path)
+
+def compact_actions(path: str, out_path: str) -> int:
+    """
+    Write every user action in the log and its backups to a columnar .npz.
+
+    Columns: day (days since epoch), action and user codes, and weight;
+    `actions` and `users` hold the code dictionaries. Returns the row count.
+    """
+    days, action_codes, user_codes, weights = [], [], [], []
+    action_ids: Dict[str, int] = {}
+    user_ids: Dict[str, int] = {}
+    for log_path in rotated_files(path):
+        for line, _ in iter_lines(log_path):
+            record = parse_line(line)
+            if record is None or record.get("event") != "user_action":
+                continue
+            try:
+                day = np.datetime64(str(record.get("timestamp", ""))[:10], "D")
+            except ValueError:
+                continue
+            days.append(day.astype(np.int64))
+            action_codes.append(action_ids.setdefault(record.get("action", "unknown"), len(action_ids)))
+            user_codes.append(user_ids.setdefault(record.get("user_id", "unknown"), len(user_ids)))
+            weights.append(1.0 / (record.get("sample_rate") or 1.0))
+
+    np.savez_compressed(
+        out_path,
+        day=np.asarray(days, dtype=np.int32),
+        action=np.asarray(action_codes, dtype=np.int32),
+        user=np.asarray(user_codes, dtype=np.int32),
+        weight=np.asarray(weights, dtype=np.float32),
+        actions=np.asarray(list(action_ids), dtype=str),
+        users=np.asarray(list(user_ids), dtype=str),
+    )
+    return len(days)
+
+def actions_per_day_columnar(npz_path: str) -> List[Dict[str, Any]]:
+    """Actions per day from a compacted file, same rows as `LogAggregates.actions_per_day`."""
+    with np.load(npz_path) as data:
+        day, action, weight, names = data["day"], data["action"], data["weight"], data["actions"]
+    if day.size == 0:
+        return []
+    first = int(day.min())
+    n_actions = len(names)
+    cells = (day.astype(np.int64) - first) * n_actions + action
+    counts = np.bincount(cells, weights=weight)
+    order = np.argsort(names, kind="stable")
+    rows = []
+    for cell_day in np.flatnonzero(counts.reshape(-1, n_actions).any(axis=1)):
+        label = str(np.datetime64(first + int(cell_day), "D"))
+        for code in order:
+            count = counts[cell_day * n_actions + code]
+            if count:
+                rows.append({"day": label, "action": str(names[code]), "count": round(float(count), 3)})
+    return rows
+
+def main(argv: List[str] = None):
+    """Run a query over the logs and print the result as JSON."""
+    parser = argparse.ArgumentParser(description="Aggregate queries over the Sage interaction and feedback logs")
+    parser.add_argument("query", choices=["actions", "ratings", "funnel"])
+    parser.add_argument("--log", default=DEFAULT_LOG_PATH, help="Current log file; rotated backups are included")
+    parser.add_argument("--state", default=None, help="Resume from and save offsets/aggregates to this file")
+    parser.add_argument("--compact", default=None, help="Also write user actions to this columnar .npz")
+    args = parser.parse_args(argv)
+
+    aggregates = LogScanner(args.log, args.state).scan()
+    if args.compact:
+        rows = compact_actions(args.log, args.compact)
+        print(f"Compacted {rows} actions into {args.compact}")
+
+    if args.query == "actions":
+        result = aggregates.actions_per_day()
+    elif args.query == "ratings":
+        result = aggregates.rating_ratio_by_priority()
+    else:
+        result = aggregates.wizard_funnel()
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,73 +1,211 @@
 """
 Logging configuration for Startup Financial OS MVP.
+
+Loggers hand records to a `QueueHandler`; a `QueueListener` thread formats
+them and writes JSON lines to a rotating file (and plain text to the
+console), so a Streamlit rerun never waits on formatting or disk I/O.
+
+Structured events (`log_user_action`, `log_agent_interaction`,
+`log_feedback`) are only built when their logger is enabled and the event
+survives sampling; their fields ride on the record and are serialized to
+JSON on the listener thread. Sampled events carry their `sample_rate` so
+offline counts can be reweighted.
 """
 
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
+import threading
 from datetime import datetime
 from pathlib import Path
+from typing import Dict, Optional
+
+DEFAULT_LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+DEFAULT_LOG_DIR = os.getenv("LOG_DIR", "logs")
+DEFAULT_LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+DEFAULT_LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+# Time-based rotation (e.g. "midnight", "H") when set, size-based otherwise
+DEFAULT_LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "")
+# Comma-separated event:rate pairs, e.g. "page_view:0.1,wizard_answer:0.5"
+DEFAULT_LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "page_view:0.1")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+_sample_rates: Dict[str, float] = {}
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "event:rate,..." into {event: rate}, clamping rates to [0, 1]."""
+    rates = {}
+    for item in spec.split(","):
+        if ":" not in item:
+            continue
+        event, rate = item.rsplit(":", 1)
+        try:
+            rates[event.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            print(f"Error parsing log sample rate '{item}'")
+    return rates
+
+def set_sample_rates(rates: Dict[str, float]):
+    """Replace the per-event sampling rates (events not listed are always kept)."""
+    global _sample_rates
+    _sample_rates = dict(rates)
+
+def sample_rate(event: str) -> float:
+    """Return the fraction of `event` records that are kept."""
+    return _sample_rates.get(event, 1.0)
+
+set_sample_rates(parse_sample_rates(DEFAULT_LOG_SAMPLE_RATES))
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line.
+
+    Structured events put their fields in `record.fields`; any other record
+    is written with its rendered message.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        fields = getattr(record, "fields", None)
+        if fields is not None:
+            payload["event"] = record.msg
+            payload.update(fields)
+        else:
+            payload["message"] = record.getMessage()
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False, separators=(",", ":"))
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records untouched; formatting happens on the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def _file_handler(path: Path, max_bytes: int, backup_count: int, when: str) -> logging.Handler:
+    if when:
+        return logging.handlers.TimedRotatingFileHandler(path, when=when, backupCount=backup_count,
+                                                         encoding="utf-8", delay=True)
+    return logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                                encoding="utf-8", delay=True)
+
+def setup_logging(log_level: str = None, log_file: str = "sage.log", log_dir: str = None,
+                  max_bytes: int = DEFAULT_LOG_MAX_BYTES, backup_count: int = DEFAULT_LOG_BACKUP_COUNT,
+                  rotate_when: str = DEFAULT_LOG_ROTATE_WHEN, console: bool = True):
+    """
+    Setup logging configuration for the application.
+
+    Safe to call on every Streamlit rerun: the queue handler and listener
+    are installed once per process.
+    """
+    global _listener
+    log_level = log_level or DEFAULT_LOG_LEVEL
+    logger = logging.getLogger(__name__)
+
+    with _setup_lock:
+        if _listener is not None:
+            return logger
+
+        # Create logs directory if it doesn't exist
+        log_dir = Path(log_dir or DEFAULT_LOG_DIR)
+        log_dir.mkdir(parents=True, exist_ok=True)
+
+        file_handler = _file_handler(log_dir / log_file, max_bytes, backup_count, rotate_when)
+        file_handler.setFormatter(JsonFormatter())
+        handlers = [file_handler]
+        if console:
+            stream_handler = logging.StreamHandler()
+            stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+            handlers.append(stream_handler)
+
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        root = logging.getLogger()
+        root.setLevel(getattr(logging, log_level.upper()))
+        root.addHandler(_DeferredQueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
 
-def setup_logging(log_level: str = "INFO", log_file: str = "sage.log"):
-    """Setup logging configuration for the application."""
-    
-    # Create logs directory if it doesn't exist
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
-    
-    # Configure logging
-    logging.basicConfig(
-        level=getattr(logging, log_level.upper()),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_dir / log_file),
-            logging.StreamHandler()
-        ]
-    )
-    
     # Set specific logger levels
     logging.getLogger("openai").setLevel(logging.WARNING)
     logging.getLogger("streamlit").setLevel(logging.WARNING)
-    
-    logger = logging.getLogger(__name__)
-    logger.info(f"Logging setup complete. Level: {log_level}, File: {log_file}")
-    
+
+    logger.info("Logging setup complete. Level: %s, File: %s", log_level, log_dir / log_file)
+
     return logger
 
+def shutdown_logging():
+    """Write out queued records and stop the background listener."""
+    global _listener
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            if isinstance(handler, _DeferredQueueHandler):
+                root.removeHandler(handler)
+        _listener = None
+
 def get_logger(name: str) -> logging.Logger:
     """Get a logger instance with the specified name."""
     return logging.getLogger(name)
 
+def _log_event(logger_name: str, event: str, sample_key: str, build_fields) -> bool:
+    """
+    Emit a structured event if its logger is enabled and it survives sampling.
+
+    `build_fields` is only called for events that are written.
+    """
+    logger = logging.getLogger(logger_name)
+    if not logger.isEnabledFor(logging.INFO):
+        return False
+    rate = _sample_rates.get(sample_key, 1.0)
+    if rate < 1.0 and random.random() >= rate:
+        return False
+    fields = build_fields()
+    if rate < 1.0:
+        fields["sample_rate"] = rate
+    logger.info(event, extra={"fields": fields})
+    return True
+
 def log_user_action(user_id: str, action: str, details: dict = None):
-    """Log user actions for analytics and debugging."""
-    logger = get_logger("user_actions")
-    log_data = {
+    """Log user actions for analytics and debugging (sampled per action)."""
+    return _log_event("user_actions", "user_action", action, lambda: {
         "user_id": user_id,
         "action": action,
-        "timestamp": datetime.now().isoformat(),
-        "details": details or {}
-    }
-    logger.info(f"User action: {log_data}")
-
-def log_agent_interaction(user_id: str, input_text: str, response: str, metrics: dict = None):
-    """Log AI agent interactions for learning and audit."""
-    logger = get_logger("agent_interactions")
-    log_data = {
+        "details": dict(details) if details else {},
+    })
+
+def log_agent_interaction(user_id: str, input_text: str, response: str, metrics: dict = None,
+                          advice_id: str = None, priority: str = None):
+    """Log AI agent interactions for learning and audit (keyed by `advice_id` for feedback)."""
+    return _log_event("agent_interactions", "agent_interaction", "agent_interaction", lambda: {
         "user_id": user_id,
         "input": input_text,
         "response": response,
-        "metrics": metrics or {},
-        "timestamp": datetime.now().isoformat()
-    }
-    logger.info(f"Agent interaction: {log_data}")
-
-def log_feedback(user_id: str, advice_id: str, rating: str, feedback_text: str = None):
-    """Log user feedback on AI advice."""
-    logger = get_logger("feedback")
-    log_data = {
+        "metrics": dict(metrics) if metrics else {},
+        "advice_id": advice_id,
+        "priority": priority,
+    })
+
+def log_feedback(user_id: str, advice_id: str, rating: str, feedback_text: str = None, priority: str = None):
+    """Log user feedback on AI advice (with the advice priority, when known)."""
+    return _log_event("feedback", "feedback", "feedback", lambda: {
         "user_id": user_id,
         "advice_id": advice_id,
         "rating": rating,  # "positive" or "negative"
         "feedback_text": feedback_text,
-        "timestamp": datetime.now().isoformat()
-    }
-    logger.info(f"User feedback: {log_data}") 
\ No newline at end of file
+        "priority": priority,
+    })
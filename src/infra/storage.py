@@ -0,0 +1,353 @@
+"""
+SQLite persistence for Startup Financial OS MVP.
+
+One database file (`DATABASE_URL`, default `sqlite:///sage.db`) holds saved
+models and the append-only badge award ledger, whose per-user point totals
+a trigger keeps in `user_points`. Chat history lives in the agent's
+ConversationStore, in its own file and outside the write-behind queue
+(see conversation_store.py). Connections run in WAL mode
+so readers never block the writer, and are reused from a small per-process
+pool. SQL lives in module constants so sqlite3's per-connection statement
+cache keeps them prepared.
+
+Writes are queued and applied by a single background writer in batched
+transactions (write-behind), so concurrent Streamlit sessions never wait
+on each other for the write lock. Reads flush pending writes first, so a
+session always sees its own writes. A batch that cannot get the write lock
+(another process holding it past the busy timeout) is kept and retried in
+order with the next one, up to `max_retries` times; other errors (and a
+lock that outlasts the retries) drop the batch with a logged error so the
+writer never stalls.
+"""
+
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+DEFAULT_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///sage.db")
+DEFAULT_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "4"))
+DEFAULT_FLUSH_INTERVAL_SECONDS = float(os.getenv("DATABASE_FLUSH_INTERVAL_SECONDS", "0.2"))
+DEFAULT_BATCH_SIZE = int(os.getenv("DATABASE_BATCH_SIZE", "500"))
+DEFAULT_BUSY_TIMEOUT_SECONDS = float(os.getenv("DATABASE_BUSY_TIMEOUT_SECONDS", "5"))
+DEFAULT_MAX_WRITE_RETRIES = int(os.getenv("DATABASE_MAX_WRITE_RETRIES", "5"))
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS models ("
+    " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+    " user_id TEXT NOT NULL,"
+    " drivers TEXT NOT NULL,"
+    " metrics TEXT NOT NULL,"
+    " created_at TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_models_user ON models (user_id, id)",
+    # Append-only award ledger; one row per (user, badge)
+    "CREATE TABLE IF NOT EXISTS badge_ledger ("
+    " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+    " user_id TEXT NOT NULL,"
+    " badge_id TEXT NOT NULL,"
+    " points INTEGER NOT NULL,"
+    " awarded_at TEXT NOT NULL,"
+    " UNIQUE (user_id, badge_id))",
+    "CREATE TRIGGER IF NOT EXISTS trg_badge_ledger_no_update BEFORE UPDATE ON badge_ledger"
+    " BEGIN SELECT RAISE(ABORT, 'badge_ledger is append-only'); END",
+    "CREATE TRIGGER IF NOT EXISTS trg_badge_ledger_no_delete BEFORE DELETE ON badge_ledger"
+    " BEGIN SELECT RAISE(ABORT, 'badge_ledger is append-only'); END",
+    # Materialized per-user totals, maintained by trigger as awards are appended
+    "CREATE TABLE IF NOT EXISTS user_points ("
+    " user_id TEXT PRIMARY KEY,"
+    " points INTEGER NOT NULL,"
+    " awards INTEGER NOT NULL) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS idx_user_points_points ON user_points (points DESC, user_id)",
+    "CREATE TRIGGER IF NOT EXISTS trg_badge_ledger_points AFTER INSERT ON badge_ledger"
+    " BEGIN"
+    " INSERT INTO user_points (user_id, points, awards) VALUES (NEW.user_id, NEW.points, 1)"
+    " ON CONFLICT (user_id) DO UPDATE SET points = points + excluded.points, awards = awards + 1;"
+    " END",
+]
+
+# Write statements, keyed by queue kind; executed with executemany per batch
+WRITE_SQL = {
+    "model": "INSERT INTO models (user_id, drivers, metrics, created_at) VALUES (?, ?, ?, ?)",
+    "badge_award": "INSERT OR IGNORE INTO badge_ledger (user_id, badge_id, points, awarded_at) VALUES (?, ?, ?, ?)",
+}
+
+SELECT_LATEST_MODEL_SQL = "SELECT drivers, metrics, created_at FROM models WHERE user_id = ? ORDER BY id DESC LIMIT 1"
+# Each user's MAX(id) comes from a covering scan of idx_models_user
+SELECT_LATEST_MODELS_SQL = (
+    "SELECT user_id, drivers, metrics, created_at FROM models"
+    " WHERE id IN (SELECT MAX(id) FROM models GROUP BY user_id) ORDER BY id"
+)
+SELECT_BADGE_AWARDS_SQL = "SELECT badge_id, points, awarded_at FROM badge_ledger WHERE user_id = ? ORDER BY seq"
+SELECT_USER_POINTS_SQL = "SELECT points FROM user_points WHERE user_id = ?"
+SELECT_TOP_USERS_SQL = "SELECT user_id, points FROM user_points ORDER BY points DESC, user_id LIMIT ?"
+# Rank = 1 + users with strictly more points; the count is a range scan of idx_user_points_points
+SELECT_USER_RANK_SQL = (
+    "SELECT 1 + (SELECT COUNT(*) FROM user_points WHERE points > u.points) FROM user_points u WHERE user_id = ?"
+)
+
+_STOP = object()
+
+def database_path(url: str = DEFAULT_DATABASE_URL) -> str:
+    """Turn a `sqlite:///path` URL (or a plain path) into a file path."""
+    return url[len("sqlite:///"):] if url.startswith("sqlite:///") else url
+
+def is_lock_error(error: sqlite3.Error) -> bool:
+    """True for SQLITE_BUSY / SQLITE_LOCKED, the errors worth retrying."""
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+class _Flush:
+    """Queue marker the writer sets once everything queued before it was attempted."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.committed = True
+
+class Storage:
+    """
+    Pooled SQLite storage with batched write-behind.
+
+    Args:
+        path: Database file
+        pool_size: Max idle read connections kept per process
+        flush_interval: Max seconds a queued write waits before being committed
+        batch_size: Max queued writes committed in one transaction
+        busy_timeout: Seconds a connection waits for a lock held by another connection
+        max_retries: Times a batch that hit a lock is retried before it is dropped
+    """
+
+    def __init__(self, path: str = None, pool_size: int = DEFAULT_POOL_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS, batch_size: int = DEFAULT_BATCH_SIZE,
+                 busy_timeout: float = DEFAULT_BUSY_TIMEOUT_SECONDS,
+                 max_retries: int = DEFAULT_MAX_WRITE_RETRIES):
+        self.path = path or database_path()
+        self.pool_size = max(1, pool_size)
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self.busy_timeout = busy_timeout
+        self.max_retries = max(0, max_retries)
+        self.writes = 0
+        self.batches = 0
+        self.retries = 0
+        self._pid = os.getpid()  # Process owning the writer thread
+        self._pool_pid = self._pid
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+        with self.connection() as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+        self._writer = threading.Thread(target=self._write_loop, name="storage-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, cached_statements=64)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled connection; connections never cross a fork."""
+        if os.getpid() != self._pool_pid:
+            self._pool_pid = os.getpid()
+            self._pool = queue.LifoQueue()
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if self._pool.qsize() < self.pool_size:
+                self._pool.put(conn)
+            else:
+                conn.close()
+
+    # Write-behind
+
+    def _enqueue(self, kind: str, row: Tuple):
+        if self._closed:
+            raise RuntimeError("Storage is closed")
+        with self._lock:
+            self._pending += 1
+        self._queue.put((kind, row))
+
+    def _apply(self, conn: sqlite3.Connection, rows: Dict[str, List[Tuple]]):
+        """Commit one batch in a single transaction."""
+        conn.execute("BEGIN IMMEDIATE")
+        for kind, values in rows.items():
+            conn.executemany(WRITE_SQL[kind], values)
+        conn.execute("COMMIT")
+
+    def _write_loop(self):
+        conn = self._connect()
+        retry: List[Any] = []
+        attempts = 0
+        while True:
+            # Rows of a batch that could not be written go first, keeping their order
+            batch, retry = retry or [self._queue.get()], []
+            # Gather whatever else arrives within the flush interval, up to batch_size
+            while len(batch) < self.batch_size and not isinstance(batch[-1], _Flush) and batch[-1] is not _STOP:
+                try:
+                    batch.append(self._queue.get(timeout=self.flush_interval))
+                except queue.Empty:
+                    break
+
+            rows: Dict[str, List[Tuple]] = {}
+            markers = []
+            stop = False
+            for entry in batch:
+                if entry is _STOP:
+                    stop = True
+                elif isinstance(entry, _Flush):
+                    markers.append(entry)
+                else:
+                    rows.setdefault(entry[0], []).append(entry[1])
+
+            committed = True
+            if rows:
+                written = sum(len(values) for values in rows.values())
+                try:
+                    self._apply(conn, rows)
+                    self.writes += written
+                    self.batches += 1
+                    attempts = 0
+                except Exception as e:
+                    committed = False
+                    try:
+                        if conn.in_transaction:
+                            conn.execute("ROLLBACK")
+                    except sqlite3.Error:
+                        pass
+                    if isinstance(e, sqlite3.Error) and is_lock_error(e) and attempts < self.max_retries and not stop:
+                        # Locked or busy past busy_timeout: keep the rows for the next batch
+                        retry = [entry for entry in batch if entry is not _STOP and not isinstance(entry, _Flush)]
+                        written = 0
+                        attempts += 1
+                        self.retries += 1
+                        print(f"Error writing {len(retry)} queued rows, will retry: {e}")
+                        time.sleep(self.flush_interval)
+                    else:
+                        attempts = 0
+                        print(f"Error writing {written} queued rows, dropping them: {e}")
+                with self._lock:
+                    self._pending -= written
+
+            for marker in markers:
+                marker.committed = marker.committed and committed
+                marker.done.set()
+            if stop:
+                conn.close()
+                return
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """
+        Block until every write queued so far has been attempted.
+
+        Returns True when they are all committed; False on timeout or when a
+        batch could not be written (its rows stay queued for retry).
+        """
+        if self._pending == 0 or self._closed:
+            return True
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout) and marker.committed
+
+    def close(self):
+        """Commit pending writes, stop the writer and close pooled connections."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._writer.join()
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+    # Models
+
+    def save_model(self, user_id: str, drivers: Dict[str, Any], metrics: Dict[str, float]):
+        """Queue a calculated model (drivers and metrics) for persistence."""
+        self._enqueue("model", (
+            user_id,
+            json.dumps(drivers, sort_keys=True, default=str),
+            json.dumps(metrics, sort_keys=True, default=str),
+            datetime.now().isoformat(),
+        ))
+
+    def get_latest_model(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return the user's most recently saved model, or None."""
+        self.flush()
+        with self.connection() as conn:
+            row = conn.execute(SELECT_LATEST_MODEL_SQL, (user_id,)).fetchone()
+        if row is None:
+            return None
+        return {"drivers": json.loads(row[0]), "metrics": json.loads(row[1]), "created_at": row[2]}
+
+    def get_latest_models(self) -> List[Dict[str, Any]]:
+        """Return every user's most recently saved model, in save order."""
+        self.flush()
+        with self.connection() as conn:
+            rows = conn.execute(SELECT_LATEST_MODELS_SQL).fetchall()
+        return [{"user_id": user_id, "drivers": json.loads(drivers), "metrics": json.loads(metrics),
+                 "created_at": created_at} for user_id, drivers, metrics, created_at in rows]
+
+    # Badge awards
+
+    def award_badge(self, user_id: str, badge_id: str, points: int, awarded_at: str = None):
+        """Queue a badge award for the ledger; awarding the same badge twice keeps the first award."""
+        self._enqueue("badge_award", (user_id, badge_id, int(points), awarded_at or datetime.now().isoformat()))
+
+    def get_badge_awards(self, user_id: str) -> List[Dict[str, Any]]:
+        """Return the user's badge awards in award order."""
+        self.flush()
+        with self.connection() as conn:
+            rows = conn.execute(SELECT_BADGE_AWARDS_SQL, (user_id,)).fetchall()
+        return [{"badge_id": badge_id, "points": points, "awarded_at": awarded_at}
+                for badge_id, points, awarded_at in rows]
+
+    def get_user_points(self, user_id: str) -> int:
+        """Return the user's total badge points from the materialized totals."""
+        self.flush()
+        with self.connection() as conn:
+            row = conn.execute(SELECT_USER_POINTS_SQL, (user_id,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def get_top_users(self, k: int = 10) -> List[Tuple[str, int]]:
+        """Return the k users with the most points, served by the points index."""
+        self.flush()
+        with self.connection() as conn:
+            return conn.execute(SELECT_TOP_USERS_SQL, (k,)).fetchall()
+
+    def get_user_rank(self, user_id: str) -> Optional[int]:
+        """Return the user's rank (1 = most points, ties share a rank), or None without awards."""
+        self.flush()
+        with self.connection() as conn:
+            row = conn.execute(SELECT_USER_RANK_SQL, (user_id,)).fetchone()
+        return int(row[0]) if row else None
+
+_shared_storage: Optional[Storage] = None
+_shared_storage_lock = threading.Lock()
+
+def get_storage() -> Storage:
+    """Return the process-wide storage, opening the database on first use."""
+    global _shared_storage
+    if _shared_storage is None or _shared_storage._pid != os.getpid():
+        with _shared_storage_lock:
+            if _shared_storage is None or _shared_storage._pid != os.getpid():
+                _shared_storage = Storage()
+                atexit.register(_shared_storage.close)
+    return _shared_storage
@@ -0,0 +1,14 @@
+"""
+Portfolio module for Startup Financial OS MVP.
+
+This module runs the calculation, validation, scoring and badge pipeline
+over whole portfolios from files, without the Streamlit UI.
+"""
+
+from .runner import run_portfolio, process_chunk, main
+
+__all__ = [
+    "run_portfolio",
+    "process_chunk",
+    "main"
+]
@@ -0,0 +1,270 @@
+"""
+Headless portfolio runner for Startup Financial OS MVP.
+
+Streams a CSV or JSONL file of startup drivers in fixed-size chunks. Worker
+processes parse each chunk into columns, run the batch metric calculation,
+sanity-rule validation, quality scoring and badge eligibility, and format
+the result rows; the parent only reads raw lines and appends finished
+chunks to the output in input order. At most two chunks per worker are in
+flight, so memory stays flat whatever the size of the portfolio.
+
+CSV input needs a header row, and rows must not contain quoted line breaks
+(chunks are cut at newlines). Streamlit is never imported.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, zip_longest
+from typing import Dict, Any, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from ..core_engine.batch import DRIVER_COLUMNS, calculate_model_batch
+from ..gamification.badges import build_badge_context_batch, get_badge_engine
+from ..wizard.quality_score import calculate_quality_score_batch, get_compiled_bands
+from ..wizard.sanity_rules import get_compiled_rules, validate_metrics_batch
+
+DEFAULT_CHUNK_SIZE = 50_000
+ID_COLUMN = "id"
+METRIC_COLUMNS = ["mrr", "churn", "cac", "runway", "burn_rate", "ltv"]
+OUTPUT_COLUMNS = ["row", ID_COLUMN] + METRIC_COLUMNS + ["quality_score", "violations", "badges", "badge_points"]
+
+# Variables the pipeline computes itself, so they are never read from the input
+COMPUTED_COLUMNS = set(METRIC_COLUMNS) | {"revenue", "cac_ltv_ratio", "growth_rate", "quality_score"}
+
+def file_format(path: str) -> str:
+    """Guess "csv" or "jsonl" from a file name."""
+    return "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+
+def input_columns() -> List[str]:
+    """Input fields read by the metric formulas, the quality score, the sanity rules or the badges."""
+    names = set(DRIVER_COLUMNS) | set(get_compiled_bands().inputs)
+    for _, condition in get_compiled_rules():
+        names |= condition.variables
+    for condition in get_badge_engine().conditions.values():
+        names |= condition.variables
+    return sorted(names - COMPUTED_COLUMNS)
+
+def _parse_numbers(values: Sequence[Any]) -> np.ndarray:
+    """Parse a column of cells; empty, missing or non-numeric cells become NaN."""
+    try:
+        return np.array(values, dtype=np.float64)
+    except (ValueError, TypeError):
+        parsed = np.empty(len(values))
+        for i, value in enumerate(values):
+            try:
+                parsed[i] = float(value)
+            except (ValueError, TypeError):
+                parsed[i] = np.nan
+        return parsed
+
+def parse_chunk(fmt: str, header: List[str], lines: List[str],
+                columns: List[str]) -> Tuple[Dict[str, np.ndarray], List[str], List[int]]:
+    """
+    Turn raw input lines into driver columns (NaN where missing).
+
+    Returns the columns, each row's ID and each row's line index within the
+    chunk; blank and malformed lines are skipped.
+    """
+    if fmt == "jsonl":
+        records, positions = [], []
+        for position, line in enumerate(lines):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                print(f"Error parsing line {position + 1} of chunk: {e}")
+                continue
+            if isinstance(record, dict):
+                records.append(record)
+                positions.append(position)
+        ids = [str(record.get(ID_COLUMN, "")) for record in records]
+        return {name: _parse_numbers([record.get(name) for record in records]) for name in columns}, ids, positions
+
+    rows, positions = [], []
+    for position, row in enumerate(csv.reader(lines)):
+        if row:
+            rows.append(row)
+            positions.append(position)
+    cells = dict(zip(header, zip_longest(*rows, fillvalue=""))) if rows else {}
+    ids = list(cells.get(ID_COLUMN, [""] * len(rows)))
+    missing = np.full(len(rows), np.nan)
+    return {name: _parse_numbers(cells[name]) if name in cells else missing for name in columns}, ids, positions
+
+def _labels(masks: Dict[str, np.ndarray], size: int) -> np.ndarray:
+    """Names of the true masks per row, e.g. [["runway_warning", "price_low"], ...], as an object array."""
+    labels = np.empty(size, dtype=object)
+    if not masks or size == 0:
+        for i in range(size):
+            labels[i] = []
+        return labels
+    names = list(masks)
+    hits = np.stack([np.asarray(masks[name], dtype=bool) for name in names], axis=1)
+    # Rows share a handful of distinct combinations; build each list once. Packing
+    # the flags into one integer per row keeps the grouping a 1-D sort.
+    if len(names) < 63:
+        combos, first, inverse = np.unique(hits @ (1 << np.arange(len(names), dtype=np.int64)),
+                                           return_index=True, return_inverse=True)
+        combos = hits[first]
+    else:
+        combos, inverse = np.unique(hits, axis=0, return_inverse=True)
+    lists = np.empty(len(combos), dtype=object)
+    for i, combo in enumerate(combos):
+        lists[i] = [name for name, hit in zip(names, combo) if hit]
+    return lists[inverse.ravel()]
+
+def process_chunk(fmt: str, header: List[str], lines: List[str], start: int,
+                  output_format: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Run one chunk through the whole pipeline.
+
+    Returns the formatted output rows and the chunk's summary counts.
+    """
+    drivers, ids, positions = parse_chunk(fmt, header, lines, input_columns())
+    size = len(ids)
+
+    metrics = calculate_model_batch(drivers) if size else {name: np.empty(0) for name in METRIC_COLUMNS}
+    # Scored from the answers alone, like the wizard's live score
+    quality = calculate_quality_score_batch(drivers, size)
+    context = build_badge_context_batch(metrics, drivers, size, quality_score=quality.astype(np.float64))
+
+    violations = validate_metrics_batch(context, size)
+    engine = get_badge_engine()
+    badges = engine.evaluate_bulk(context, size)
+    points = np.zeros(size, dtype=np.int64)
+    for badge_id, mask in badges.items():
+        points += mask * int(engine.by_id[badge_id].get('points', 0))
+
+    columns = [[start + position for position in positions], ids]
+    columns += [metrics[name].tolist() for name in METRIC_COLUMNS]
+    columns += [quality.tolist(), _labels(violations, size), _labels(badges, size), points.tolist()]
+    buffer = io.StringIO()
+    if output_format == "jsonl":
+        for row in zip(*columns):
+            buffer.write(json.dumps(dict(zip(OUTPUT_COLUMNS, row)), separators=(",", ":")))
+            buffer.write("\n")
+    else:
+        columns[-3] = [";".join(names) for names in columns[-3]]
+        columns[-2] = [";".join(names) for names in columns[-2]]
+        csv.writer(buffer, lineterminator="\n").writerows(zip(*columns))
+
+    summary = {
+        "rows": size,
+        "quality_sum": int(quality.sum()),
+        "violations": {rule_id: int(mask.sum()) for rule_id, mask in violations.items()},
+        "badges": {badge_id: int(mask.sum()) for badge_id, mask in badges.items()},
+    }
+    return buffer.getvalue(), summary
+
+def _read_chunks(path: str, fmt: str, chunk_size: int) -> Iterator[Tuple[List[str], List[str]]]:
+    """Yield (header, lines) chunks of at most `chunk_size` lines."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        header = []
+        if fmt == "csv":
+            header = next(csv.reader([f.readline()]), [])
+        while True:
+            lines = list(islice(f, chunk_size))
+            if not lines:
+                return
+            yield header, lines
+
+def _merge_summary(total: Dict[str, Any], part: Dict[str, Any]):
+    total["rows"] += part["rows"]
+    total["quality_sum"] += part["quality_sum"]
+    for key in ("violations", "badges"):
+        for name, count in part[key].items():
+            total[key][name] = total[key].get(name, 0) + count
+
+def run_portfolio(input_path: str, output_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = None,
+                  input_format: str = None, output_format: str = None, progress=None) -> Dict[str, Any]:
+    """
+    Score every startup in `input_path` and write one result row each to `output_path`.
+
+    Args:
+        input_path: CSV (with header) or JSONL file of drivers
+        output_path: CSV or JSONL results file, written chunk by chunk
+        chunk_size: Input rows per vectorized chunk
+        workers: Process pool size (defaults to the CPU count, 1 runs inline)
+        input_format / output_format: "csv" or "jsonl" (guessed from the file names)
+        progress: Optional callback with the number of rows written so far
+
+    Returns:
+        Summary with row count, timing, mean quality score and how many rows
+        violated each rule and earned each badge
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    input_format = input_format or file_format(input_path)
+    output_format = output_format or file_format(output_path)
+    workers = workers or os.cpu_count() or 1
+
+    total = {"rows": 0, "quality_sum": 0, "violations": {}, "badges": {}}
+    started = time.perf_counter()
+
+    with open(output_path, "w", encoding="utf-8", newline="") as out:
+        if output_format == "csv":
+            out.write(",".join(OUTPUT_COLUMNS) + "\n")
+
+        def write(result: Tuple[str, Dict[str, Any]]):
+            text, summary = result
+            out.write(text)
+            _merge_summary(total, summary)
+            if progress is not None:
+                progress(total["rows"])
+
+        start = 0
+        if workers <= 1:
+            for header, lines in _read_chunks(input_path, input_format, chunk_size):
+                write(process_chunk(input_format, header, lines, start, output_format))
+                start += len(lines)
+        else:
+            # Bounded window of chunks in flight, written back in input order
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = deque()
+                for header, lines in _read_chunks(input_path, input_format, chunk_size):
+                    pending.append(executor.submit(process_chunk, input_format, header, lines, start, output_format))
+                    start += len(lines)
+                    if len(pending) >= 2 * workers:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+
+    seconds = time.perf_counter() - started
+    rows = total["rows"]
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows / seconds) if seconds > 0 else None,
+        "mean_quality_score": round(total["quality_sum"] / rows, 2) if rows else None,
+        "violations": total["violations"],
+        "badges": total["badges"],
+    }
+
+def main(argv: List[str] = None):
+    """Run the portfolio pipeline from the command line and print the summary as JSON."""
+    parser = argparse.ArgumentParser(description="Score a CSV/JSONL portfolio of startup drivers without the UI")
+    parser.add_argument("input", help="CSV (with header) or JSONL file of drivers")
+    parser.add_argument("-o", "--output", required=True, help="Results file (.csv or .jsonl)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per chunk")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--input-format", choices=["csv", "jsonl"], default=None)
+    parser.add_argument("--output-format", choices=["csv", "jsonl"], default=None)
+    args = parser.parse_args(argv)
+
+    summary = run_portfolio(
+        args.input, args.output, chunk_size=args.chunk_size, workers=args.workers,
+        input_format=args.input_format, output_format=args.output_format,
+        progress=lambda rows: print(f"{rows:,} rows", file=sys.stderr, flush=True),
+    )
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,24 @@ Wizard module for Startup Financial OS MVP.
 This module handles the interactive question flow and validation rules.
 """
 
-from .questions import load_questions, get_question_by_id
-from .sanity_rules import load_sanity_rules, validate_metrics
+from .questions import load_questions, get_question_by_id, get_questions_for_project_type, load_tips, get_tip
+from .sanity_rules import load_sanity_rules, validate_metrics, validate_metrics_batch
+from .expressions import compile_condition
+from .quality_score import calculate_quality_score, calculate_quality_score_batch
+from .quality_ranking import QualityRanking, get_quality_ranking
 
 __all__ = [
     "load_questions",
     "get_question_by_id", 
+    "get_questions_for_project_type",
+    "load_tips",
+    "get_tip",
     "load_sanity_rules",
-    "validate_metrics"
+    "validate_metrics",
+    "validate_metrics_batch",
+    "compile_condition",
+    "calculate_quality_score",
+    "calculate_quality_score_batch",
+    "QualityRanking",
+    "get_quality_ranking"
 ] 
\ No newline at end of file
@@ -0,0 +1,166 @@
+"""
+Safe expression compiler for rule and badge conditions.
+
+Conditions such as `cac > ltv/3` or `wizard_completed == true` are parsed
+once with `ast` into a tree of closures and cached. A compiled condition is
+evaluated either against a single context dict or against columnar NumPy
+arrays for a whole portfolio.
+"""
+
+import ast
+import operator
+from functools import lru_cache
+from typing import Dict, Any, Callable, FrozenSet, Mapping
+
+import numpy as np
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+
+_CMP_OPS = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+
+# YAML-style literals used in badge conditions
+_CONSTANT_NAMES = {"true": True, "false": False, "True": True, "False": False}
+
+
+def _and(left: Any, right: Any) -> Any:
+    if isinstance(left, np.ndarray) or isinstance(right, np.ndarray):
+        return np.logical_and(left, right)
+    return left and right
+
+
+def _or(left: Any, right: Any) -> Any:
+    if isinstance(left, np.ndarray) or isinstance(right, np.ndarray):
+        return np.logical_or(left, right)
+    return left or right
+
+
+def _not(value: Any) -> Any:
+    if isinstance(value, np.ndarray):
+        return np.logical_not(value)
+    return not value
+
+
+def _build(node: ast.AST, variables: set) -> Callable[[Mapping[str, Any]], Any]:
+    """Recursively turn a whitelisted AST node into a closure over the context."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, bool)):
+        value = node.value
+        return lambda ctx: value
+
+    if isinstance(node, ast.Name):
+        if node.id in _CONSTANT_NAMES:
+            value = _CONSTANT_NAMES[node.id]
+            return lambda ctx: value
+        name = node.id
+        variables.add(name)
+        return lambda ctx: ctx[name]
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        op = _BIN_OPS[type(node.op)]
+        left, right = _build(node.left, variables), _build(node.right, variables)
+        return lambda ctx: op(left(ctx), right(ctx))
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd, ast.Not)):
+        operand = _build(node.operand, variables)
+        if isinstance(node.op, ast.USub):
+            return lambda ctx: -operand(ctx)
+        if isinstance(node.op, ast.Not):
+            return lambda ctx: _not(operand(ctx))
+        return operand
+
+    if isinstance(node, ast.Compare) and all(type(op) in _CMP_OPS for op in node.ops):
+        operands = [_build(node.left, variables)] + [_build(c, variables) for c in node.comparators]
+        ops = [_CMP_OPS[type(op)] for op in node.ops]
+
+        def compare(ctx):
+            values = [operand(ctx) for operand in operands]
+            result = ops[0](values[0], values[1])
+            for i in range(1, len(ops)):
+                result = _and(result, ops[i](values[i], values[i + 1]))
+            return result
+
+        return compare
+
+    if isinstance(node, ast.BoolOp):
+        combine = _and if isinstance(node.op, ast.And) else _or
+        values = [_build(value, variables) for value in node.values]
+
+        def boolean(ctx):
+            result = values[0](ctx)
+            for value in values[1:]:
+                result = combine(result, value(ctx))
+            return result
+
+        return boolean
+
+    raise ValueError(f"Unsupported expression element: {ast.dump(node)}")
+
+
+class CompiledCondition:
+    """A parsed condition with the set of variables it reads."""
+
+    __slots__ = ("source", "variables", "_func")
+
+    def __init__(self, source: str):
+        variables = set()
+        tree = ast.parse(source.strip(), mode="eval")
+        self._func = _build(tree.body, variables)
+        self.source = source
+        self.variables: FrozenSet[str] = frozenset(variables)
+
+    def evaluate(self, context: Mapping[str, Any]) -> bool:
+        """
+        Evaluate against a single context.
+
+        Returns False when a referenced variable is missing or not numeric.
+        """
+        for name in self.variables:
+            value = context.get(name)
+            if not isinstance(value, (int, float, np.number, np.bool_)):
+                return False
+        try:
+            return bool(self._func(context))
+        except ZeroDivisionError:
+            return False
+
+    def evaluate_batch(self, columns: Mapping[str, Any], size: int = None) -> np.ndarray:
+        """
+        Evaluate against columnar arrays.
+
+        Rows where a referenced variable is missing or NaN evaluate to False.
+        """
+        arrays: Dict[str, np.ndarray] = {}
+        for name in self.variables:
+            if name in columns:
+                arrays[name] = np.asarray(columns[name], dtype=np.float64)
+                size = arrays[name].shape[0] if size is None else size
+        if size is None:
+            raise ValueError(f"Cannot infer batch size for condition '{self.source}'")
+        if len(arrays) < len(self.variables):
+            return np.zeros(size, dtype=bool)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = np.broadcast_to(np.asarray(self._func(arrays), dtype=bool), (size,)).copy()
+        for column in arrays.values():
+            result &= ~np.isnan(column)
+        return result
+
+    def __repr__(self) -> str:
+        return f"CompiledCondition({self.source!r})"
+
+
+@lru_cache(maxsize=1024)
+def compile_condition(condition: str) -> CompiledCondition:
+    """Parse and cache a condition string (raises ValueError / SyntaxError if invalid)."""
+    return CompiledCondition(condition)
@@ -0,0 +1,114 @@
+"""
+Percentile ranking of quality scores against the portfolio.
+
+Every user's latest saved model is scored once with the batch scorer, and
+the scores are kept as sorted lists per project type (plus one for the
+whole portfolio). Ranking a score is then two binary searches, cheap
+enough to show "top 18% of B2B SaaS" on every wizard step.
+"""
+
+import math
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..core_engine.batch import pack_drivers
+from ..infra.storage import Storage, get_storage
+from .quality_score import calculate_quality_score_batch, get_compiled_bands
+from .questions import DEFAULT_PROJECT_TYPE
+
+# Segment holding every scored startup
+ALL_SEGMENTS = "all"
+
+class QualityRanking:
+    """
+    Portfolio quality scores, sorted per segment (project type).
+
+    Each user counts once, with the score of their latest model.
+    """
+
+    def __init__(self, scores: Iterable[Tuple[str, Optional[str], int]] = ()):
+        self._lock = threading.Lock()
+        self._users: Dict[str, Tuple[Optional[str], int]] = {}
+        self._sorted: Dict[str, List[int]] = {ALL_SEGMENTS: []}
+        self.load(scores)
+
+    @classmethod
+    def from_storage(cls, storage: Storage) -> "QualityRanking":
+        """Score every user's latest saved model in one batch."""
+        models = storage.get_latest_models()
+        columns = pack_drivers([model["drivers"] for model in models], get_compiled_bands().inputs)
+        scores = calculate_quality_score_batch(columns, len(models))
+        return cls((model["user_id"], model["drivers"].get("project_type", DEFAULT_PROJECT_TYPE), int(score))
+                   for model, score in zip(models, scores))
+
+    def _segments(self, segment: Optional[str]) -> Tuple[str, ...]:
+        return (ALL_SEGMENTS,) if segment is None else (ALL_SEGMENTS, segment)
+
+    def load(self, scores: Iterable[Tuple[str, Optional[str], int]]):
+        """Set many (user_id, segment, score) entries at once, re-sorting a single time."""
+        with self._lock:
+            for user_id, segment, score in scores:
+                self._users[user_id] = (segment, int(score))
+            self._sorted = {ALL_SEGMENTS: []}
+            for segment, score in self._users.values():
+                for key in self._segments(segment):
+                    self._sorted.setdefault(key, []).append(score)
+            for scores_list in self._sorted.values():
+                scores_list.sort()
+
+    def set_score(self, user_id: str, segment: Optional[str], score: int):
+        """Record a user's latest score, replacing their previous one."""
+        with self._lock:
+            old = self._users.get(user_id)
+            if old is not None:
+                for key in self._segments(old[0]):
+                    scores_list = self._sorted[key]
+                    del scores_list[bisect_left(scores_list, old[1])]
+            self._users[user_id] = (segment, int(score))
+            for key in self._segments(segment):
+                insort(self._sorted.setdefault(key, []), int(score))
+
+    def percentile(self, score: float, segment: str = ALL_SEGMENTS) -> Optional[float]:
+        """
+        Percentile rank (0-100) of a score within the segment, ties counting half.
+
+        Returns None when the segment has no scores.
+        """
+        with self._lock:
+            scores_list = self._sorted.get(segment)
+            if not scores_list:
+                return None
+            below = bisect_left(scores_list, score)
+            ties = bisect_right(scores_list, score) - below
+            return 100.0 * (below + 0.5 * ties) / len(scores_list)
+
+    def top_percent(self, score: float, segment: str = ALL_SEGMENTS) -> Optional[float]:
+        """Share of the segment (0-100) the score is at the top of, or None when it is empty."""
+        percentile = self.percentile(score, segment)
+        return None if percentile is None else 100.0 - percentile
+
+    def describe(self, score: float, segment: str = ALL_SEGMENTS) -> Optional[str]:
+        """Short ranking label such as "Top 18% of B2B SaaS", or None without peers."""
+        top = self.top_percent(score, segment)
+        if top is None:
+            return None
+        label = "all startups" if segment == ALL_SEGMENTS else segment
+        return f"Top {min(100, max(1, math.ceil(top)))}% of {label}"
+
+    def size(self, segment: str = ALL_SEGMENTS) -> int:
+        """Number of scored users in the segment."""
+        with self._lock:
+            return len(self._sorted.get(segment, ()))
+
+_shared_ranking: Optional[QualityRanking] = None
+_shared_ranking_lock = threading.Lock()
+
+def get_quality_ranking() -> QualityRanking:
+    """Return the process-wide ranking, scored from storage on first use."""
+    global _shared_ranking
+    if _shared_ranking is None:
+        with _shared_ranking_lock:
+            if _shared_ranking is None:
+                _shared_ranking = QualityRanking.from_storage(get_storage())
+    return _shared_ranking
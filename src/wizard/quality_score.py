@@ -2,10 +2,115 @@
 Startup Quality Score Calculator
 
 This module calculates a quality score for startups based on their financial metrics.
+
+The scoring bands live in quality_bands.yml as threshold arrays. A single
+set of answers is scored with `bisect` over the thresholds, and a whole
+portfolio with `np.searchsorted` over its columns.
 """
 
-from typing import Dict, Any
+import math
+import os
+from bisect import bisect_left, bisect_right
+from typing import Dict, Any, Callable, List, Mapping
+
+import numpy as np
+
+from ..core_engine.batch import coerce_column, coerce_value
+from ..infra.config import config_registry
+from ..infra.instrumentation import timed
+
+BANDS_PATH = os.path.join(os.path.dirname(__file__), 'quality_bands.yml')
+
+# Inputs computed from the answers rather than read from them, and the answers they use
+DERIVED_INPUTS = ("cac_ltv_ratio", "burn_multiple", "growth_rate")
+DERIVED_SOURCES = ("cac", "ltv", "burn_rate", "revenue_monthly", "price", "customers", "new_customers")
+
+def _band_scorer(key: str, side: str, thresholds: List[float], points: List[int]) -> Callable[[Mapping[str, Any]], int]:
+    """Closure giving the points one factor earns for the inputs (0 when its input is undefined)."""
+    bisect = bisect_right if side == 'right' else bisect_left
+
+    def band(values):
+        value = values[key]
+        if value is None or value != value:
+            return 0
+        return points[bisect(thresholds, value)]
+
+    return band
+
+class QualityBands:
+    """Compiled scoring table, laid out for scalar (`bisect`) and columnar (`searchsorted`) scoring."""
+
+    def __init__(self, max_score: int, defaults: Dict[str, float], factors: List[Dict[str, Any]]):
+        self.max_score = max_score
+        self.defaults = defaults
+        self.factors = factors
+        # One closure per factor for scoring one set of answers
+        self.scalar_factors = [
+            _band_scorer(factor['input'], factor.get('side', 'right'),
+                         [float(threshold) for threshold in factor['thresholds']], list(factor['points']))
+            for factor in factors
+        ]
+        # (input, searchsorted side, thresholds, points) for scoring columns
+        self.batch_factors = [
+            (factor['input'], factor.get('side', 'right'),
+             np.asarray(factor['thresholds'], dtype=np.float64), np.asarray(factor['points'], dtype=np.int64))
+            for factor in factors
+        ]
+
+    @property
+    def inputs(self) -> List[str]:
+        """Answer keys read by the score."""
+        return list(self.defaults)
+
+def load_quality_bands() -> Dict[str, Any]:
+    """Load the scoring table from quality_bands.yml (cached, reloaded when the file changes)."""
+    return config_registry.get("quality_bands")
+
+def compile_bands(data: Dict[str, Any]) -> QualityBands:
+    """Check and compile the scoring table; malformed factors are skipped."""
+    factors = []
+    for factor in data.get('factors') or []:
+        thresholds, points = factor.get('thresholds') or [], factor.get('points') or []
+        if len(points) != len(thresholds) + 1 or thresholds != sorted(thresholds) \
+                or not all(math.isfinite(threshold) for threshold in thresholds) \
+                or factor.get('side', 'right') not in ('left', 'right'):
+            print(f"Error compiling quality band {factor.get('id')}: needs ascending finite thresholds, "
+                  f"one more points entry than thresholds and side 'left' or 'right'")
+            continue
+        factors.append(factor)
+    # Every answer read gets a default (0 unless the table sets one)
+    defaults = {key: 0 for key in DERIVED_SOURCES}
+    defaults.update({factor['input']: 0 for factor in factors if factor['input'] not in DERIVED_INPUTS})
+    defaults.update(data.get('defaults') or {})
+    return QualityBands(int(data.get('max_score', 100)), defaults, factors)
+
+config_registry.register("quality_bands", BANDS_PATH, indexes={"compiled": compile_bands})
+
+def get_compiled_bands() -> QualityBands:
+    """Return the scoring table compiled once per load of quality_bands.yml."""
+    return config_registry.index("quality_bands", "compiled")
 
+def _scalar_inputs(answers: Dict[str, Any], defaults: Dict[str, float]) -> Dict[str, Any]:
+    """
+    Answer values plus derived inputs.
+    
+    Answers are coerced like the batch columns (`coerce_value`); missing, NaN
+    or non-numeric ones take their default. A derived input that cannot be
+    computed is None.
+    """
+    values = {}
+    for key, default in defaults.items():
+        value = coerce_value(answers.get(key))
+        values[key] = value if value == value else default
+    
+    revenue = values["revenue_monthly"] or values["price"] * values["customers"]
+    ltv, customers = values["ltv"], values["customers"]
+    values["cac_ltv_ratio"] = values["cac"] / ltv if ltv > 0 else None
+    values["burn_multiple"] = values["burn_rate"] / revenue if revenue > 0 else None
+    values["growth_rate"] = values["new_customers"] / customers * 100 if customers > 0 else None
+    return values
+
+@timed("quality_score_seconds", "Quality score calculation for one set of answers")
 def calculate_quality_score(answers: Dict[str, Any]) -> int:
     """
     Calculate startup quality score (0-100) based on answers.
@@ -16,87 +121,57 @@ def calculate_quality_score(answers: Dict[str, Any]) -> int:
     Returns:
         Quality score from 0 to 100
     """
-    score = 0
+    bands = get_compiled_bands()
+    values = _scalar_inputs(answers, bands.defaults)
     
-    # Churn rate scoring
-    churn_rate = answers.get("churn_rate", 100)
-    if churn_rate < 3:
-        score += 25
-    elif churn_rate < 5:
-        score += 20
-    elif churn_rate < 10:
-        score += 10
-    elif churn_rate < 20:
-        score += 5
-    
-    # CAC/LTV ratio scoring
-    cac = answers.get("cac", 0)
-    ltv = answers.get("ltv", 1)
-    if ltv > 0:
-        cac_ltv_ratio = cac / ltv
-        if cac_ltv_ratio < 0.2:
-            score += 20
-        elif cac_ltv_ratio < 0.3:
-            score += 15
-        elif cac_ltv_ratio < 0.5:
-            score += 10
-        elif cac_ltv_ratio < 1.0:
-            score += 5
+    score = 0
+    for band in bands.scalar_factors:
+        score += band(values)
     
-    # Runway scoring
-    runway = answers.get("runway", 0)
-    if runway >= 18:
-        score += 20
-    elif runway >= 12:
-        score += 15
-    elif runway >= 6:
-        score += 10
-    elif runway >= 3:
-        score += 5
+    return min(bands.max_score, max(0, score))
+
+def _batch_inputs(columns: Mapping[str, Any], size: int, defaults: Dict[str, float]) -> Dict[str, np.ndarray]:
+    """Answer columns (NaN and missing columns filled with defaults) plus derived inputs (NaN when undefined)."""
+    values = {}
+    for key, default in defaults.items():
+        if key in columns:
+            column = coerce_column(columns[key])
+            values[key] = np.where(np.isnan(column), default, column)
+        else:
+            values[key] = np.full(size, float(default))
     
-    # Burn rate scoring
-    burn_rate = answers.get("burn_rate", 0)
-    revenue = answers.get("revenue_monthly", 0) or (answers.get("price", 0) * answers.get("customers", 0))
-    if revenue > 0 and burn_rate < revenue:
-        score += 15
-    elif revenue > 0 and burn_rate < revenue * 1.5:
-        score += 10
-    elif revenue > 0 and burn_rate < revenue * 2:
-        score += 5
+    ltv, customers = values["ltv"], values["customers"]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        revenue = np.where(values["revenue_monthly"] != 0, values["revenue_monthly"], values["price"] * customers)
+        values["cac_ltv_ratio"] = np.where(ltv > 0, values["cac"] / ltv, np.nan)
+        values["burn_multiple"] = np.where(revenue > 0, values["burn_rate"] / revenue, np.nan)
+        values["growth_rate"] = np.where(customers > 0, values["new_customers"] / customers * 100, np.nan)
+    return values
+
+def calculate_quality_score_batch(columns: Mapping[str, Any], size: int = None) -> np.ndarray:
+    """
+    Score a whole portfolio at once.
     
-    # Growth rate scoring
-    new_customers = answers.get("new_customers", 0)
-    existing_customers = answers.get("customers", 0)
-    if existing_customers > 0:
-        growth_rate = (new_customers / existing_customers) * 100
-        if growth_rate >= 20:
-            score += 15
-        elif growth_rate >= 10:
-            score += 10
-        elif growth_rate >= 5:
-            score += 5
+    Args:
+        columns: Mapping of answer name to array (one row per startup)
+        size: Number of startups, required only if no column is given
+        
+    Returns:
+        Integer array of quality scores, equal to `calculate_quality_score` per row
+    """
+    if size is None:
+        size = next((len(column) for column in columns.values()), 0)
     
-    # Team size scoring (lean is better)
-    team_size = answers.get("team_size", 1)
-    if team_size <= 5:
-        score += 10
-    elif team_size <= 10:
-        score += 5
-    elif team_size <= 20:
-        score += 2
+    bands = get_compiled_bands()
+    values = _batch_inputs(columns, size, bands.defaults)
     
-    # Price point scoring
-    price = answers.get("price", 0)
-    if price >= 100:
-        score += 10
-    elif price >= 50:
-        score += 8
-    elif price >= 25:
-        score += 5
-    elif price >= 10:
-        score += 3
+    score = np.zeros(size, dtype=np.int64)
+    for key, side, thresholds, points in bands.batch_factors:
+        value = values[key]
+        earned = points[np.searchsorted(thresholds, value, side=side)]
+        score += np.where(np.isnan(value), 0, earned)
     
-    return min(100, max(0, score))
+    return np.clip(score, 0, bands.max_score)
 
 def get_quality_feedback(score: int) -> str:
     """
@@ -2,40 +2,70 @@
 Questions loader for the wizard module.
 """
 
-import yaml
 import os
 from typing import List, Dict, Any
 
-def load_questions() -> List[Dict[str, Any]]:
-    """Load questions from questions.yml file."""
-    questions_path = os.path.join(os.path.dirname(__file__), 'questions.yml')
-    
-    with open(questions_path, 'r', encoding='utf-8') as f:
-        questions = yaml.safe_load(f)
+from ..infra.config import config_registry
+
+QUESTIONS_PATH = os.path.join(os.path.dirname(__file__), 'questions.yml')
+TIPS_PATH = os.path.join(os.path.dirname(__file__), 'tips.yml')
+
+# Key for questions shown to every project type
+ALL_PROJECT_TYPES = None
+
+# Project type assumed until the user picks one
+DEFAULT_PROJECT_TYPE = "B2B SaaS"
+
+def _index_by_id(questions: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Index questions by ID."""
+    return {question['id']: question for question in questions}
+
+def _index_by_branch(questions: List[Dict[str, Any]]) -> Dict[Any, List[Dict[str, Any]]]:
+    """Index the filtered question list for each project type, preserving order."""
+    project_types = []
+    for question in questions:
+        for project_type in question.get('branch') or []:
+            if project_type not in project_types:
+                project_types.append(project_type)
     
-    return questions
+    by_branch = {ALL_PROJECT_TYPES: [q for q in questions if not q.get('branch')]}
+    for project_type in project_types:
+        by_branch[project_type] = [
+            q for q in questions
+            if not q.get('branch') or project_type in q['branch']
+        ]
+    return by_branch
+
+config_registry.register("questions", QUESTIONS_PATH, indexes={
+    "by_id": _index_by_id,
+    "by_branch": _index_by_branch,
+})
+config_registry.register("tips", TIPS_PATH)
+
+def load_questions() -> List[Dict[str, Any]]:
+    """Load questions from questions.yml file (cached, reloaded when the file changes)."""
+    return config_registry.get("questions")
 
 def get_question_by_id(question_id: str) -> Dict[str, Any]:
     """Get a specific question by its ID."""
-    questions = load_questions()
+    question = config_registry.index("questions", "by_id").get(question_id)
     
-    for question in questions:
-        if question['id'] == question_id:
-            return question
+    if question is None:
+        raise ValueError(f"Question with ID '{question_id}' not found")
     
-    raise ValueError(f"Question with ID '{question_id}' not found")
+    return question
 
 def get_questions_for_project_type(project_type: str) -> List[Dict[str, Any]]:
     """Get questions that apply to a specific project type."""
-    questions = load_questions()
+    by_branch = config_registry.index("questions", "by_branch")
     
-    filtered_questions = []
-    for question in questions:
-        # If no branch specified, include for all project types
-        if 'branch' not in question or not question['branch']:
-            filtered_questions.append(question)
-        # If branch specified, check if project type is included
-        elif project_type in question['branch']:
-            filtered_questions.append(question)
-    
-    return filtered_questions 
\ No newline at end of file
+    # Unknown project types only see questions without a branch
+    return by_branch.get(project_type, by_branch[ALL_PROJECT_TYPES])
+
+def load_tips() -> Dict[str, Dict[str, Any]]:
+    """Load tips keyed by tip ID from tips.yml file (cached, reloaded when the file changes)."""
+    return config_registry.get("tips")
+
+def get_tip(tip_id: str) -> Dict[str, Any]:
+    """Get a tip by its ID, or None if there is no such tip."""
+    return load_tips().get(tip_id)
@@ -2,34 +2,48 @@
 Sanity rules loader and validator for the wizard module.
 """
 
-import yaml
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Mapping
+
+import numpy as np
+
+from ..infra.config import config_registry
+from ..infra.instrumentation import timed
+from .expressions import CompiledCondition, compile_condition
+
+RULES_PATH = os.path.join(os.path.dirname(__file__), 'sanity_rules.yml')
 
 def load_sanity_rules() -> List[Dict[str, Any]]:
-    """Load sanity rules from sanity_rules.yml file."""
-    rules_path = os.path.join(os.path.dirname(__file__), 'sanity_rules.yml')
-    
-    with open(rules_path, 'r', encoding='utf-8') as f:
-        rules = yaml.safe_load(f)
-    
-    return rules
+    """Load sanity rules from sanity_rules.yml file (cached, reloaded when the file changes)."""
+    return config_registry.get("sanity_rules")
 
+def compile_rules(rules: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], CompiledCondition]]:
+    """Compile each rule condition once; rules that fail to parse are skipped."""
+    compiled = []
+    for rule in rules:
+        try:
+            compiled.append((rule, compile_condition(rule['condition'])))
+        except (SyntaxError, ValueError) as e:
+            print(f"Error compiling rule {rule['id']}: {e}")
+    return compiled
+
+config_registry.register("sanity_rules", RULES_PATH, indexes={"compiled": compile_rules})
+
+def get_compiled_rules() -> List[Tuple[Dict[str, Any], CompiledCondition]]:
+    """Return sanity rules compiled once per load of sanity_rules.yml."""
+    return config_registry.index("sanity_rules", "compiled")
+
+@timed("validate_metrics_seconds", "Sanity-rule validation of one model")
 def validate_metrics(metrics: Dict[str, float], drivers: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Validate metrics against sanity rules and return violations."""
-    rules = load_sanity_rules()
     violations = []
     
     # Create context for rule evaluation
     context = {**metrics, **drivers}
     
-    for rule in rules:
-        condition = rule['condition']
-        
+    for rule, condition in get_compiled_rules():
         try:
-            # Simple condition evaluation (for MVP)
-            # In production, use a proper expression evaluator
-            if evaluate_condition(condition, context):
+            if condition.evaluate(context):
                 violations.append(rule)
         except Exception as e:
             # Log error but continue with other rules
@@ -37,55 +51,25 @@ def validate_metrics(metrics: Dict[str, float], drivers: Dict[str, Any]) -> List
     
     return violations
 
-def evaluate_condition(condition: str, context: Dict[str, Any]) -> bool:
-    """Evaluate a condition string against the context."""
-    # Simple condition evaluator for MVP
-    # In production, use a proper expression evaluator like `asteval`
-    
-    # Replace variable names with values
-    for key, value in context.items():
-        if isinstance(value, (int, float)):
-            condition = condition.replace(key, str(value))
-    
-    # Simple evaluation for common patterns
-    if '<' in condition:
-        parts = condition.split('<')
-        if len(parts) == 2:
-            try:
-                left = float(parts[0].strip())
-                right = float(parts[1].strip())
-                return left < right
-            except ValueError:
-                return False
-    
-    elif '>' in condition:
-        parts = condition.split('>')
-        if len(parts) == 2:
-            try:
-                left = float(parts[0].strip())
-                right = float(parts[1].strip())
-                return left > right
-            except ValueError:
-                return False
+def validate_metrics_batch(columns: Mapping[str, Any], size: int = None) -> Dict[str, np.ndarray]:
+    """
+    Validate a whole portfolio at once.
     
-    elif '>=' in condition:
-        parts = condition.split('>=')
-        if len(parts) == 2:
-            try:
-                left = float(parts[0].strip())
-                right = float(parts[1].strip())
-                return left >= right
-            except ValueError:
-                return False
-    
-    elif '<=' in condition:
-        parts = condition.split('<=')
-        if len(parts) == 2:
-            try:
-                left = float(parts[0].strip())
-                right = float(parts[1].strip())
-                return left <= right
-            except ValueError:
-                return False
+    Args:
+        columns: Mapping of metric/driver name to array (one row per model)
+        size: Number of models, required only if no rule variable is present
+        
+    Returns:
+        Dictionary of rule ID to boolean violation mask
+    """
+    if size is None:
+        size = next((len(column) for column in columns.values()), 0)
     
-    return False 
\ No newline at end of file
+    return {rule['id']: condition.evaluate_batch(columns, size) for rule, condition in get_compiled_rules()}
+
+def evaluate_condition(condition: str, context: Dict[str, Any]) -> bool:
+    """Evaluate a condition string against the context."""
+    try:
+        return compile_condition(condition).evaluate(context)
+    except (SyntaxError, ValueError):
+        return False
@@ -7,32 +7,54 @@ Main entry point for the Startup Financial OS application.
 import streamlit as st
 import sys
 import os
-import yaml
-from pathlib import Path
+import uuid
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.core_engine.formulas import METRIC_FUNCS
+from src.core_engine.monte_carlo import simulate_runway
+from src.core_engine.graph import IncrementalModel
+from src.core_engine.benchmarks import BENCHMARK_LABELS, benchmark_values, get_benchmark_index
 from src.agent_core.agent_core import SageAgent
-from src.infra.logging_conf import setup_logging, log_user_action
+from src.infra.logging_conf import setup_logging, log_user_action, log_agent_interaction, log_feedback
+from src.infra.storage import get_storage
+from src.infra.instrumentation import start_metrics_server
 from src.wizard.quality_score import calculate_quality_score, get_quality_feedback, calculate_score_delta
+from src.wizard.quality_ranking import get_quality_ranking
+from src.wizard.questions import DEFAULT_PROJECT_TYPE, load_tips, get_question_by_id, get_questions_for_project_type
+from src.gamification.badges import (get_badge_engine, build_badge_context, award_badge, get_user_badges,
+                                     get_user_points, get_user_rank)
 
-# Setup logging
-logger = setup_logging()
+@st.cache_resource
+def init_process():
+    """Process-wide setup, run once per server process instead of on every rerun."""
+    # Setup logging
+    logger = setup_logging()
+    
+    # Prometheus /metrics for the instrumented hot paths (only when METRICS_PORT is set)
+    start_metrics_server()
+    
+    # Restore the saved benchmark sketches; they are saved back after submissions and at exit
+    get_benchmark_index()
+    return logger
 
-# Load questions and tips
-def load_questions():
-    """Load questions from YAML file."""
-    questions_path = Path(__file__).parent / "src" / "wizard" / "questions.yml"
-    with open(questions_path, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+logger = init_process()
 
-def load_tips():
-    """Load tips from YAML file."""
-    tips_path = Path(__file__).parent / "src" / "wizard" / "tips.yml"
-    with open(tips_path, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+@st.cache_resource(max_entries=1000)
+def get_sage_agent(session_id: str = "default") -> SageAgent:
+    """Sage agent reused across reruns: one per chat session, plus a shared one for model runs."""
+    return SageAgent(session_id=session_id)
+
+@st.cache_data(max_entries=1024)
+def calculate_metrics(answers: dict) -> dict:
+    """Metrics for a set of wizard answers, memoized on the answers' content."""
+    return get_sage_agent().calculate_model(answers)
+
+@st.cache_data(max_entries=256)
+def simulate_runway_outlook(answers: dict) -> dict:
+    """Monte Carlo runway outlook, memoized on the answers' content."""
+    return simulate_runway(answers, n_paths=20_000, months=36, workers=1)
 
 def create_progress_ring(progress_percent):
     """Create a simple progress ring using HTML/CSS."""
@@ -56,6 +78,12 @@ def create_progress_ring(progress_percent):
     """
     return html
 
+def format_runway(months, horizon):
+    """Format a runway value, showing paths that outlast the horizon as 'horizon+'."""
+    if months == float("inf"):
+        return f"{horizon}+ months"
+    return f"{months:.1f} months"
+
 def main():
     """Main application function."""
     
@@ -67,6 +95,10 @@ def main():
         initial_sidebar_state="expanded"
     )
     
+    # Anonymous per-session user id for persisted chat, models and badges
+    if "user_id" not in st.session_state:
+        st.session_state.user_id = uuid.uuid4().hex
+    
     # Header
     st.title("💰 Startup Financial OS")
     st.markdown("*OS-level reliability, game-level usability*")
@@ -93,6 +125,8 @@ def main():
             if 'quality_delta' in st.session_state and st.session_state.quality_delta != "0 pts":
                 st.caption(f"Δ {st.session_state.quality_delta}")
     
+    log_user_action(st.session_state.user_id, "page_view", {"page": page})
+    
     # Main content based on selected page
     if page == "🏠 Dashboard":
         show_dashboard()
@@ -155,16 +189,27 @@ def show_wizard():
         st.session_state.quality_score = 0
         st.session_state.quality_delta = "0 pts"
     
-    # Load questions and tips
-    questions = load_questions()
+    # Incremental model backing the live metric preview
+    if 'live_model' not in st.session_state:
+        st.session_state.live_model = IncrementalModel(st.session_state.wizard_answers)
+    
+    show_wizard_panel()
+
+@st.fragment
+def show_wizard_panel():
+    """
+    Progress header and current question.
+    
+    Runs as a fragment: answering, skipping or going back redraws only this
+    panel (the sidebar catches up on the next full rerun). Calculating the
+    model reruns the whole app.
+    """
+    # Questions and tips come from the shared config cache
     tips = load_tips()
     
     # Filter questions based on project type
-    project_type = st.session_state.wizard_answers.get("project_type", "B2B SaaS")
-    filtered_questions = []
-    for q in questions:
-        if not q.get("branch") or project_type in q.get("branch", []):
-            filtered_questions.append(q)
+    project_type = st.session_state.wizard_answers.get("project_type", DEFAULT_PROJECT_TYPE)
+    filtered_questions = get_questions_for_project_type(project_type)
     
     # Progress calculation
     progress_percent = int((st.session_state.current_question + 1) / len(filtered_questions) * 100)
@@ -181,6 +226,9 @@ def show_wizard():
     with col3:
         if 'quality_score' in st.session_state:
             st.metric("Quality", f"{st.session_state.quality_score}/100")
+            ranking = get_quality_ranking().describe(st.session_state.quality_score, project_type)
+            if ranking:
+                st.caption(ranking)
     
     # Main content area
     if st.session_state.current_question < len(filtered_questions):
@@ -208,32 +256,24 @@ def show_wizard():
             if "benchmark" in question:
                 st.success(question["benchmark"])
             
-            # Navigation buttons
+            # Live preview of the metrics downstream of this answer
+            live_model = st.session_state.live_model
+            affected = live_model.graph.downstream([question["id"]])
+            if affected:
+                preview = live_model.what_if({question["id"]: answer})
+                st.caption("Live preview: " + " · ".join(f"{name} {preview[name]:,.1f}" for name in affected))
+            
+            # Navigation buttons; callbacks update the state before the panel redraws
             col1, col2, col3 = st.columns(3)
             
             with col1:
-                if st.button("⬅️ Previous") and st.session_state.current_question > 0:
-                    st.session_state.current_question -= 1
-                    st.rerun()
+                st.button("⬅️ Previous", on_click=previous_question)
             
             with col2:
-                if st.button("⏭️ Skip"):
-                    st.session_state.current_question += 1
-                    st.rerun()
+                st.button("⏭️ Skip", on_click=skip_question, args=(question["id"],))
             
             with col3:
-                if st.button("Next ➡️"):
-                    # Save answer
-                    st.session_state.wizard_answers[question["id"]] = answer
-                    
-                    # Calculate quality score
-                    old_score = st.session_state.quality_score
-                    new_score = calculate_quality_score(st.session_state.wizard_answers)
-                    st.session_state.quality_score = new_score
-                    st.session_state.quality_delta = calculate_score_delta(old_score, new_score)
-                    
-                    st.session_state.current_question += 1
-                    st.rerun()
+                st.button("Next ➡️", on_click=answer_question, args=(question["id"],))
         
         with colTip:
             # TIP section
@@ -247,10 +287,10 @@ def show_wizard():
                 if "related" in tip:
                     st.markdown("**Related:**")
                     for related_id in tip["related"][:3]:  # Show max 3 related
-                        for q in questions:
-                            if q["id"] == related_id:
-                                st.caption(f"🔗 {q['short']}")
-                                break
+                        try:
+                            st.caption(f"🔗 {get_question_by_id(related_id)['short']}")
+                        except ValueError:
+                            continue
                 
                 # Score delta
                 if 'quality_delta' in st.session_state and st.session_state.quality_delta != "0 pts":
@@ -273,10 +313,17 @@ def show_wizard():
         st.success("✅ Wizard completed!")
         
         if st.button("🚀 Calculate Model"):
-            # Calculate metrics
-            agent = SageAgent()
-            metrics = agent.calculate_model(st.session_state.wizard_answers)
+            # Calculate metrics (memoized on the answers)
+            agent = get_sage_agent()
+            metrics = calculate_metrics(st.session_state.wizard_answers)
             st.session_state.metrics = metrics
+            get_storage().save_model(st.session_state.user_id, st.session_state.wizard_answers, metrics)
+            # Anonymized: only the segment and metric values go into the benchmark sketches,
+            # and an unchanged model is not counted again however often it is recalculated
+            get_benchmark_index().submit_once(project_type, benchmark_values(st.session_state.wizard_answers, metrics))
+            get_quality_ranking().set_score(st.session_state.user_id, project_type, st.session_state.quality_score)
+            log_user_action(st.session_state.user_id, "wizard_complete",
+                            {"questions_answered": len(st.session_state.wizard_answers)})
             
             # Generate advice
             advice = agent.suggest_changes(st.session_state.wizard_answers, metrics)
@@ -285,6 +332,35 @@ def show_wizard():
             st.success("Model calculated successfully!")
             st.rerun()
 
+def previous_question():
+    """Go back one wizard question."""
+    if st.session_state.current_question > 0:
+        st.session_state.current_question -= 1
+
+def skip_question(question_id):
+    """Move past a wizard question without answering it."""
+    log_user_action(st.session_state.user_id, "wizard_skip",
+                    {"question_id": question_id, "step": st.session_state.current_question})
+    st.session_state.current_question += 1
+
+def answer_question(question_id):
+    """Save the current answer, update the quality score and move to the next question."""
+    answer = st.session_state[f"q_{question_id}"]
+    
+    # Save answer
+    st.session_state.wizard_answers[question_id] = answer
+    st.session_state.live_model.update({question_id: answer})
+    
+    # Calculate quality score
+    old_score = st.session_state.quality_score
+    new_score = calculate_quality_score(st.session_state.wizard_answers)
+    st.session_state.quality_score = new_score
+    st.session_state.quality_delta = calculate_score_delta(old_score, new_score)
+    
+    log_user_action(st.session_state.user_id, "wizard_answer",
+                    {"question_id": question_id, "step": st.session_state.current_question})
+    st.session_state.current_question += 1
+
 def show_sage_agent():
     """Show the Sage AI agent interface."""
     st.header("🤖 Sage AI Agent")
@@ -300,6 +376,8 @@ def show_sage_agent():
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
+            if message.get("advice_id"):
+                show_advice_feedback(message)
     
     # Chat input
     if prompt := st.chat_input("Ask Sage anything..."):
@@ -308,17 +386,36 @@ def show_sage_agent():
         with st.chat_message("user"):
             st.markdown(prompt)
         
-        # Generate response
-        if 'metrics' in st.session_state:
-            agent = SageAgent()
-            response = agent.suggest_changes(st.session_state.wizard_answers, st.session_state.metrics)
-        else:
-            response = "I need to see your financial model first. Please complete the Wizard!"
+        # Generate response, rendering advice tokens as they arrive
+        with st.chat_message("assistant"):
+            if 'metrics' in st.session_state:
+                agent = get_sage_agent(st.session_state.user_id)
+                response = st.write_stream(agent.stream_changes(st.session_state.wizard_answers, st.session_state.metrics))
+                agent.log_conversation(prompt, response, st.session_state.metrics)
+                # The advice id ties later ratings to this interaction and its priority
+                reply = {"role": "assistant", "content": response,
+                         "advice_id": uuid.uuid4().hex, "priority": agent.last_priority}
+                log_agent_interaction(st.session_state.user_id, prompt, response, st.session_state.metrics,
+                                      advice_id=reply["advice_id"], priority=reply["priority"])
+                show_advice_feedback(reply)
+            else:
+                response = "I need to see your financial model first. Please complete the Wizard!"
+                st.markdown(response)
+                reply = {"role": "assistant", "content": response}
         
         # Add assistant response
-        st.session_state.messages.append({"role": "assistant", "content": response})
-        with st.chat_message("assistant"):
-            st.markdown(response)
+        st.session_state.messages.append(reply)
+
+def show_advice_feedback(message: dict):
+    """Show rating buttons under a piece of advice and log the rating once."""
+    if message.get("rating"):
+        st.caption("Thanks for the feedback!")
+        return
+    up, down, _ = st.columns([1, 1, 10])
+    for column, label, rating in ((up, "👍", "positive"), (down, "👎", "negative")):
+        if column.button(label, key=f"{rating}_{message['advice_id']}"):
+            message["rating"] = rating
+            log_feedback(st.session_state.user_id, message["advice_id"], rating, priority=message.get("priority"))
 
 def show_analytics():
     """Show analytics and insights."""
@@ -340,6 +437,36 @@ def show_analytics():
     with col2:
         st.metric("Burn Rate", f"${st.session_state.metrics.get('burn_rate', 0):,.0f}")
         st.metric("CAC/LTV Ratio", f"{st.session_state.metrics.get('cac', 0) / max(st.session_state.metrics.get('ltv', 1), 1):.2f}")
+    
+    # Runway distribution next to the point estimate
+    st.subheader("Runway Outlook (Monte Carlo)")
+    simulation = simulate_runway_outlook(st.session_state.wizard_answers)
+    horizon = simulation["months"]
+    
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.metric("Point Estimate", f"{st.session_state.metrics.get('runway', 0):.1f} months")
+    with col2:
+        st.metric("P10 Runway", format_runway(simulation["p10"], horizon))
+    with col3:
+        st.metric("P50 Runway", format_runway(simulation["p50"], horizon))
+    with col4:
+        st.metric("P90 Runway", format_runway(simulation["p90"], horizon))
+    with col5:
+        st.metric(f"Out of Cash ≤ {simulation['within_months']}m", f"{simulation['prob_out_of_cash']:.0%}")
+    st.caption(f"{simulation['n_paths']:,} simulated paths with sampled churn, growth and expense drift.")
+    
+    # Where each metric sits in the industry distribution for this project type
+    project_type = st.session_state.wizard_answers.get("project_type", DEFAULT_PROJECT_TYPE)
+    values = benchmark_values(st.session_state.wizard_answers, st.session_state.metrics)
+    percentiles = get_benchmark_index().percentiles(project_type, values)
+    if percentiles:
+        st.subheader(f"Industry Benchmarks ({project_type})")
+        columns = st.columns(len(percentiles))
+        for column, (metric, percentile) in zip(columns, percentiles.items()):
+            with column:
+                st.metric(BENCHMARK_LABELS.get(metric, metric), f"{values[metric]:,.2f}")
+                st.caption(f"Percentile {percentile:.0f}")
 
 def show_badges():
     """Show user badges and achievements."""
@@ -349,56 +476,41 @@ def show_badges():
         st.info("Complete the Wizard to earn badges!")
         return
     
-    # Load badges
-    badges_path = Path(__file__).parent / "src" / "gamification" / "badges.yml"
-    with open(badges_path, 'r', encoding='utf-8') as f:
-        badges = yaml.safe_load(f)
+    # Evaluate badges from the compiled badges.yml conditions; only badges
+    # reading a variable that changed since the last visit are re-evaluated
+    engine = get_badge_engine()
+    badges = engine.badges
+    context = build_badge_context(
+        st.session_state.metrics,
+        st.session_state.wizard_answers,
+        quality_score=st.session_state.get('quality_score', 0),
+        wizard_completed=True,  # Always earned if we're here
+    )
+    if 'badge_context' in st.session_state:
+        earned_ids = engine.evaluate_changes(st.session_state.badge_context, context, st.session_state.earned_badge_ids)
+    else:
+        earned_ids = {badge["id"] for badge in engine.evaluate(context)}
+    st.session_state.badge_context = context
+    st.session_state.earned_badge_ids = earned_ids
     
-    # Calculate which badges are earned
-    earned_badges = []
-    total_points = 0
+    # Awards are persisted and permanent: newly earned badges are saved,
+    # previously awarded ones stay earned
+    awarded_ids = {badge["id"] for badge in get_user_badges(st.session_state.user_id)}
+    for badge_id in earned_ids - awarded_ids:
+        award_badge(st.session_state.user_id, badge_id)
+    earned_ids = earned_ids | awarded_ids
     
-    for badge in badges:
-        earned = False
-        
-        # Check conditions based on badge type
-        if badge["id"] == "first_complete":
-            earned = True  # Always earned if we're here
-        
-        elif badge["id"] == "quality_master":
-            earned = st.session_state.get('quality_score', 0) >= 80
-        
-        elif badge["id"] == "quality_expert":
-            earned = st.session_state.get('quality_score', 0) >= 60
-        
-        elif badge["id"] == "quality_improver":
-            earned = st.session_state.get('quality_score', 0) >= 40
-        
-        elif badge["id"] == "runway_optimizer":
-            earned = st.session_state.metrics.get('runway', 0) >= 12
-        
-        elif badge["id"] == "churn_master":
-            earned = st.session_state.metrics.get('churn', 0) <= 5
-        
-        elif badge["id"] == "lean_startup":
-            earned = st.session_state.wizard_answers.get('team_size', 1) <= 10
-        
-        elif badge["id"] == "price_optimizer":
-            earned = st.session_state.wizard_answers.get('price', 0) >= 50
-        
-        elif badge["id"] == "sustainability_expert":
-            revenue = st.session_state.metrics.get('mrr', 0)
-            burn_rate = st.session_state.metrics.get('burn_rate', 0)
-            earned = burn_rate < revenue if revenue > 0 else False
-        
-        # Add more badge conditions as needed
-        
-        if earned:
-            earned_badges.append(badge)
-            total_points += badge.get("points", 0)
+    earned_badges = [badge for badge in badges if badge["id"] in earned_ids]
+    total_points = get_user_points(st.session_state.user_id)
+    
+    rank = get_user_rank(st.session_state.user_id)
     
-    # Display total points
-    st.metric("Total Points", total_points)
+    # Display total points and leaderboard rank
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Total Points", total_points)
+    with col2:
+        st.metric("Leaderboard Rank", f"#{rank}" if rank else "—")
     
     # Display earned badges
     if earned_badges:
@@ -0,0 +1,467 @@
+"""
+Tests for agent_core module.
+"""
+
+import pytest
+import sys
+import os
+import json
+import re
+from types import SimpleNamespace
+
+# Add repository root to path; agent_core imports core_engine through the `src` package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.agent_core import agent_core
+from src.agent_core.advice_cache import AdviceCache, make_cache_key
+
+DRIVERS = {"project_type": "B2B SaaS", "price": 50, "customers": 10, "churn_rate": 5}
+METRICS = {"mrr": 500.0, "churn": 5.0, "runway": 8.0}
+
+def fake_completion(advice="Raise prices by 10%.", priority="high"):
+    """Build an object shaped like a `recommendation` function-call completion."""
+    function_call = SimpleNamespace(
+        name="recommendation",
+        arguments=json.dumps({"advice": advice, "priority": priority}),
+    )
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(function_call=function_call))])
+
+def fake_client(create):
+    """Wrap a `create` callable in an object shaped like the OpenAI client."""
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+def test_cache_key_quantization():
+    """Test that near-identical values share a key and exact mode keeps them apart."""
+    assert make_cache_key({"price": 49.99}, {}) == make_cache_key({"price": 50}, {})
+    assert make_cache_key({"price": 49.99}, {}, None) != make_cache_key({"price": 50}, {}, None)
+    assert make_cache_key({"a": 1, "b": 2}, {}) == make_cache_key({"b": 2, "a": 1}, {})
+    assert make_cache_key({"price": 50}, {}) != make_cache_key({"price": 60}, {})
+
+def test_advice_cache_hits_and_misses():
+    """Test hit/miss counters."""
+    cache = AdviceCache(":memory:")
+    key = cache.make_key(DRIVERS, METRICS)
+    
+    assert cache.get(key) is None
+    cache.set(key, "advice")
+    assert cache.get(key) == "advice"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hit_ratio"] == 0.5
+
+def test_advice_cache_lru_eviction():
+    """Test that the least recently used entry is evicted beyond max_entries."""
+    cache = AdviceCache(":memory:", max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+
+def test_advice_cache_ttl():
+    """Test that expired entries are treated as misses."""
+    cache = AdviceCache(":memory:", ttl_seconds=-1)
+    cache.set("a", "1")
+    
+    assert cache.get("a") is None
+    assert cache.get("a", allow_expired=True) == "1"
+    assert cache.purge_expired() == 1
+    assert len(cache) == 0
+
+def test_suggest_changes_uses_cache(monkeypatch):
+    """Test that a repeat request for the same model skips the API call."""
+    calls = []
+    def create(**kwargs):
+        calls.append(kwargs)
+        return fake_completion()
+    monkeypatch.setattr(agent_core, "get_openai_client", lambda: fake_client(create))
+    
+    agent = agent_core.SageAgent(cache=AdviceCache(":memory:"))
+    first = agent.suggest_changes(DRIVERS, METRICS)
+    second = agent.suggest_changes({**DRIVERS, "price": 49.99}, METRICS)
+    
+    assert first == second == "Raise prices by 10%."
+    assert len(calls) == 1
+    assert agent.cache.stats()["hits"] == 1
+
+def test_suggest_changes_does_not_cache_errors(monkeypatch):
+    """Test that failed calls are not cached."""
+    def create(**kwargs):
+        raise RuntimeError("upstream down")
+    monkeypatch.setattr(agent_core, "get_openai_client", lambda: fake_client(create))
+    
+    agent = agent_core.SageAgent(cache=AdviceCache(":memory:"))
+    assert agent.suggest_changes(DRIVERS, METRICS).startswith("Unable to generate advice")
+    assert len(agent.cache) == 0
+
+def test_metric_calculation_opens_no_databases(tmp_path):
+    """Test that computing metrics never creates the advice cache or conversation databases."""
+    import subprocess
+    
+    code = ("from src.agent_core import agent_core; "
+            "agent_core.calculate_model({'price': 50, 'customers': 10}); "
+            "agent_core.calculate_model_batch([{'price': 50, 'customers': 10}]); "
+            "agent_core.SageAgent().calculate_model({'price': 50, 'customers': 10})")
+    env = {**os.environ, "PYTHONPATH": os.path.join(os.path.dirname(__file__), '..')}
+    subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env, check=True)
+    
+    assert list(tmp_path.iterdir()) == []
+
+def test_suggest_changes_many_bounded_concurrency(monkeypatch):
+    """Test that batch advice keeps order and never exceeds the concurrency limit."""
+    import asyncio
+    
+    in_flight = []
+    peak = []
+    async def create(**kwargs):
+        in_flight.append(1)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.pop()
+        price = re.search(r"price=(\S+)", kwargs["messages"][1]["content"]).group(1)
+        return fake_completion(advice=f"advice for {price}")
+    monkeypatch.setattr(agent_core, "get_async_openai_client", lambda: fake_client(create))
+    
+    agent = agent_core.SageAgent(use_cache=False)
+    items = [({**DRIVERS, "price": price}, METRICS) for price in range(10)]
+    results = agent.suggest_changes_many(items, concurrency=3)
+    
+    assert results == [f"advice for {price}" for price in range(10)]
+    assert max(peak) == 3
+
+def fake_stream(arguments, step=4):
+    """Yield chunks shaped like streamed function-call deltas."""
+    for i in range(0, len(arguments), step):
+        function_call = SimpleNamespace(name=None, arguments=arguments[i:i + step])
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(function_call=function_call))])
+
+def test_advice_stream_parser_incremental():
+    """Test that advice text is decoded incrementally, including escapes."""
+    from src.agent_core.streaming import AdviceStreamParser
+    
+    arguments = json.dumps({"priority": "high", "advice": "Cut \"churn\" 🚀\nnow"})
+    for step in (1, 3, 8):
+        parser = AdviceStreamParser()
+        pieces = [parser.feed(arguments[i:i + step]) for i in range(0, len(arguments), step)]
+        assert "".join(pieces) == "Cut \"churn\" 🚀\nnow"
+        assert parser.done
+        assert parser.result()["priority"] == "high"
+
+def test_stream_changes_yields_tokens_and_caches(monkeypatch):
+    """Test streaming advice and caching the completed result."""
+    arguments = json.dumps({"advice": "Raise prices by 10%.", "priority": "high"})
+    def create(**kwargs):
+        assert kwargs["stream"] is True
+        return fake_stream(arguments)
+    monkeypatch.setattr(agent_core, "get_openai_client", lambda: fake_client(create))
+    
+    agent = agent_core.SageAgent(cache=AdviceCache(":memory:"))
+    pieces = list(agent.stream_changes(DRIVERS, METRICS))
+    
+    assert len(pieces) > 1
+    assert "".join(pieces) == "Raise prices by 10%."
+    assert agent.last_priority == "high"
+    assert list(agent.stream_changes(DRIVERS, METRICS)) == ["Raise prices by 10%."]
+    assert agent.last_priority is None
+
+def test_stream_changes_marks_interrupted_advice(monkeypatch):
+    """Test that a stream failing after partial advice ends with a notice and is not cached."""
+    arguments = json.dumps({"advice": "Raise prices by 10% and cut churn.", "priority": "high"})
+    def broken_stream():
+        yield from fake_stream(arguments[:30])
+        raise ConnectionError("connection reset")
+    monkeypatch.setattr(agent_core, "get_openai_client", lambda: fake_client(lambda **kwargs: broken_stream()))
+    
+    agent = agent_core.SageAgent(cache=AdviceCache(":memory:"))
+    pieces = list(agent.stream_changes(DRIVERS, METRICS))
+    
+    assert pieces[-1] == agent_core.INTERRUPTED_ADVICE_NOTICE
+    assert "".join(pieces[:-1]) == "Raise prices by 10"
+    assert len(agent.cache) == 0
+
+def test_stream_changes_reports_dropped_streams_to_the_breaker(monkeypatch):
+    """Test that a stream failing after it opened is recorded as a circuit breaker failure."""
+    from src.agent_core.resilience import CircuitBreaker, ResilientCaller
+    
+    def broken_stream():
+        yield from fake_stream(json.dumps({"advice": "Raise prices.", "priority": "high"})[:20])
+        raise ConnectionError("connection reset")
+    monkeypatch.setattr(agent_core, "get_openai_client", lambda: fake_client(lambda **kwargs: broken_stream()))
+    
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    agent = agent_core.SageAgent(cache=AdviceCache(":memory:"), caller=ResilientCaller(breaker=breaker, max_attempts=1))
+    list(agent.stream_changes(DRIVERS, METRICS))
+    
+    assert breaker.failures == 1 and breaker.state == CircuitBreaker.OPEN
+
+def test_stub_server_serves_recommendations(monkeypatch):
+    """Test the agent against the local stub endpoint, plain and streamed."""
+    import openai
+    from benchmarks.stub_server import StubLLMServer, STUB_ADVICE
+    
+    with StubLLMServer(latency=0, jitter=0) as server:
+        client = openai.OpenAI(api_key="stub", base_url=server.url, max_retries=0)
+        monkeypatch.setattr(agent_core, "get_openai_client", lambda: client)
+        agent = agent_core.SageAgent(use_cache=False)
+        
+        advice = agent.suggest_changes(DRIVERS, METRICS)
+        streamed = "".join(agent.stream_changes(DRIVERS, METRICS))
+        client.close()
+    
+    known = {text for text, _ in STUB_ADVICE}
+    assert advice in known
+    assert streamed in known
+    assert server.requests == 2
+
+def test_stub_server_error_rate(monkeypatch):
+    """Test that injected upstream errors are retried, then answered locally."""
+    import openai
+    from benchmarks.stub_server import StubLLMServer
+    
+    from src.agent_core.resilience import ResilientCaller
+    
+    with StubLLMServer(latency=0, jitter=0, error_rate=1.0) as server:
+        client = openai.OpenAI(api_key="stub", base_url=server.url, max_retries=0)
+        monkeypatch.setattr(agent_core, "get_openai_client", lambda: client)
+        caller = ResilientCaller(max_attempts=3, backoff_base=0.01, seed=0)
+        advice = agent_core.SageAgent(use_cache=False, caller=caller).suggest_changes(DRIVERS, METRICS)
+        client.close()
+    
+    assert advice.startswith(agent_core.OFFLINE_ADVICE_PREFIX)
+    assert server.errors == 3
+    assert caller.stats["retries"] == 2
+
+def test_resilient_caller_retries_with_backoff():
+    """Test that retryable errors are retried and the timeout budget is passed on."""
+    from src.agent_core.resilience import ResilientCaller
+    
+    timeouts = []
+    def flaky(timeout):
+        timeouts.append(timeout)
+        if len(timeouts) < 3:
+            raise ConnectionError("reset")
+        return "ok"
+    
+    caller = ResilientCaller(deadline_seconds=5, max_attempts=3, backoff_base=0.01, seed=0)
+    assert caller.call(flaky) == "ok"
+    assert len(timeouts) == 3
+    assert all(0 < timeout <= 5 for timeout in timeouts)
+    assert timeouts == sorted(timeouts, reverse=True)
+    assert caller.breaker.state == "closed"
+
+def test_resilient_caller_does_not_retry_bad_requests():
+    """Test that non-retryable errors propagate at once without tripping the breaker."""
+    from src.agent_core.resilience import ResilientCaller
+    
+    calls = []
+    def bad(timeout):
+        calls.append(timeout)
+        raise ValueError("bad request")
+    
+    caller = ResilientCaller(max_attempts=3, backoff_base=0.01)
+    with pytest.raises(ValueError):
+        caller.call(bad)
+    assert len(calls) == 1
+    assert caller.breaker.failures == 0
+
+def test_circuit_breaker_opens_and_probes():
+    """Test closed -> open -> half-open -> closed transitions."""
+    from src.agent_core.resilience import CircuitBreaker, CircuitOpenError, ResilientCaller
+    
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    caller = ResilientCaller(max_attempts=1, breaker=breaker)
+    def down(timeout):
+        raise ConnectionError("down")
+    
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            caller.call(down)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        caller.call(lambda timeout: "ok")
+    
+    now[0] = 11
+    assert breaker.state == "half_open"
+    assert caller.call(lambda timeout: "ok") == "ok"
+    assert breaker.state == "closed"
+    assert caller.stats["rejected"] == 1
+
+def test_resilient_caller_hedges_slow_requests():
+    """Test that a second request is sent after p95 latency and the faster one wins."""
+    import threading
+    import time
+    from src.agent_core.resilience import LatencyTracker, ResilientCaller
+    
+    latency = LatencyTracker(min_samples=1)
+    latency.record(0.02)
+    calls = []
+    lock = threading.Lock()
+    def slow_then_fast(timeout):
+        with lock:
+            calls.append(timeout)
+            first = len(calls) == 1
+        time.sleep(0.5 if first else 0.0)
+        return "slow" if first else "fast"
+    
+    caller = ResilientCaller(hedge=True, latency=latency)
+    assert caller.call(slow_then_fast) == "fast"
+    assert caller.stats["hedges"] == 1
+    assert caller.stats["hedge_wins"] == 1
+
+def test_resilient_caller_async_deadline():
+    """Test that an async call is cut off at its deadline."""
+    import asyncio
+    from src.agent_core.resilience import DeadlineExceeded, ResilientCaller
+    
+    async def hang(timeout):
+        await asyncio.sleep(5)
+    
+    caller = ResilientCaller(deadline_seconds=0.05, max_attempts=3, backoff_base=0.01)
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(caller.acall(hang))
+    assert caller.breaker.failures == 1
+
+def test_suggest_changes_falls_back_to_stale_cache(monkeypatch):
+    """Test that expired cached advice is served while the circuit is open."""
+    from src.agent_core.resilience import CircuitBreaker, ResilientCaller
+    
+    def create(**kwargs):
+        raise AssertionError("circuit is open; no request expected")
+    monkeypatch.setattr(agent_core, "get_openai_client", lambda: fake_client(create))
+    
+    cache = AdviceCache(":memory:", ttl_seconds=-1)
+    cache.set(cache.make_key(DRIVERS, METRICS), "Old advice.")
+    breaker = CircuitBreaker(failure_threshold=1)
+    breaker.record_failure()
+    agent = agent_core.SageAgent(cache=cache, caller=ResilientCaller(breaker=breaker))
+    
+    assert agent.suggest_changes(DRIVERS, METRICS) == "Old advice."
+    assert agent.suggest_changes(dict(DRIVERS, price=500), METRICS).startswith(agent_core.OFFLINE_ADVICE_PREFIX)
+    assert agent.failures == 2
+
+def test_conversation_store_relevant_context():
+    """Test that retrieval ranks past turns by similarity and filters by session."""
+    from src.agent_core.conversation_store import ConversationStore
+    
+    store = ConversationStore(":memory:")
+    agent = agent_core.SageAgent(use_cache=False, history=store, session_id="a")
+    agent.log_conversation("How can I extend my runway?", "Cut burn by 15%.", METRICS)
+    agent.log_conversation("Should I raise prices?", "Test a 10% price increase.", METRICS)
+    agent.log_conversation("What is a good churn rate?", "Below 3% monthly for SaaS.", METRICS)
+    agent_core.SageAgent(use_cache=False, history=store, session_id="b").log_conversation(
+        "Runway runway runway", "Other session.")
+    
+    relevant = agent.get_relevant_context(k=2, query="my runway is short")
+    assert [entry["user_input"] for entry in relevant] == ["How can I extend my runway?"]
+    assert agent.get_relevant_context(k=5, query="unrelated words") == []
+    assert [entry["user_input"] for entry in agent.get_relevant_context(k=2)] == [
+        "Should I raise prices?", "What is a good churn rate?"]
+    assert len(agent.conversation_history) == 3
+
+def test_conversation_store_bounded_and_persistent(tmp_path):
+    """Test the size cap, metrics dedup and reload from disk."""
+    from src.agent_core.conversation_store import ConversationStore
+    
+    path = str(tmp_path / "history.db")
+    store = ConversationStore(path, max_entries=3)
+    for i in range(5):
+        store.add("s", f"question {i}", f"answer {i}", dict(METRICS))
+    
+    entries = store.recent(10)
+    assert [entry["user_input"] for entry in entries] == ["question 2", "question 3", "question 4"]
+    assert entries[0]["metrics"] is entries[2]["metrics"]
+    assert store._conn.execute("SELECT COUNT(*) FROM conversation_turns").fetchone()[0] == 3
+    assert store._conn.execute("SELECT COUNT(*) FROM metrics_snapshots").fetchone()[0] == 1
+    store.close()
+    
+    reopened = ConversationStore(path, max_entries=3)
+    assert [entry["user_input"] for entry in reopened.search("answer 4", k=1)] == ["question 4"]
+    assert reopened.recent(1)[0]["metrics"] == METRICS
+    reopened.close()
+
+def test_conversation_store_index_grows_with_history():
+    """Test that index memory follows the retained turns and wraps once the cap is reached."""
+    from src.agent_core.conversation_store import ConversationStore, INITIAL_CAPACITY
+    
+    store = ConversationStore(":memory:", max_entries=INITIAL_CAPACITY * 3)
+    assert store._matrix.shape[1] == INITIAL_CAPACITY
+    for i in range(INITIAL_CAPACITY * 3 + 5):
+        store.add("s", f"question {i} topic{i}", f"answer {i}")
+    
+    assert store._matrix.shape[1] == INITIAL_CAPACITY * 3
+    assert len(store) == INITIAL_CAPACITY * 3
+    assert store.recent(1000)[0]["user_input"] == "question 5 topic5"
+    found = [entry["user_input"] for entry in store.search(f"topic{INITIAL_CAPACITY}", k=3)]
+    assert f"question {INITIAL_CAPACITY} topic{INITIAL_CAPACITY}" in found
+    store.close()
+
+def test_conversation_store_cap_is_shared_fairly_between_sessions(tmp_path):
+    """Test that a chatty session evicts its own oldest turns rather than other sessions' history."""
+    from src.agent_core.conversation_store import ConversationStore
+    
+    path = str(tmp_path / "history.db")
+    store = ConversationStore(path, max_entries=4)
+    store.add("quiet", "quiet question", "quiet answer")
+    for i in range(10):
+        store.add("chatty", f"chatty question {i}", f"chatty answer {i}")
+    
+    assert [entry["user_input"] for entry in store.recent(10, "quiet")] == ["quiet question"]
+    assert [entry["user_input"] for entry in store.recent(10, "chatty")] == [
+        "chatty question 7", "chatty question 8", "chatty question 9"]
+    
+    # A new session takes its share from the largest one
+    store.add("new", "new question", "new answer")
+    assert len(store.recent(10, "chatty")) == 2 and len(store) == 4
+    assert store._conn.execute("SELECT COUNT(*) FROM conversation_turns").fetchone()[0] == 4
+    store.close()
+    
+    single = ConversationStore(":memory:", max_entries=1)
+    single.add("s", "first", "answer")
+    single.add("s", "second", "answer")
+    assert [entry["user_input"] for entry in single.recent(5, "s")] == ["second"]
+    single.close()
+
+def test_prompt_builder_compact_and_relevant():
+    """Test stable compact serialization and project-type field filtering."""
+    from src.agent_core.prompt_builder import build_user_prompt
+    
+    drivers = {"project_type": "E-commerce", "price": 50, "revenue_monthly": 12000.0,
+               "cash_balance": 100000, "expenses_monthly": 15000.5}
+    metrics = {"ltv": 1000.0, "runway": 6.6666667, "mrr": 500.0}
+    prompt = build_user_prompt(drivers, metrics)
+    
+    assert prompt["content"].splitlines()[1:] == [
+        "type=E-commerce",
+        "metrics: runway=6.667",
+        "drivers: expenses_monthly=15000 cash_balance=100000 revenue_monthly=12000",
+    ]
+    assert build_user_prompt(dict(reversed(list(drivers.items()))), metrics) == prompt
+
+def test_prompt_builder_respects_budget_and_reports_tokens(monkeypatch):
+    """Test that drivers are dropped to fit the budget and tokens are reported per request."""
+    from src.agent_core.prompt_builder import build_user_prompt, estimate_tokens
+    
+    full = build_user_prompt(DRIVERS, METRICS)
+    tight = build_user_prompt(DRIVERS, METRICS, token_budget=full["tokens"] - 3)
+    assert tight["tokens"] <= full["tokens"] - 3
+    assert tight["dropped"][0] == "churn_rate"
+    assert "runway=8" in tight["content"]
+    
+    old_style = json.dumps({"drivers": DRIVERS, "metrics": METRICS, "project_type": "B2B SaaS"}, indent=2)
+    assert full["tokens"] < 0.6 * estimate_tokens(old_style)
+    
+    requests = []
+    def create(**kwargs):
+        requests.append(kwargs)
+        return fake_completion()
+    monkeypatch.setattr(agent_core, "get_openai_client", lambda: fake_client(create))
+    agent = agent_core.SageAgent(use_cache=False)
+    agent.suggest_changes(DRIVERS, METRICS)
+    
+    assert requests[0]["messages"][1]["content"] == full["content"]
+    assert agent.prompt_stats["requests"] == 1
+    assert agent.prompt_stats["last_prompt_tokens"] > full["tokens"]
@@ -0,0 +1,91 @@
+"""
+Tests for the core path benchmark suite.
+"""
+
+import json
+import pytest
+import sys
+import os
+
+# Add repository root to path; the suite imports the app modules through the `src` package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+def test_perf_suite_measures_every_case():
+    """Test that every case reports time and peak memory, and size caps are respected."""
+    from benchmarks.perf_suite import CASES, run_suite
+
+    results = run_suite(sizes=[1, 3])
+    measured = {(row["case"], row["n"]) for row in results}
+
+    assert measured == {(case, n) for case in CASES for n in (1, 3)}
+    for row in results:
+        assert row["seconds"] > 0
+        assert row["peak_bytes"] >= 0
+
+    assert run_suite(["config_yaml_parse"], sizes=[2000]) == []
+    with pytest.raises(ValueError):
+        run_suite(["missing_case"], sizes=[1])
+
+def test_perf_suite_flags_regressions(tmp_path):
+    """Test baseline round-trip and the regression threshold with its noise floor."""
+    from benchmarks.perf_suite import compare, load_baseline, save_baseline
+
+    baseline_rows = [
+        {"case": "calculate_model", "n": 1000, "seconds": 0.020, "per_item_us": 20.0, "peak_bytes": 10_000_000},
+        {"case": "quality_score", "n": 1, "seconds": 0.00005, "per_item_us": 50.0, "peak_bytes": 600},
+    ]
+    path = str(tmp_path / "baseline.json")
+    save_baseline(baseline_rows, path)
+    baseline = load_baseline(path)
+    assert baseline["results"] == baseline_rows
+
+    current = [
+        {"case": "calculate_model", "n": 1000, "seconds": 0.030, "per_item_us": 30.0, "peak_bytes": 10_500_000},
+        # 3x slower but only by microseconds: below the noise floor
+        {"case": "quality_score", "n": 1, "seconds": 0.00015, "per_item_us": 150.0, "peak_bytes": 600},
+        {"case": "new_case", "n": 1, "seconds": 1.0, "per_item_us": 1e6, "peak_bytes": 1},
+    ]
+    regressions = compare(current, baseline, threshold=0.25)
+
+    assert [(reg["case"], reg["metric"]) for reg in regressions] == [("calculate_model", "seconds")]
+    assert regressions[0]["ratio"] == pytest.approx(1.5)
+    assert compare(current, baseline, threshold=0.6) == []
+
+def test_perf_suite_gates_only_matching_environment(tmp_path):
+    """Test that a baseline from another environment is reported but does not fail the run."""
+    from benchmarks.perf_suite import environment, environment_differences, main, save_baseline
+    
+    path = str(tmp_path / "baseline.json")
+    # Impossibly fast baseline, so the current run always regresses
+    save_baseline([{"case": "calculate_model", "n": 1000, "seconds": 1e-9, "per_item_us": 1e-6, "peak_bytes": 1}], path)
+    assert environment_differences({"environment": environment()}) == []
+    assert main(["--cases", "calculate_model", "--sizes", "1000", "--baseline", path]) == 1
+    
+    with open(path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    baseline["environment"]["numpy"] = "0.0"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f)
+    assert environment_differences(baseline) == ["numpy"]
+    assert main(["--cases", "calculate_model", "--sizes", "1000", "--baseline", path]) == 0
+    assert main(["--cases", "calculate_model", "--sizes", "1000", "--baseline", path, "--ignore-environment"]) == 1
+
+def test_advice_benchmark_reports_percentiles(monkeypatch):
+    """Test the benchmark harness against the stub at two concurrency levels."""
+    from benchmarks.advice_benchmark import run_benchmark
+    from benchmarks.stub_server import StubLLMServer
+    from src.agent_core import agent_core
+    
+    with StubLLMServer(latency=0.01, jitter=0.005, seed=0) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.url)
+        monkeypatch.setenv("OPENAI_API_KEY", "stub")
+        monkeypatch.setattr(agent_core.openai, "api_key", None)
+        results = run_benchmark([1, 4], requests_per_level=8)
+    
+    assert [row["concurrency"] for row in results] == [1, 4]
+    for row in results:
+        assert row["requests"] == 8
+        assert row["errors"] == 0
+        assert row["throughput"] > 0
+        assert 10 <= row["p50_ms"] <= row["p95_ms"] <= row["p99_ms"]
+    assert server.requests == 16
@@ -8,6 +8,8 @@ import os
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+# The benchmark index reads its table through infra, so it is imported through the `src` package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from core_engine.formulas import calc_mrr, calc_churn, calc_cac, calc_runway, calc_burn_rate, calc_ltv
 
@@ -80,4 +82,354 @@ def test_metric_functions_dict():
     expected_functions = ["mrr", "churn", "cac", "runway", "burn_rate", "ltv"]
     for func_name in expected_functions:
         assert func_name in METRIC_FUNCS
-        assert callable(METRIC_FUNCS[func_name]) 
\ No newline at end of file
+        assert callable(METRIC_FUNCS[func_name]) 
+
+
+def test_calculate_model_batch_matches_scalar():
+    """Test that the batch engine matches the scalar formulas row by row."""
+    from core_engine.formulas import METRIC_FUNCS
+    from core_engine.batch import calculate_model_batch
+    
+    drivers_list = [
+        {"price": 50, "customers": 10, "churn_rate": 5, "marketing_spend": 1000,
+         "new_customers": 20, "expenses_monthly": 400, "cash_balance": 10000},
+        {"price": 50, "customers": 5, "churn_rate": 0, "marketing_spend": 1000,
+         "new_customers": 0, "expenses_monthly": 1000, "cash_balance": 10000},
+        {"price": 99.5, "customers": 120, "churn_rate": 3.5, "marketing_spend": 0,
+         "new_customers": 0.5, "expenses_monthly": 25000, "cash_balance": 250000},
+    ]
+    batch = calculate_model_batch(drivers_list)
+    
+    for i, drivers in enumerate(drivers_list):
+        for metric_name, calc_func in METRIC_FUNCS.items():
+            assert abs(batch[metric_name][i] - calc_func(drivers)) < 1e-9
+
+def test_calculate_model_batch_columnar_input():
+    """Test batch calculation from NumPy columns."""
+    import numpy as np
+    from core_engine.batch import calculate_model_batch
+    
+    columns = {
+        "price": np.array([50.0, 50.0]),
+        "customers": np.array([10.0, 5.0]),
+        "churn_rate": np.array([5.0, 0.0]),
+        "marketing_spend": np.array([1000.0, 1000.0]),
+        "new_customers": np.array([20.0, 0.0]),
+        "expenses_monthly": np.array([1000.0, 1000.0]),
+        "cash_balance": np.array([10000.0, 10000.0]),
+    }
+    metrics = calculate_model_batch(columns)
+    
+    assert metrics["mrr"].tolist() == [500, 250]
+    assert metrics["cac"].tolist() == [50, 1000]
+    assert metrics["ltv"].tolist() == [1000, 0]
+    assert metrics["burn_rate"].tolist() == [500, 750]
+
+def test_calculate_model_batch_missing_drivers():
+    """Test that missing drivers zero out dependent metrics like the scalar path."""
+    from core_engine.batch import calculate_model_batch
+    
+    metrics = calculate_model_batch([
+        {"price": "50", "customers": "10"},
+        {"price": 50, "customers": 10, "churn_rate": 5},
+    ])
+    
+    assert metrics["mrr"].tolist() == [500, 500]
+    assert metrics["ltv"].tolist() == [0, 1000]
+    assert metrics["runway"].tolist() == [0, 0]
+
+def test_project_cash_matches_static_runway():
+    """Test that a flat projection runs out of cash where calc_runway predicts."""
+    from core_engine.projection import project_cash
+    
+    inputs = {
+        "price": 50,
+        "customers": 5,
+        "churn_rate": 0,
+        "new_customers": 0,
+        "expenses_monthly": 1000,
+        "cash_balance": 10000
+    }
+    projection = project_cash(inputs, months=24)
+    
+    # Burn = 750/month, so cash hits zero during month 14 (runway ≈ 13.33)
+    assert projection["zero_cash_month"] == 14
+    assert abs(projection["runway"] - calc_runway(inputs)) < 0.01
+    assert len(projection["cash"]) == 24
+    assert projection["cash"][0] == 9250
+
+def test_project_cash_events():
+    """Test hires, price changes and funding rounds in the projection."""
+    from core_engine.projection import project_cash
+    
+    inputs = {
+        "price": 50,
+        "customers": 10,
+        "churn_rate": 10,
+        "new_customers": 2,
+        "expenses_monthly": 1000,
+        "cash_balance": 5000,
+        "team_size": 2
+    }
+    events = [
+        {"month": 2, "type": "hire", "count": 1, "salary": 500},
+        {"month": 3, "type": "price_change", "price": 100},
+        {"month": 4, "type": "funding", "amount": 10000},
+    ]
+    projection = project_cash(inputs, months=12, events=events)
+    
+    assert projection["customers"][0] == 11  # 10 * 0.9 + 2
+    assert projection["headcount"][:3] == [2, 3, 3]
+    assert projection["mrr"][2] == projection["customers"][2] * 100
+    assert projection["cash"][3] > projection["cash"][2] + 9000
+    assert projection["zero_cash_month"] is None
+
+def test_project_cash_batch_scenarios():
+    """Test that scenarios are projected independently in one pass."""
+    import numpy as np
+    from core_engine.projection import project_cash_batch
+    
+    columns = {
+        "price": 50,
+        "customers": 10,
+        "expenses_monthly": np.array([500.0, 1500.0, 2500.0]),
+        "cash_balance": 10000,
+    }
+    projection = project_cash_batch(columns, months=12, keep_series=False)
+    
+    assert projection["zero_cash_month"].tolist() == [-1, 10, 5]
+    assert "cash" not in projection
+
+def test_project_cash_invalid_horizon():
+    """Test that horizons outside 1-60 months are rejected."""
+    from core_engine.projection import project_cash
+    
+    with pytest.raises(ValueError):
+        project_cash({"cash_balance": 1000}, months=61)
+
+def test_simulate_runway_reproducible():
+    """Test that Monte Carlo results depend only on the seed, not the worker count or chunk size."""
+    from core_engine.monte_carlo import simulate_runway
+    
+    inputs = {
+        "price": 50,
+        "customers": 40,
+        "churn_rate": 5,
+        "new_customers": 4,
+        "expenses_monthly": 8000,
+        "cash_balance": 60000
+    }
+    first = simulate_runway(inputs, n_paths=5500, seed=7, workers=1, chunk_size=1000)
+    second = simulate_runway(inputs, n_paths=5500, seed=7, workers=2, chunk_size=2000)
+    single_chunk = simulate_runway(inputs, n_paths=5500, seed=7, workers=1, chunk_size=100_000)
+    
+    assert first == second == single_chunk
+    assert simulate_runway(inputs, n_paths=5500, seed=8, workers=1) != first
+    assert first["p10"] <= first["p50"] <= first["p90"]
+    assert 0 <= first["prob_out_of_cash"] <= 1
+
+def test_simulate_runway_without_uncertainty():
+    """Test that fixed distributions collapse to the deterministic projection."""
+    from core_engine.monte_carlo import simulate_runway
+    
+    inputs = {
+        "price": 50,
+        "customers": 5,
+        "expenses_monthly": 1000,
+        "cash_balance": 10000
+    }
+    result = simulate_runway(inputs, n_paths=100, months=24, distributions={}, workers=1)
+    
+    assert abs(result["p50"] - 10000 / 750) < 0.01
+    assert result["prob_out_of_cash"] == 0.0
+    assert result["point_estimate"] == calc_runway(inputs)
+
+def test_simulate_runway_profitable_paths():
+    """Test that paths which never run out of cash report an infinite runway."""
+    from core_engine.monte_carlo import simulate_runway
+    
+    inputs = {"price": 100, "customers": 50, "expenses_monthly": 1000, "cash_balance": 10000}
+    result = simulate_runway(inputs, n_paths=100, months=12, distributions={}, workers=1)
+    
+    assert result["p10"] == float("inf")
+    assert result["prob_out_of_cash"] == 0.0
+
+def test_metric_deps_cover_metric_funcs():
+    """Test that every metric declares its dependencies and the graph orders them."""
+    from core_engine.formulas import METRIC_FUNCS, METRIC_DEPS
+    from core_engine.graph import MetricGraph
+    
+    assert set(METRIC_DEPS) == set(METRIC_FUNCS)
+    order = MetricGraph().order
+    assert order.index("mrr") < order.index("burn_rate") < order.index("runway")
+
+def test_evaluate_metrics_matches_scalar():
+    """Test that graph evaluation matches the scalar METRIC_FUNCS."""
+    from core_engine.formulas import METRIC_FUNCS
+    from core_engine.graph import evaluate_metrics
+    
+    inputs = {
+        "price": "50",
+        "customers": 5,
+        "churn_rate": 4,
+        "marketing_spend": 1000,
+        "new_customers": 0,
+        "expenses_monthly": 1000,
+        "cash_balance": 10000
+    }
+    metrics = evaluate_metrics(inputs)
+    
+    assert list(metrics) == list(METRIC_FUNCS)
+    inputs["price"] = 50.0
+    for metric_name, calc_func in METRIC_FUNCS.items():
+        assert metrics[metric_name] == calc_func(inputs)
+
+def test_evaluate_metrics_missing_driver():
+    """Test that metrics reading a missing driver fall back to 0.0."""
+    from core_engine.graph import evaluate_metrics
+    
+    metrics = evaluate_metrics({"expenses_monthly": 1000, "cash_balance": 10000, "churn_rate": 5})
+    
+    assert metrics["mrr"] == 0.0
+    assert metrics["burn_rate"] == 0.0
+    assert metrics["runway"] == 0.0
+    assert metrics["churn"] == 5
+
+def test_incremental_model_recomputes_downstream_only():
+    """Test that a driver change recomputes only the metrics that read it."""
+    from core_engine.graph import IncrementalModel, evaluate_metrics
+    
+    inputs = {
+        "price": 50,
+        "customers": 5,
+        "churn_rate": 5,
+        "marketing_spend": 1000,
+        "new_customers": 10,
+        "expenses_monthly": 1000,
+        "cash_balance": 10000
+    }
+    model = IncrementalModel(inputs)
+    evaluations = model.evaluations
+    
+    changed = model.update({"cash_balance": 20000})
+    assert set(changed) == {"runway"}
+    assert model.evaluations == evaluations + 1
+    
+    model.update({"customers": 10})
+    inputs.update({"cash_balance": 20000, "customers": 10})
+    assert model.metrics == evaluate_metrics(inputs)
+    
+    # Unchanged values do not trigger any recomputation
+    evaluations = model.evaluations
+    assert model.update({"customers": 10}) == {}
+    assert model.evaluations == evaluations
+
+def test_incremental_model_what_if():
+    """Test that what-if previews do not modify the committed model."""
+    from core_engine.graph import IncrementalModel
+    
+    model = IncrementalModel({"price": 50, "customers": 10, "expenses_monthly": 1000, "cash_balance": 10000})
+    preview = model.what_if({"price": 100})
+    
+    assert preview["mrr"] == 1000
+    assert model.metrics["mrr"] == 500
+    assert model.drivers["price"] == 50
+
+def test_kll_sketch_accuracy_memory_and_merge():
+    """Test that the quantile sketch stays small and accurate, and merges like one stream."""
+    import numpy as np
+    from core_engine.quantiles import KLLSketch
+    
+    data = np.random.default_rng(7).lognormal(0, 1, 200_000)
+    qs = np.linspace(0.05, 0.95, 19)
+    truth = np.quantile(data, qs)
+    
+    sketch = KLLSketch(k=200, seed=1)
+    sketch.update_many(data)
+    assert sketch.n == len(data)
+    assert len(sketch) < 3 * 200
+    assert np.max(np.abs(sketch.rank(truth) - qs)) < 0.02
+    assert np.max(np.abs(sketch.quantile(qs) - truth) / truth) < 0.1
+    
+    left, right = KLLSketch(k=200, seed=2), KLLSketch(k=200, seed=3)
+    left.update_many(data[:80_000])
+    right.update_many(data[80_000:])
+    left.merge(right)
+    assert left.n == len(data) and len(left) < 3 * 200
+    assert np.max(np.abs(left.rank(truth) - qs)) < 0.02
+    
+    restored = KLLSketch.from_dict(left.to_dict())
+    assert restored.rank(1.0) == left.rank(1.0)
+    assert np.isnan(KLLSketch().rank(1.0))
+
+def test_benchmark_index_percentiles_and_submissions(tmp_path):
+    """Test percentiles against the benchmarks.csv medians and incremental submissions."""
+    from src.core_engine.benchmarks import BenchmarkIndex, benchmark_values, load_benchmarks
+    
+    index = BenchmarkIndex.from_config()
+    table = load_benchmarks()
+    assert index.percentile("churn_rate", "saas_b2b", table["churn_rate"]["saas_b2b"]) == pytest.approx(50, abs=2)
+    # Project types map to table segments
+    assert index.percentile("runway_months", "Marketplace", 10) == index.percentile("runway_months", "marketplace", 10)
+    assert index.percentile("churn_rate", "Hardware", 5) is None
+    
+    before = index.percentile("churn_rate", "B2B SaaS", 3)
+    for _ in range(500):
+        assert index.submit("B2B SaaS", {"churn_rate": 1.0, "unknown_metric": 5}) == 1
+    assert index.percentile("churn_rate", "B2B SaaS", 3) > before + 40
+    
+    other = BenchmarkIndex.from_config()
+    other.submit_many("churn_rate", "saas_b2c", [30.0] * 1000)
+    index.merge(other)
+    assert index.percentile("churn_rate", "saas_b2c", 20) < 20
+    
+    path = str(tmp_path / "benchmarks.json")
+    index.save(path)
+    restored = BenchmarkIndex.load_state(path)
+    assert restored.submissions == 500
+    assert restored.percentile("churn_rate", "B2B SaaS", 3) == index.percentile("churn_rate", "B2B SaaS", 3)
+    
+    values = benchmark_values({"customers": 100, "new_customers": 10, "churn_rate": 4},
+                              {"cac": 200, "ltv": 1000, "runway": 12, "mrr": 0, "burn_rate": 5000})
+    assert values == {"mrr_growth_rate": 10.0, "churn_rate": 4, "cac_ltv_ratio": 0.2, "runway_months": 12}
+
+
+def test_benchmark_index_persists_and_submits_once_per_model(tmp_path):
+    """Test that submissions survive a restart and an unchanged model is only counted once."""
+    from src.core_engine.benchmarks import PRIOR_POINTS, BenchmarkIndex, open_benchmark_index
+    
+    path = str(tmp_path / "benchmarks_state.json")
+    index = open_benchmark_index(path)
+    index.save_interval = 0  # Save after every submission
+    before = index.percentile("churn_rate", "B2B SaaS", 3)
+    
+    assert index.submit_once("B2B SaaS", {"churn_rate": 1.0})
+    assert not index.submit_once("saas_b2b", {"churn_rate": 1.0})
+    assert index.submit_once("B2B SaaS", {"churn_rate": 2.0})
+    assert index.submit_once("B2C SaaS", {"churn_rate": 2.0})
+    assert index.submissions == 3
+    
+    restarted = open_benchmark_index(path)
+    assert restarted.submissions == 3
+    assert restarted.percentile("churn_rate", "B2B SaaS", 3) == index.percentile("churn_rate", "B2B SaaS", 3) > before
+    # The fingerprints are restored too, and only the most recently seen are kept
+    assert not restarted.submit_once("B2B SaaS", {"churn_rate": 1.0})
+    restarted.max_fingerprints = 2
+    assert restarted.submit_once("B2B SaaS", {"churn_rate": 3.0})
+    assert len(restarted._fingerprints) == 2
+    assert not restarted.submit_once("B2B SaaS", {"churn_rate": 1.0})
+    assert restarted.submit_once("B2B SaaS", {"churn_rate": 2.0})
+    
+    # Pairs added to benchmarks.csv or with a changed median are re-seeded on load, keeping submissions
+    table = {"churn_rate": {"saas_b2b": 1.5, "hardware": 2.0}}
+    edited = BenchmarkIndex.load_state(path, table)
+    assert edited.percentile("churn_rate", "hardware", 2.0) == pytest.approx(50, abs=2)
+    assert edited.percentile("runway_months", "saas_b2b", 12) is None
+    assert edited.percentile("churn_rate", "B2B SaaS", 1.5) == pytest.approx(50, abs=2)
+    assert edited._sketches[("churn_rate", "saas_b2b")].n == PRIOR_POINTS + 2
+    assert edited.reseed(table) == 0
+    
+    # A missing or unreadable state file falls back to the benchmarks.csv prior
+    (tmp_path / "broken.json").write_text("{")
+    assert open_benchmark_index(str(tmp_path / "broken.json")).submissions == 0
+    assert open_benchmark_index(str(tmp_path / "missing.json")).submissions == 0
@@ -0,0 +1,141 @@
+"""
+Tests for gamification module.
+"""
+
+import pytest
+import sys
+import os
+
+# Add repository root to path; badges import the wizard expression engine
+# through the `src` package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.gamification.badges import (
+    BadgeEngine,
+    build_badge_context,
+    check_badge_eligibility,
+    evaluate_badge_condition,
+    get_badge_engine,
+    load_badges,
+)
+
+def test_badges_yml_structure():
+    """Test that every badge has the fields the engine relies on."""
+    badges = load_badges()
+    
+    required_fields = ['id', 'name', 'description', 'icon', 'condition', 'points']
+    for badge in badges:
+        for field in required_fields:
+            assert field in badge, f"Badge missing required field: {field}"
+
+def test_all_badge_conditions_compile():
+    """Test that every condition in badges.yml compiles."""
+    engine = get_badge_engine()
+    assert set(engine.conditions) == {badge['id'] for badge in load_badges()}
+
+def test_evaluate_badge_condition():
+    """Test boolean and numeric badge conditions."""
+    assert evaluate_badge_condition("wizard_completed == true", {"wizard_completed": True})
+    assert not evaluate_badge_condition("wizard_completed == true", {"wizard_completed": False})
+    assert evaluate_badge_condition("churn <= 5", {"churn": 5, "churn_rate": 50})
+    assert not evaluate_badge_condition("quality_score >= 80", {})
+
+def test_check_badge_eligibility():
+    """Test eligibility against metrics and user actions."""
+    eligible = check_badge_eligibility({"quality_score": 65, "runway": 14}, {"wizard_completed": True})
+    eligible_ids = {badge['id'] for badge in eligible}
+    
+    assert eligible_ids == {"first_complete", "quality_expert", "quality_improver", "runway_optimizer"}
+
+def test_build_badge_context_derived_values():
+    """Test derived revenue, CAC/LTV ratio and growth rate."""
+    metrics = {"mrr": 1000, "cac": 200, "ltv": 1000, "burn_rate": 500}
+    answers = {"customers": 20, "new_customers": 5}
+    context = build_badge_context(metrics, answers, quality_score=42)
+    
+    assert context["revenue"] == 1000
+    assert context["cac_ltv_ratio"] == 0.2
+    assert context["growth_rate"] == 25
+    assert context["quality_score"] == 42
+
+def test_badge_engine_inverted_index():
+    """Test that a changed variable re-evaluates only the badges reading it."""
+    engine = get_badge_engine()
+    
+    assert engine.affected_badges(["quality_score"]) == {"quality_master", "quality_expert", "quality_improver"}
+    
+    context = {"quality_score": 50, "runway": 14}
+    earned = {badge['id'] for badge in engine.evaluate(context)}
+    updated = engine.update({**context, "quality_score": 85}, ["quality_score"], earned)
+    
+    assert updated == earned | {"quality_master", "quality_expert"}
+    assert engine.evaluate_changes(context, {**context, "runway": 3}, earned) == earned - {"runway_optimizer"}
+
+def test_badge_engine_bulk():
+    """Test that bulk evaluation matches per-user evaluation."""
+    import numpy as np
+    
+    engine = BadgeEngine(load_badges())
+    users = [
+        {"quality_score": 85, "runway": 20, "churn": 3, "team_size": 4, "price": 60},
+        {"quality_score": 30, "runway": 5, "churn": 12, "team_size": 25, "price": 20},
+    ]
+    columns = {key: np.array([user[key] for user in users], dtype=float) for key in users[0]}
+    masks = engine.evaluate_bulk(columns)
+    points = engine.points_bulk(columns)
+    
+    for i, user in enumerate(users):
+        earned = engine.evaluate(user)
+        assert {badge['id'] for badge in earned} == {badge_id for badge_id, mask in masks.items() if mask[i]}
+        assert points[i] == sum(badge['points'] for badge in earned)
+
+def test_award_badge_persists(tmp_path, monkeypatch):
+    """Test that awarded badges and points are read back from storage."""
+    from src.gamification import badges
+    from src.infra.storage import Storage
+    
+    storage = Storage(str(tmp_path / "sage.db"))
+    monkeypatch.setattr(badges, "get_storage", lambda: storage)
+    badge_id = load_badges()[0]["id"]
+    
+    award = badges.award_badge("alice", badge_id)
+    badges.award_badge("alice", badge_id)
+    
+    assert [badge["id"] for badge in badges.get_user_badges("alice")] == [badge_id]
+    assert badges.get_user_points("alice") == award["points_earned"]
+    assert badges.get_user_badges("bob") == []
+    with pytest.raises(ValueError):
+        badges.award_badge("alice", "missing_badge")
+    storage.close()
+
+def test_leaderboard_top_and_rank(tmp_path):
+    """Test leaderboard ranks, ties and awards committed by another storage instance."""
+    from src.gamification.leaderboard import Leaderboard
+    from src.infra.storage import Storage
+    
+    path = str(tmp_path / "sage.db")
+    storage = Storage(path)
+    storage.award_badge("alice", "first_steps", 10)
+    storage.award_badge("bob", "runway_master", 25)
+    
+    leaderboard = Leaderboard(storage)
+    assert leaderboard.rank("bob") == 1
+    assert leaderboard.rank("alice") == 2
+    assert leaderboard.rank("nobody") is None
+    
+    # Awards from another process show up without any notification
+    other = Storage(path)
+    other.award_badge("alice", "runway_master", 25)
+    other.award_badge("alice", "runway_master", 25)
+    other.award_badge("carol", "runway_master", 25)
+    other.close()
+    
+    assert leaderboard.top(3) == [
+        {"user_id": "alice", "points": 35, "rank": 1},
+        {"user_id": "bob", "points": 25, "rank": 2},
+        {"user_id": "carol", "points": 25, "rank": 2},
+    ]
+    assert leaderboard.rank("carol") == 2
+    assert leaderboard.points("alice") == storage.get_user_points("alice") == 35
+    assert leaderboard.top(0) == []
+    storage.close()
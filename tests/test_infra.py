@@ -0,0 +1,398 @@
+"""
+Tests for infra module.
+"""
+
+import pytest
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from infra.config import ConfigRegistry
+
+def test_config_registry_parses_once(tmp_path):
+    """Test that repeated reads reuse the cached parse and indexes."""
+    path = tmp_path / "items.yml"
+    path.write_text("- id: a\n  value: 1\n- id: b\n  value: 2\n", encoding="utf-8")
+    
+    registry = ConfigRegistry()
+    registry.register("items", str(path), indexes={"by_id": lambda items: {i["id"]: i for i in items}})
+    
+    for _ in range(5):
+        assert registry.index("items", "by_id")["b"]["value"] == 2
+    assert registry.get("items") is registry.get("items")
+    assert registry.load_count("items") == 1
+
+def test_config_registry_hot_reload(tmp_path):
+    """Test that a changed mtime triggers a reload and index rebuild."""
+    path = tmp_path / "items.yml"
+    path.write_text("- id: a\n", encoding="utf-8")
+    
+    registry = ConfigRegistry()
+    registry.register("items", str(path), indexes={"ids": lambda items: [i["id"] for i in items]})
+    assert registry.index("items", "ids") == ["a"]
+    
+    path.write_text("- id: a\n- id: b\n", encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    
+    assert registry.index("items", "ids") == ["a", "b"]
+    assert registry.load_count("items") == 2
+
+def test_config_registry_unknown_names(tmp_path):
+    """Test errors for unregistered configs and unknown indexes."""
+    path = tmp_path / "items.yml"
+    path.write_text("[]\n", encoding="utf-8")
+    registry = ConfigRegistry()
+    registry.register("items", str(path))
+    
+    with pytest.raises(ValueError):
+        registry.get("missing")
+    with pytest.raises(ValueError):
+        registry.index("items", "missing")
+
+def test_config_bundle_roundtrip(tmp_path):
+    """Test that a built bundle serves configs without calling the loader."""
+    from infra.bundle import write_bundle, read_bundle
+    from infra.config import load_yaml
+    
+    source = tmp_path / "items.yml"
+    source.write_text("- id: a\n- id: b\n", encoding="utf-8")
+    bundle_path = tmp_path / "config_bundle.bin"
+    write_bundle(str(bundle_path), sources={"items": str(source)})
+    
+    assert read_bundle(str(bundle_path))["items"]["data"] == load_yaml(str(source))
+    
+    calls = []
+    def counting_loader(path):
+        calls.append(path)
+        return load_yaml(path)
+    
+    registry = ConfigRegistry()
+    assert registry.load_bundle(str(bundle_path))
+    registry.register("items", str(source), loader=counting_loader)
+    
+    assert registry.get("items") == [{"id": "a"}, {"id": "b"}]
+    assert calls == []
+
+def test_config_bundle_hash_mismatch_falls_back(tmp_path):
+    """Test that a stale bundle entry is ignored in favour of the source file."""
+    from infra.bundle import write_bundle
+    
+    source = tmp_path / "items.yml"
+    source.write_text("- id: a\n", encoding="utf-8")
+    bundle_path = tmp_path / "config_bundle.bin"
+    write_bundle(str(bundle_path), sources={"items": str(source)})
+    source.write_text("- id: changed\n", encoding="utf-8")
+    
+    registry = ConfigRegistry()
+    registry.load_bundle(str(bundle_path))
+    registry.register("items", str(source))
+    
+    assert registry.get("items") == [{"id": "changed"}]
+
+def test_config_bundle_invalid_file(tmp_path):
+    """Test that missing or corrupt bundles are rejected."""
+    from infra.bundle import read_bundle
+    
+    corrupt = tmp_path / "corrupt.bin"
+    corrupt.write_bytes(b"not a bundle")
+    
+    assert read_bundle(str(tmp_path / "missing.bin")) is None
+    assert read_bundle(str(corrupt)) is None
+
+def test_load_csv_table():
+    """Test parsing of the benchmarks table."""
+    from infra.config import load_csv_table
+    
+    path = os.path.join(os.path.dirname(__file__), '..', 'src', 'core_engine', 'benchmarks.csv')
+    table = load_csv_table(path)
+    
+    assert table["churn_rate"]["saas_b2b"] == 5.0
+    assert set(table["runway_months"]) == {"saas_b2b", "saas_b2c", "ecommerce", "marketplace"}
+
+def test_storage_write_behind_batches(tmp_path):
+    """Test that queued writes are batched and visible to reads."""
+    from infra.storage import Storage
+    
+    storage = Storage(str(tmp_path / "sage.db"), flush_interval=0.05)
+    for i in range(50):
+        storage.save_model("alice", {"price": i}, {"mrr": 10.0 * i})
+    storage.save_model("bob", {"price": 5}, {"mrr": 50.0})
+    storage.save_model("alice", {"price": 50}, {"mrr": 500.0})
+    
+    assert storage.get_latest_model("alice")["metrics"] == {"mrr": 500.0}
+    assert storage.get_latest_model("bob")["drivers"] == {"price": 5}
+    assert storage.get_latest_model("carol") is None
+    assert storage.writes == 52
+    assert storage.batches < 52
+    storage.close()
+
+def test_storage_writer_survives_held_write_lock(tmp_path):
+    """Test that a batch blocked by another connection's write lock is retried, not lost."""
+    import sqlite3
+    from infra.storage import Storage
+    
+    path = str(tmp_path / "sage.db")
+    storage = Storage(path, flush_interval=0.01, busy_timeout=0.05)
+    blocker = sqlite3.connect(path, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    
+    storage.save_model("alice", {"price": 50}, {"mrr": 500.0})
+    storage.award_badge("alice", "first_steps", 10)
+    assert storage.flush(timeout=5) is False
+    assert storage._writer.is_alive()
+    assert storage.retries >= 1
+    
+    blocker.execute("ROLLBACK")
+    blocker.close()
+    assert storage.get_latest_model("alice")["metrics"] == {"mrr": 500.0}
+    assert storage.get_user_points("alice") == 10
+    assert storage.writes == 2
+    assert storage.get_user_rank("alice") == 1
+    storage.close()
+
+def test_storage_writer_drops_unretryable_and_capped_batches(tmp_path):
+    """Test that non-lock errors and locks outlasting max_retries drop the batch instead of stalling the writer."""
+    import os
+    import sqlite3
+    from infra.storage import Storage
+    
+    path = str(tmp_path / "sage.db")
+    storage = Storage(path, flush_interval=0.01, busy_timeout=0.02, max_retries=2)
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("DROP TABLE models")
+    
+    # "no such table" is an OperationalError but not a lock: dropped at once
+    storage.save_model("alice", {"price": 50}, {"mrr": 500.0})
+    assert storage.flush(timeout=5) is False
+    assert storage.retries == 0 and storage._pending == 0
+    
+    other.execute("BEGIN IMMEDIATE")
+    storage.award_badge("alice", "first_steps", 10)
+    # Each flush waits for one attempt: the first try plus two retries, then the rows are dropped
+    for _ in range(3):
+        assert storage.flush(timeout=5) is False
+    assert storage.retries == 2 and storage._pending == 0
+    other.execute("ROLLBACK")
+    other.close()
+    
+    storage.award_badge("bob", "first_steps", 10)
+    assert storage.flush(timeout=5) is True
+    assert storage.get_user_points("alice") == 0 and storage.get_user_points("bob") == 10
+    
+    # A fresh pool after a fork must not make the instance look like the child's own
+    storage._pool_pid = -1
+    with storage.connection():
+        pass
+    assert storage._pid == os.getpid() and storage._pool_pid == os.getpid()
+    storage.close()
+
+def test_storage_badge_awards_idempotent(tmp_path):
+    """Test per-user badge awards, points and persistence across reopen."""
+    from infra.storage import Storage
+    
+    path = str(tmp_path / "sage.db")
+    storage = Storage(path)
+    storage.award_badge("alice", "first_steps", 10)
+    storage.award_badge("alice", "first_steps", 10)
+    storage.award_badge("alice", "runway_master", 25)
+    storage.award_badge("bob", "first_steps", 10)
+    
+    assert storage.get_user_points("alice") == 35
+    assert [award["badge_id"] for award in storage.get_badge_awards("bob")] == ["first_steps"]
+    storage.close()
+    
+    reopened = Storage(path)
+    assert reopened.get_user_points("alice") == 35
+    assert reopened.get_user_points("nobody") == 0
+    reopened.close()
+    
+    with pytest.raises(RuntimeError):
+        reopened.save_model("alice", {"price": 50}, {"mrr": 500.0})
+
+def test_storage_ledger_totals_and_top_users(tmp_path):
+    """Test materialized point totals, the append-only ledger and index-served ranking."""
+    import sqlite3
+    from infra.storage import Storage, SELECT_TOP_USERS_SQL, SELECT_USER_RANK_SQL
+    
+    storage = Storage(str(tmp_path / "sage.db"))
+    storage.award_badge("alice", "first_steps", 10)
+    storage.award_badge("bob", "first_steps", 10)
+    storage.award_badge("bob", "runway_master", 25)
+    storage.award_badge("alice", "runway_master", 25)
+    storage.award_badge("alice", "runway_master", 25)
+    storage.award_badge("carol", "first_steps", 10)
+    
+    assert storage.get_top_users(2) == [("alice", 35), ("bob", 35)]
+    assert [storage.get_user_rank(user) for user in ("alice", "bob", "carol", "nobody")] == [1, 1, 3, None]
+    
+    with storage.connection() as conn:
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("DELETE FROM badge_ledger WHERE user_id = 'alice'")
+        for sql, params in ((SELECT_TOP_USERS_SQL, (10,)), (SELECT_USER_RANK_SQL, ("alice",))):
+            plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+            assert "idx_user_points_points" in plan
+    storage.close()
+
+def test_logging_queue_json_lines_and_sampling(tmp_path):
+    """Test that structured events are written as JSON lines off-thread and sampled per event."""
+    import json
+    from infra import logging_conf
+    
+    original_rates = dict(logging_conf._sample_rates)
+    logging_conf.set_sample_rates({"page_view": 0.0, "ping": 1.0})
+    try:
+        logging_conf.setup_logging("INFO", log_dir=str(tmp_path), console=False)
+        assert logging_conf.log_user_action("alice", "wizard_answer", {"question_id": "mrr"})
+        assert not logging_conf.log_user_action("alice", "page_view", {"page": "Dashboard"})
+        logging_conf.log_feedback("alice", "advice-1", "positive")
+        logging_conf.get_logger("app").info("plain %s", "message")
+    finally:
+        logging_conf.shutdown_logging()
+        logging_conf.set_sample_rates(original_rates)
+    
+    records = [json.loads(line) for line in (tmp_path / "sage.log").read_text().splitlines()]
+    events = {record.get("event"): record for record in records}
+    assert events["user_action"]["details"] == {"question_id": "mrr"}
+    assert events["feedback"]["rating"] == "positive"
+    assert "page_view" not in [record.get("action") for record in records]
+    assert any(record.get("message") == "plain message" for record in records)
+    assert logging_conf.parse_sample_rates("page_view:0.1, bad, x:2") == {"page_view": 0.1, "x": 1.0}
+
+def test_log_query_resumes_across_rotation(tmp_path):
+    """Test aggregates over rotated logs, resuming from saved offsets without double counting."""
+    import json
+    from infra.log_query import LogScanner, compact_actions, actions_per_day_columnar
+    
+    def event(timestamp, **fields):
+        return json.dumps({"timestamp": timestamp, "level": "INFO", **fields}) + "\n"
+    
+    log = tmp_path / "sage.log"
+    (tmp_path / "sage.log.1").write_text(
+        "2026-01-01 09:00:00,000 - user_actions - INFO - User action: "
+        "{'user_id': 'alice', 'action': 'wizard_answer', 'timestamp': '2026-01-01T09:00:00', 'details': {'step': 0}}\n"
+        + event("2026-01-01T09:01:00", event="user_action", user_id="alice", action="wizard_answer", details={"step": 1})
+    )
+    log.write_text(
+        event("2026-01-02T10:00:00", event="user_action", user_id="bob", action="page_view", details={}, sample_rate=0.5)
+        + event("2026-01-02T10:05:00", event="feedback", user_id="bob", rating="positive", priority="high")
+        + '{"timestamp": "2026-01-02T10:06:00", "message": "not an event"}\n'
+    )
+    
+    state = str(tmp_path / "state.json")
+    first = LogScanner(str(log), state).scan()
+    assert first.actions_per_day() == [
+        {"day": "2026-01-01", "action": "wizard_answer", "count": 2.0},
+        {"day": "2026-01-02", "action": "page_view", "count": 2.0},
+    ]
+    
+    # Rotate, then append; the resumed scan only reads the new lines
+    os.rename(tmp_path / "sage.log.1", tmp_path / "sage.log.2")
+    os.rename(log, tmp_path / "sage.log.1")
+    log.write_text(
+        event("2026-01-02T11:00:00", event="feedback", user_id="bob", rating="negative", priority="high")
+        + event("2026-01-02T11:01:00", event="user_action", user_id="alice", action="wizard_complete", details={})
+        + '{"partial": '
+    )
+    resumed = LogScanner(str(log), state).scan()
+    assert resumed.records == first.records + 2
+    assert resumed.rating_ratio_by_priority() == {"high": {"positive": 1.0, "negative": 1.0, "ratio": 0.5}}
+    funnel = resumed.wizard_funnel()
+    assert funnel["reached_step"] == [1, 1] and funnel["completed"] == 1
+    
+    out = str(tmp_path / "actions.npz")
+    assert compact_actions(str(log), out) == 4
+    assert actions_per_day_columnar(out) == LogScanner(str(log)).scan().actions_per_day()
+
+def test_log_query_rates_feedback_under_the_interaction_priority(tmp_path):
+    """Test that feedback logged with only an advice_id is rated under the advice's logged priority."""
+    from infra import logging_conf
+    from infra.log_query import LogScanner
+
+    state = str(tmp_path / "state.json")
+    try:
+        logging_conf.setup_logging("INFO", log_dir=str(tmp_path), console=False)
+        logging_conf.log_agent_interaction("alice", "How do I cut churn?", "Call at-risk accounts.",
+                                           advice_id="advice-1", priority="critical")
+        logging_conf.log_agent_interaction("alice", "Pricing?", "Raise prices.", advice_id="advice-2", priority="low")
+        logging_conf.log_feedback("alice", "advice-1", "positive")
+    finally:
+        logging_conf.shutdown_logging()
+    LogScanner(str(tmp_path / "sage.log"), state).scan()
+
+    # The join survives a resumed scan; an explicit priority on the feedback wins
+    try:
+        logging_conf.setup_logging("INFO", log_dir=str(tmp_path), console=False)
+        logging_conf.log_feedback("alice", "advice-2", "negative")
+        logging_conf.log_feedback("alice", "advice-2", "positive", priority="medium")
+        logging_conf.log_feedback("alice", "advice-unknown", "negative")
+    finally:
+        logging_conf.shutdown_logging()
+    ratios = LogScanner(str(tmp_path / "sage.log"), state).scan().rating_ratio_by_priority()
+    assert ratios == {
+        "critical": {"positive": 1.0, "negative": 0.0, "ratio": 1.0},
+        "low": {"positive": 0.0, "negative": 1.0, "ratio": 0.0},
+        "medium": {"positive": 1.0, "negative": 0.0, "ratio": 1.0},
+        "unknown": {"positive": 0.0, "negative": 1.0, "ratio": 0.0},
+    }
+
+def test_metrics_registry_prometheus_text(tmp_path):
+    """Test histograms, counters, hit ratios, the text exposition and the disabled no-op path."""
+    import urllib.request
+    from infra.instrumentation import MetricsRegistry, start_metrics_server, stop_metrics_server, write_metrics_file
+    
+    registry = MetricsRegistry(enabled=False)
+    latency = registry.histogram("op_seconds", "Operation latency", buckets=(0.01, 0.1), op="calc")
+    hits = registry.counter("cache_requests_total", "Cache lookups", cache="advice", result="hit")
+    misses = registry.counter("cache_requests_total", cache="advice", result="miss")
+    latency.observe(0.05)
+    hits.inc()
+    assert latency.count == 0 and hits.value == 0
+    
+    registry.enabled = True
+    for value in (0.005, 0.05, 0.5):
+        latency.observe(value)
+    hits.inc(3)
+    misses.inc()
+    assert registry.hit_ratio("advice") == 0.75
+    assert registry.hit_ratio("config") is None
+    
+    text = registry.render_prometheus()
+    assert '# TYPE op_seconds histogram' in text
+    assert 'op_seconds_bucket{op="calc",le="0.1"} 2' in text
+    assert 'op_seconds_bucket{op="calc",le="+Inf"} 3' in text
+    assert 'op_seconds_count{op="calc"} 3' in text
+    assert 'cache_requests_total{cache="advice",result="hit"} 3' in text
+    
+    path = write_metrics_file(str(tmp_path / "metrics.prom"), registry)
+    assert open(path).read() == text
+    
+    server = start_metrics_server(0, registry=registry)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            assert response.read().decode() == text
+    finally:
+        stop_metrics_server()
+
+def test_config_registry_records_cache_hits(tmp_path):
+    """Test that config lookups count hits and reloads when metrics are enabled."""
+    from infra.config import ConfigRegistry
+    from infra.instrumentation import metrics_registry
+    
+    path = tmp_path / "cfg.yml"
+    path.write_text("a: 1\n")
+    registry = ConfigRegistry()
+    registry.register("cfg", str(path))
+    
+    metrics_registry.enabled = True
+    metrics_registry.reset()
+    try:
+        for _ in range(4):
+            registry.get("cfg")
+        assert metrics_registry.hit_ratio("config") == 0.75
+        assert 'config_load_seconds_count{config="cfg"} 1' in metrics_registry.render_prometheus()
+    finally:
+        metrics_registry.enabled = False
+        metrics_registry.reset()
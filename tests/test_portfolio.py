@@ -0,0 +1,65 @@
+"""
+Tests for the headless portfolio runner.
+"""
+
+import json
+import subprocess
+import sys
+import os
+
+# Add repository root to path; the runner imports across packages through `src`
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, ROOT)
+
+def test_portfolio_runner_matches_scalar_pipeline(tmp_path):
+    """Test CSV and JSONL input, chunking and worker processes all give the scalar results in input order."""
+    from src.agent_core import calculate_model
+    from src.portfolio.runner import run_portfolio
+    from src.wizard.quality_score import calculate_quality_score
+
+    startups = [
+        {"id": "a", "price": 50, "customers": 100, "new_customers": 12, "churn_rate": 2, "marketing_spend": 1200,
+         "team_size": 3, "expenses_monthly": 15000, "cash_balance": 400000, "revenue_monthly": 5000},
+        {"id": "b", "price": 8, "customers": 10, "churn_rate": 25, "team_size": 12, "cash_balance": 1000},
+        {"id": "c"},
+        {"id": "d", "price": 120, "customers": 0, "new_customers": 5, "marketing_spend": 500, "team_size": 1},
+        {"id": "e", "price": 30, "customers": 400, "new_customers": 20, "churn_rate": 6, "marketing_spend": 3000,
+         "team_size": 6, "expenses_monthly": 42000, "cash_balance": 90000},
+    ]
+    fields = sorted({key for startup in startups for key in startup} - {"id"})
+    csv_path = tmp_path / "portfolio.csv"
+    csv_path.write_text("id," + ",".join(fields) + "\n" + "".join(
+        startup["id"] + "," + ",".join(str(startup.get(field, "")) for field in fields) + "\n"
+        for startup in startups))
+    jsonl_path = tmp_path / "portfolio.jsonl"
+    jsonl_path.write_text("".join(json.dumps(startup) + "\n" for startup in startups[:2]) + "\nnot json\n"
+                          + "".join(json.dumps(startup) + "\n" for startup in startups[2:]))
+
+    summary = run_portfolio(str(csv_path), str(tmp_path / "inline.jsonl"), chunk_size=2, workers=1)
+    assert summary["rows"] == len(startups)
+    results = [json.loads(line) for line in (tmp_path / "inline.jsonl").read_text().splitlines()]
+    assert [result["id"] for result in results] == ["a", "b", "c", "d", "e"]
+    assert [result["row"] for result in results] == [0, 1, 2, 3, 4]
+    for startup, result in zip(startups, results):
+        answers = {key: value for key, value in startup.items() if key != "id"}
+        metrics = calculate_model(answers)
+        for name in ("mrr", "churn", "cac", "runway", "burn_rate", "ltv"):
+            assert result[name] == metrics[name]
+        assert result["quality_score"] == calculate_quality_score(answers)
+    assert summary["mean_quality_score"] == round(sum(r["quality_score"] for r in results) / len(results), 2)
+
+    run_portfolio(str(csv_path), str(tmp_path / "inline.csv"), chunk_size=2, workers=1)
+    run_portfolio(str(csv_path), str(tmp_path / "pool.csv"), chunk_size=2, workers=2)
+    run_portfolio(str(jsonl_path), str(tmp_path / "from_jsonl.csv"), chunk_size=3, workers=2)
+    expected = (tmp_path / "inline.csv").read_text()
+    assert expected.splitlines()[0].startswith("row,id,mrr")
+    assert (tmp_path / "pool.csv").read_text() == expected
+    # JSONL row numbers count the blank and malformed lines that were skipped
+    from_jsonl = (tmp_path / "from_jsonl.csv").read_text().splitlines()
+    assert [line.split(",", 1)[1] for line in from_jsonl] == [line.split(",", 1)[1] for line in expected.splitlines()]
+
+def test_portfolio_runner_does_not_import_streamlit():
+    """Test the runner module loads without pulling in the UI."""
+    code = "import sys; import src.portfolio.runner; print('streamlit' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
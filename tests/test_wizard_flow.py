@@ -9,6 +9,8 @@ import yaml
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+# Wizard modules share infra helpers, so they are imported through the `src` package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 def test_questions_yml_structure():
     """Test that questions.yml has the correct structure."""
@@ -83,4 +85,140 @@ def test_branch_logic():
     for question in questions:
         if 'branch' in question:
             for project_type in question['branch']:
-                assert project_type in valid_project_types, f"Invalid project type in branch: {project_type}" 
\ No newline at end of file
+                assert project_type in valid_project_types, f"Invalid project type in branch: {project_type}" 
+
+
+def test_evaluate_condition_operators():
+    """Test comparison operators, including <= and >= ordering."""
+    from src.wizard.sanity_rules import evaluate_condition
+    
+    assert evaluate_condition("runway < 6", {"runway": 5})
+    assert evaluate_condition("runway <= 6", {"runway": 6})
+    assert not evaluate_condition("runway < 6", {"runway": 6})
+    assert evaluate_condition("team_size >= 10", {"team_size": 10})
+    assert not evaluate_condition("price > 25", {"price": 25})
+
+def test_evaluate_condition_variable_names():
+    """Test that variable names are not substituted inside longer names."""
+    from src.wizard.sanity_rules import evaluate_condition
+    
+    context = {"churn": 25, "churn_rate": 2}
+    assert evaluate_condition("churn > 20", context)
+    assert not evaluate_condition("churn_rate > 20", context)
+
+def test_evaluate_condition_arithmetic():
+    """Test arithmetic on the right-hand side, e.g. the CAC/LTV rule."""
+    from src.wizard.sanity_rules import evaluate_condition
+    
+    assert evaluate_condition("cac > ltv/3", {"cac": 400, "ltv": 1000})
+    assert not evaluate_condition("cac > ltv/3", {"cac": 300, "ltv": 1000})
+    assert not evaluate_condition("cac > ltv/3", {"cac": 400})
+
+def test_evaluate_condition_rejects_unsafe_expressions():
+    """Test that calls and attribute access are not evaluated."""
+    from src.wizard.expressions import compile_condition
+    from src.wizard.sanity_rules import evaluate_condition
+    
+    with pytest.raises(ValueError):
+        compile_condition("__import__('os').getcwd() == 0")
+    assert not evaluate_condition("price.real > 0", {"price": 10})
+
+def test_validate_metrics_and_batch():
+    """Test single and columnar validation give the same violations."""
+    import numpy as np
+    from src.wizard.sanity_rules import validate_metrics, validate_metrics_batch
+    
+    models = [
+        {"runway": 4, "churn": 25, "cac": 500, "ltv": 1000, "price": 20, "cash_balance": 5000, "team_size": 3},
+        {"runway": 18, "churn": 3, "cac": 100, "ltv": 1000, "price": 60, "cash_balance": 80000, "team_size": 12},
+    ]
+    columns = {key: np.array([model[key] for model in models], dtype=float) for key in models[0]}
+    batch = validate_metrics_batch(columns)
+    
+    for i, model in enumerate(models):
+        violated = {rule["id"] for rule in validate_metrics(model, {})}
+        assert violated == {rule_id for rule_id, mask in batch.items() if mask[i]}
+    
+    assert batch["runway_warning"].tolist() == [True, False]
+    assert batch["team_size_growth"].tolist() == [False, True]
+
+def test_question_lookup_indexes():
+    """Test question-by-ID and project-type indexes against a linear scan."""
+    from src.wizard.questions import load_questions, get_question_by_id, get_questions_for_project_type
+    
+    questions = load_questions()
+    assert get_question_by_id("churn_rate")["short"] == "Churn Rate"
+    with pytest.raises(ValueError):
+        get_question_by_id("does_not_exist")
+    
+    for project_type in ["B2B SaaS", "E-commerce"]:
+        expected = [q for q in questions if not q.get("branch") or project_type in q["branch"]]
+        assert get_questions_for_project_type(project_type) == expected
+    assert [q["id"] for q in get_questions_for_project_type("Hardware")] == ["project_type"]
+
+def test_tips_reference_known_questions():
+    """Test that every question tip_id resolves to a tip."""
+    from src.wizard.questions import load_questions, get_tip
+    
+    for question in load_questions():
+        if question.get("tip_id"):
+            assert get_tip(question["tip_id"]) is not None
+
+def test_quality_score_bands_and_batch():
+    """Test the table-driven score against known answers and the batch scorer against the scalar one."""
+    import numpy as np
+    from src.wizard.quality_score import calculate_quality_score, calculate_quality_score_batch
+    
+    strong = {"churn_rate": 2, "cac": 100, "ltv": 1000, "runway": 24, "burn_rate": 500,
+              "price": 120, "customers": 100, "new_customers": 30, "team_size": 4}
+    assert calculate_quality_score(strong) == 100
+    # Missing answers use the table defaults (cac 0 / ltv 1 scores as a great ratio)
+    assert calculate_quality_score({}) == 30
+    # Boundaries: churn 3 is not "< 3", team of 5 is still "<= 5"
+    assert calculate_quality_score({"churn_rate": 3, "team_size": 5}) == 50
+    
+    models = [strong, {}, {"churn_rate": 3, "team_size": 5},
+              {"churn_rate": 12, "cac": 400, "ltv": 0, "runway": 6, "burn_rate": 900, "revenue_monthly": 600,
+               "customers": 40, "new_customers": 4, "team_size": 11, "price": 25}]
+    keys = set().union(*models)
+    columns = {key: np.array([model.get(key, np.nan) for model in models], dtype=float) for key in keys}
+    
+    assert calculate_quality_score_batch(columns).tolist() == [calculate_quality_score(m) for m in models]
+    
+    # Numeric strings, NumPy scalars, bools and NaN are coerced the same way on both paths
+    mixed = [{"churn_rate": "2", "price": np.int64(120)}, {"churn_rate": "n/a", "price": None},
+             {"churn_rate": float("nan"), "price": True}]
+    columns = {key: [model[key] for model in mixed] for key in ("churn_rate", "price")}
+    assert calculate_quality_score(mixed[0]) == calculate_quality_score({"churn_rate": 2, "price": 120})
+    assert calculate_quality_score_batch(columns).tolist() == [calculate_quality_score(m) for m in mixed]
+
+def test_quality_ranking_percentiles(tmp_path):
+    """Test segment percentiles, score replacement and ranking from stored models."""
+    from src.infra.storage import Storage
+    from src.wizard.quality_ranking import ALL_SEGMENTS, QualityRanking
+    
+    ranking = QualityRanking([(f"u{i}", "B2B SaaS", score) for i, score in enumerate(range(10, 100, 10))])
+    ranking.set_score("e1", "E-commerce", 90)
+    
+    assert ranking.size() == 10 and ranking.size("B2B SaaS") == 9
+    assert ranking.percentile(50, "B2B SaaS") == pytest.approx(100 * 4.5 / 9)
+    assert ranking.describe(85, "B2B SaaS") == "Top 12% of B2B SaaS"
+    assert ranking.top_percent(50, "Marketplace") is None
+    
+    # A new score replaces the user's old one
+    ranking.set_score("u8", "B2B SaaS", 10)
+    assert ranking.size("B2B SaaS") == 9
+    assert ranking.percentile(90, ALL_SEGMENTS) == pytest.approx(100 * 9.5 / 10)
+    
+    # Only each user's latest model counts
+    storage = Storage(str(tmp_path / "sage.db"))
+    storage.save_model("alice", {"project_type": "B2B SaaS", "churn_rate": 2}, {})
+    storage.save_model("alice", {"project_type": "B2B SaaS", "churn_rate": 30}, {})
+    storage.save_model("bob", {"churn_rate": 4}, {})
+    stored = QualityRanking.from_storage(storage)
+    storage.close()
+    
+    # Like the app, a model without a project type counts as the default one
+    assert stored.size() == 2 and stored.size("B2B SaaS") == 2
+    assert stored.percentile(30, "B2B SaaS") == 25.0
+    assert stored.percentile(50, ALL_SEGMENTS) == 75.0